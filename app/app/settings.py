@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 from pathlib import Path
+import importlib.util
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -49,6 +50,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
+    'core.throttling.ThrottleMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -82,16 +85,107 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# Connections persist for DB_CONN_MAX_AGE seconds and are checked with
+# `SELECT 1` before their first use in each request. DB_POOL=1 instead
+# shares a pool of connections between the threads of each process, and
+# DB_PGBOUNCER=1 makes Django safe behind PgBouncer in transaction mode.
+DB_POOL = bool(int(os.environ.get('DB_POOL', 0)))
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': 0 if DB_POOL else int(
+            os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'HEALTH_CHECKS': bool(int(os.environ.get('DB_HEALTH_CHECKS', 1))),
+        'DISABLE_SERVER_SIDE_CURSORS': bool(
+            int(os.environ.get('DB_PGBOUNCER', 0))),
+        'POOL': {
+            'MIN_SIZE': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 5)),
+        } if DB_POOL else None,
+    }
+}
+
+# Safe requests to the venue, group and event APIs read from the replicas
+# in DB_REPLICA_HOSTS (comma separated), except for users who wrote in the
+# last REPLICA_PIN_SECONDS.
+DATABASE_REPLICAS = []
+for index, host in enumerate(
+        filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))):
+    alias = f'replica_{index}'
+    DATABASES[alias] = dict(
+        DATABASES['default'], HOST=host.strip(), TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.db.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
+# Must be shared by all processes, see core.db.routers.
+REPLICA_PIN_CACHE_ALIAS = 'default'
+
+
+# Caches
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
     }
 }
 
+# Cached responses and ETags rely on version stamps in RESPONSE_CACHE_ALIAS,
+# which must be a cache all processes share (see core.cache). Startup fails
+# if it is process-local, like the LocMem default, unless
+# ALLOW_PROCESS_LOCAL_CACHE says a single process serves requests.
+RESPONSE_CACHE_ENABLED = bool(int(os.environ.get('RESPONSE_CACHE', 1)))
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 300))
+ALLOW_PROCESS_LOCAL_CACHE = bool(
+    int(os.environ.get('ALLOW_PROCESS_LOCAL_CACHE', 1)))
+
+
+# Password hashing
+# https://docs.djangoproject.com/en/3.2/topics/auth/passwords/
+
+# New passwords use Argon2, or bcrypt, when their libraries are installed
+# and PBKDF2 otherwise; older hashes are upgraded on login. Passwords are
+# checked in PASSWORD_HASH_WORKERS processes (0 checks them in the request
+# thread) and ASGI logins wait in ASYNC_LOGIN_THREADS threads.
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'core.passwords.Argon2PasswordHasher',
+]
+for module, hasher in [
+    ('bcrypt', 'django.contrib.auth.hashers.BCryptSHA256PasswordHasher'),
+    ('argon2', 'core.passwords.Argon2PasswordHasher'),
+]:
+    if importlib.util.find_spec(module) is not None:
+        PASSWORD_HASHERS.remove(hasher)
+        PASSWORD_HASHERS.insert(0, hasher)
+
+PASSWORD_ARGON2 = {
+    'TIME_COST': int(os.environ.get('ARGON2_TIME_COST', 2)),
+    'MEMORY_COST': int(os.environ.get('ARGON2_MEMORY_COST', 65536)),
+}
+
+AUTHENTICATION_BACKENDS = ['core.passwords.PooledModelBackend']
+
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+ASYNC_LOGIN_THREADS = int(os.environ.get('ASYNC_LOGIN_THREADS', 8))
+
+# Tests hash in process, so the hasher settings they override apply.
+TEST_RUNNER = 'core.runners.TestRunner'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -142,6 +236,48 @@ GROUP_MODEL = 'core.Group'
 SUBGROUP_MODEL = 'core.SubGroup'
 EVENT_MODEL = 'core.Event'
 
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': int(os.environ.get('TOKEN_AUTH_CACHE_SIZE', 10000)),
+    'TTL': int(os.environ.get('TOKEN_AUTH_CACHE_TTL', 60)),
+}
+
+REQUEST_METRICS_ENABLED = bool(int(os.environ.get('REQUEST_METRICS', 1)))
+# A directory shared by the worker processes, so that /api/metrics/ shows
+# all of them rather than the one that served the scrape; see
+# core.metrics.
+METRICS_DIR = os.environ.get('METRICS_DIR') or None
+METRICS_FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', 1))
+
+ASYNC_READ_THREADS = int(os.environ.get('ASYNC_READ_THREADS', 8))
+# Threads producing streamed exports and feeds under ASGI, each holding a
+# database connection while its stream runs; see core.streaming.
+STREAM_THREADS = int(os.environ.get('STREAM_THREADS', 4))
+
+# Token-bucket rate limits per client IP, API token and user, plus a
+# stricter per-IP limit on the login endpoint. Buckets are kept in each
+# process unless THROTTLE_CACHE_ALIAS names a shared cache from CACHES.
+# NUM_PROXIES is the number of proxies in front of the app whose
+# X-Forwarded-For entries are trusted.
+THROTTLE = {
+    'ENABLED': bool(int(os.environ.get('THROTTLE', 1))),
+    'RATES': {
+        'ip': os.environ.get('THROTTLE_IP_RATE', '1200/min'),
+        'token': os.environ.get('THROTTLE_TOKEN_RATE', '600/min'),
+        'user': os.environ.get('THROTTLE_USER_RATE', '1200/min'),
+        'login': os.environ.get('THROTTLE_LOGIN_RATE', '20/min'),
+    },
+    'NUM_PROXIES': int(os.environ.get('THROTTLE_NUM_PROXIES', 0)),
+    'CACHE_ALIAS': os.environ.get('THROTTLE_CACHE_ALIAS') or None,
+    'MAX_KEYS': int(os.environ.get('THROTTLE_MAX_KEYS', 100000)),
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.KeysetPagination',
+    'DEFAULT_THROTTLE_CLASSES': ['core.throttling.UserRateThrottle'],
+    'PAGE_SIZE': 100,
 }
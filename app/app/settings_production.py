@@ -0,0 +1,79 @@
+"""
+Production settings for app project.
+
+Use with `DJANGO_SETTINGS_MODULE=app.settings_production`. Everything not
+set here comes from `app.settings`; secrets and hosts come from the
+environment.
+"""
+import os
+
+from app.settings import *  # noqa: F401,F403
+from app.settings import REST_FRAMEWORK, THROTTLE
+
+
+SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
+
+# With DEBUG off Django no longer keeps every executed query in
+# `connection.queries`.
+DEBUG = False
+
+ALLOWED_HOSTS = [
+    host.strip()
+    for host in os.environ.get('ALLOWED_HOSTS', '').split(',')
+    if host.strip()
+]
+
+# Several workers serve requests, so caches must be shared; see
+# core.cache.check_shared. The response cache and ETags, the replica pin
+# and the throttle buckets all use the default cache, in Memcached.
+ALLOW_PROCESS_LOCAL_CACHE = False
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.memcached.PyMemcacheCache',
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'cache:11211'),
+    }
+}
+
+RESPONSE_CACHE_ALIAS = 'default'
+
+THROTTLE = dict(
+    THROTTLE,
+    CACHE_ALIAS=os.environ.get('THROTTLE_CACHE_ALIAS', 'default'),
+)
+
+# Every gunicorn worker starts its own pool of PASSWORD_HASH_WORKERS
+# processes on its first login, so the server runs up to
+# WEB_CONCURRENCY * (1 + PASSWORD_HASH_WORKERS) processes, e.g. 12 with
+# 4 workers and the default 2. Size WEB_CONCURRENCY with that in mind, or
+# set PASSWORD_HASH_WORKERS=0 to hash in the request thread.
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+
+STATIC_ROOT = os.environ.get('STATIC_ROOT', '/vol/web/static')
+
+# The gunicorn workers merge their metrics through this directory.
+METRICS_DIR = os.environ.get('METRICS_DIR', '/vol/web/metrics')
+
+REST_FRAMEWORK = dict(
+    REST_FRAMEWORK,
+    DEFAULT_RENDERER_CLASSES=['core.renderers.FastJSONRenderer'],
+)
+
+SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
+SESSION_COOKIE_SECURE = True
+CSRF_COOKIE_SECURE = True
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': os.environ.get('LOG_LEVEL', 'WARNING'),
+    },
+}
@@ -20,6 +20,14 @@ from drf_spectacular.views import (
 from django.contrib import admin
 from django.urls import path, include
 
+from core.asyncviews import async_read_view
+from core.views import (
+    EventReportView,
+    ExportView,
+    MetricsView,
+    SearchView,
+)
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),
@@ -30,5 +38,22 @@ urlpatterns = [
     ),
     path('api/user/', include('user.urls')),
     path('api/venue/', include('venue.urls')),
-    path('api/group/', include('group.urls'))
+    path('api/group/', include('group.urls')),
+    path('api/event/', include('event.urls')),
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),
+    path(
+        'api/export/<str:resource>/',
+        async_read_view(ExportView.as_view()),
+        name='export',
+    ),
+    path(
+        'api/search/',
+        async_read_view(SearchView.as_view()),
+        name='search',
+    ),
+    path(
+        'api/reports/events/',
+        async_read_view(EventReportView.as_view()),
+        name='event-report',
+    ),
 ]
@@ -0,0 +1,50 @@
+"""
+Benchmark helpers.
+
+Benchmarks are plain scripts run from the `app` directory against a
+throwaway test database, for example:
+
+    python -m benchmarks.bench_event_range --rows 1000000
+"""
+import contextlib
+import os
+import statistics
+import time
+
+import django
+
+
+def setup():
+    """Configure Django for a standalone benchmark script."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+    django.setup()
+
+
+@contextlib.contextmanager
+def test_database():
+    """Create the test databases and tear them down afterwards."""
+    from django.test.runner import DiscoverRunner
+
+    runner = DiscoverRunner(verbosity=0, interactive=False)
+    runner.setup_test_environment()
+    old_config = runner.setup_databases()
+    try:
+        yield
+    finally:
+        runner.teardown_databases(old_config)
+        runner.teardown_test_environment()
+
+
+def measure(func, repeat=20):
+    """Call func repeat times and return (median, best) in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), min(timings)
+
+
+def report(label, seconds):
+    """Print a timing in milliseconds."""
+    print(f'{label:<40} {seconds * 1000:10.3f} ms')
@@ -0,0 +1,103 @@
+"""
+Benchmark calendar-month event queries on a large event table.
+
+    python -m benchmarks.bench_event_range --rows 1000000
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from benchmarks import measure, report, setup, test_database
+
+
+def seed(rows, venues, groups):
+    """Insert `rows` events spread over five years."""
+    from django.utils import timezone
+
+    from core.models import Event, Group, SubGroup, Venue
+
+    venue_pks = [
+        Venue.objects.create(venue_name=f'Venue {i}').pk
+        for i in range(venues)
+    ]
+    group_pks = [
+        Group.objects.create(group_name=f'Group {i}').pk
+        for i in range(groups)
+    ]
+    subgroup_pks = [
+        SubGroup.objects.create(group_id_id=pk, display_name='Main').pk
+        for pk in group_pks
+    ]
+
+    origin = timezone.make_aware(datetime(2022, 1, 1), timezone.utc)
+    span = int(timedelta(days=5 * 365).total_seconds())
+    batch = []
+    for i in range(rows):
+        group = random.randrange(groups)
+        batch.append(Event(
+            title=f'Event {i}',
+            duration=60,
+            datetime=origin + timedelta(seconds=random.randrange(span)),
+            venue_id_id=random.choice(venue_pks),
+            group_id_id=group_pks[group],
+            subgroup_id_id=subgroup_pks[group],
+        ))
+        if len(batch) == 10000:
+            Event.objects.bulk_create(batch)
+            batch = []
+    Event.objects.bulk_create(batch)
+    return venue_pks, group_pks
+
+
+def explain(queryset):
+    """Return the database query plan for queryset."""
+    from django.db import connection
+
+    sql, params = queryset.query.sql_with_params()
+    prefix = 'EXPLAIN ANALYZE ' if connection.vendor == 'postgresql' \
+        else 'EXPLAIN QUERY PLAN '
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql, params)
+        return '\n'.join(str(row) for row in cursor.fetchall())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--venues', type=int, default=200)
+    parser.add_argument('--groups', type=int, default=200)
+    args = parser.parse_args()
+
+    setup()
+    from django.db import connection
+    from django.utils import timezone
+
+    from core.models import Event
+
+    with test_database():
+        venue_pks, group_pks = seed(args.rows, args.venues, args.groups)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE core_event')
+
+        start = timezone.make_aware(datetime(2024, 3, 1), timezone.utc)
+        end = timezone.make_aware(datetime(2024, 4, 1), timezone.utc)
+        queries = {
+            'venue + month': Event.objects.filter(
+                venue_id=venue_pks[0], datetime__gte=start, datetime__lt=end),
+            'group + month': Event.objects.filter(
+                group_id=group_pks[0], datetime__gte=start, datetime__lt=end),
+            'month only': Event.objects.filter(
+                datetime__gte=start, datetime__lt=end),
+        }
+        print(f'{args.rows} events on {connection.vendor}')
+        for label, queryset in queries.items():
+            queryset = queryset.order_by('datetime', 'id')
+            median, best = measure(lambda: list(queryset.all()))
+            report(f'{label} (median)', median)
+            report(f'{label} (best)', best)
+            print(explain(queryset))
+
+
+if __name__ == '__main__':
+    main()
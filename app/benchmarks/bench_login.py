@@ -0,0 +1,58 @@
+"""
+Benchmark password checks per second, inline and in the hash pool.
+
+    python -m benchmarks.bench_login --checks 200 --clients 8
+
+Each installed hasher is checked by `--clients` threads at once, first in
+the calling process and then in `PASSWORD_HASH_WORKERS` worker
+processes. Per core figures divide by the number of processes hashing.
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import setup
+
+
+def run(check, encoded, checks, clients):
+    """Check the password checks times from clients threads; return /s."""
+    with ThreadPoolExecutor(max_workers=clients) as threads:
+        start = time.perf_counter()
+        results = list(threads.map(
+            lambda _: check('password123', encoded), range(checks)))
+        elapsed = time.perf_counter() - start
+    assert all(valid for valid, _ in results)
+    return checks / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--checks', type=int, default=200)
+    parser.add_argument('--clients', type=int, default=8)
+    args = parser.parse_args()
+
+    setup()
+    from django.conf import settings
+    from django.contrib.auth.hashers import get_hashers
+
+    from core import hashing, passwords
+
+    workers = settings.PASSWORD_HASH_WORKERS
+    print(f'{args.clients} clients, {workers} hash workers')
+    for hasher in get_hashers():
+        try:
+            encoded = hasher.encode('password123', hasher.salt())
+        except ValueError:
+            continue
+        inline = run(hashing.check, encoded, args.checks, args.clients)
+        passwords.check_password('password123', encoded)  # start workers
+        pooled = run(
+            passwords.check_password, encoded, args.checks, args.clients)
+        print(f'{hasher.algorithm:<24} inline {inline:8.1f}/s '
+              f'pooled {pooled:8.1f}/s '
+              f'({pooled / max(workers, 1):.1f}/s per core)')
+    passwords.shutdown_hash_pool()
+
+
+if __name__ == '__main__':
+    main()
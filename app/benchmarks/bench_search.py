@@ -0,0 +1,88 @@
+"""
+Benchmark /api/search/ queries on a large event table.
+
+    python -m benchmarks.bench_search --rows 1000000
+"""
+import argparse
+import random
+import statistics
+import time
+
+from benchmarks import report, setup, test_database
+
+
+WORDS = (
+    'jazz blues folk opera choir quartet recital rehearsal gala brunch '
+    'strings brass piano organ matinee festival premiere workshop '
+    'orchestra chamber'
+).split()
+
+
+def seed(rows, venues):
+    """Insert `rows` events with titles and descriptions from WORDS."""
+    from core.models import Event, Group, SubGroup, Venue
+
+    venue_pks = [
+        Venue.objects.create(venue_name=f'{random.choice(WORDS)} hall').pk
+        for _ in range(venues)
+    ]
+    group = Group.objects.create(group_name='Group')
+    subgroup = SubGroup.objects.create(group_id=group)
+    batch = []
+    for i in range(rows):
+        batch.append(Event(
+            title=' '.join(random.sample(WORDS, 3)),
+            description=' '.join(random.choices(WORDS, k=12)),
+            venue_id_id=random.choice(venue_pks),
+            group_id=group,
+            subgroup_id=subgroup,
+        ))
+        if len(batch) == 10000:
+            Event.objects.bulk_create(batch)
+            batch = []
+    Event.objects.bulk_create(batch)
+
+
+def percentile(timings, percent):
+    return statistics.quantiles(timings, n=100)[percent - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--venues', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    setup()
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from rest_framework.test import APIClient
+
+    with test_database():
+        seed(args.rows, args.venues)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE core_event')
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_user(
+            email='bench@example.com', password='password', is_staff=True))
+
+        print(f'{args.rows} events on {connection.vendor}')
+        queries = {
+            'one term': 'premiere',
+            'two terms': 'chamber matinee',
+            'three terms': 'jazz piano festival',
+        }
+        for label, text in queries.items():
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                client.get('/api/search/', {'q': text, 'page_size': 20})
+                timings.append(time.perf_counter() - start)
+            report(f'{label} (median)', statistics.median(timings))
+            report(f'{label} (p95)', percentile(timings, 95))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Benchmark venue list serialization: ModelSerializer + JSONRenderer versus
+the `.values()` fast path + FastJSONRenderer.
+
+    python -m benchmarks.bench_serialization --sizes 1000 10000 100000
+"""
+import argparse
+
+from benchmarks import measure, report, setup, test_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup()
+    from rest_framework.renderers import JSONRenderer
+
+    from core.models import Venue
+    from core.renderers import FastJSONRenderer
+    from venue.serializers import VenueSerializer
+
+    fields = list(VenueSerializer().fields)
+
+    with test_database():
+        for size in args.sizes:
+            Venue.objects.all().delete()
+            Venue.objects.bulk_create(
+                (
+                    Venue(venue_name=f'Venue {i}', address=f'{i} Main St')
+                    for i in range(size)
+                ),
+                batch_size=5000,
+            )
+            queryset = Venue.objects.order_by('-id')
+
+            def serializer_path():
+                data = VenueSerializer(queryset.all(), many=True).data
+                return JSONRenderer().render(data)
+
+            def fast_path():
+                data = list(queryset.values(*fields))
+                return FastJSONRenderer().render(data)
+
+            assert serializer_path() == fast_path()
+            for label, func in [
+                ('serializer', serializer_path),
+                ('values + orjson', fast_path),
+            ]:
+                median, _ = measure(func, repeat=args.repeat)
+                report(f'{size:>7} rows {label}', median)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark server startup time and steady-state throughput.
+
+Starts gunicorn with `gunicorn.conf.py` for each worker count, with and
+without app preloading, and reports the time until the first response
+and the requests per second under load:
+
+    python -m benchmarks.bench_server --workers 1,2,4 --concurrency 32
+
+The server runs in a subprocess against the test database created here,
+so the database must be reachable from both (e.g. the Postgres service
+from docker-compose); an in-memory SQLite database will not do.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks import setup, test_database
+from benchmarks.load_test import drive, http_requester
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(port, timeout):
+    """Return seconds until the server answers any HTTP request."""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        try:
+            with socket.create_connection(('127.0.0.1', port), 0.5) as sock:
+                sock.sendall(
+                    b'GET /api/venue/venues/ HTTP/1.1\r\n'
+                    b'Host: localhost\r\nConnection: close\r\n\r\n')
+                if sock.recv(12).startswith(b'HTTP/1.1'):
+                    return time.perf_counter() - start
+        except OSError:
+            pass
+        time.sleep(0.02)
+    raise RuntimeError(f'server did not start within {timeout}s')
+
+
+def start_server(port, workers, preload, worker_class, settings_module):
+    from django.db import connection
+
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE=settings_module,
+        DB_NAME=connection.settings_dict['NAME'],
+        WEB_CONCURRENCY=str(workers),
+        GUNICORN_PRELOAD='1' if preload else '0',
+        GUNICORN_WORKER_CLASS=worker_class,
+        GUNICORN_BIND=f'127.0.0.1:{port}',
+    )
+    env.setdefault('DJANGO_SECRET_KEY', 'benchmark')
+    env.setdefault('ALLOWED_HOSTS', 'localhost,127.0.0.1')
+    return subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def seed(rows):
+    from django.contrib.auth import get_user_model
+    from rest_framework.authtoken.models import Token
+
+    from core.models import Venue
+
+    user = get_user_model().objects.create_user(
+        email='bench@example.com', password='password123')
+    Venue.objects.bulk_create(
+        Venue(venue_name=f'Venue {i}', primary_contact=user)
+        for i in range(rows))
+    return Token.objects.create(user=user).key
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--workers', default='1,2,4')
+    parser.add_argument(
+        '--worker-class', default='uvicorn', help='uvicorn or gthread')
+    parser.add_argument('--settings', default='app.settings_production')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--rows', type=int, default=100)
+    parser.add_argument('--timeout', type=float, default=60.0)
+    args = parser.parse_args()
+
+    setup()
+    with test_database():
+        token = seed(args.rows)
+        paths = ['/api/venue/venues/']
+        for workers in (int(n) for n in args.workers.split(',')):
+            for preload in (True, False):
+                port = free_port()
+                server = start_server(
+                    port, workers, preload, args.worker_class, args.settings)
+                try:
+                    startup = wait_until_up(port, args.timeout)
+                    rps, p50, p99 = asyncio.run(drive(
+                        http_requester(f'http://127.0.0.1:{port}', token),
+                        paths, args.concurrency, args.duration,
+                    ))
+                finally:
+                    server.terminate()
+                    server.wait()
+                mode = 'on' if preload else 'off'
+                label = f'{workers} workers, preload {mode}'
+                print(
+                    f'{label:<28} startup {startup:6.2f} s'
+                    f'  {rps:9.1f} req/s  p50 {p50 * 1000:7.2f} ms'
+                    f'  p99 {p99 * 1000:7.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark venue list throughput with plain and cached token auth.
+
+    python -m benchmarks.bench_token_auth --requests 2000
+"""
+import argparse
+import time
+
+from benchmarks import setup, test_database
+
+
+def run(client, url, headers, requests):
+    """Issue requests GETs and return requests per second."""
+    start = time.perf_counter()
+    for _ in range(requests):
+        res = client.get(url, **headers)
+        assert res.status_code == 200, res.status_code
+    return requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--venues', type=int, default=20)
+    args = parser.parse_args()
+
+    setup()
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+    from rest_framework.authentication import TokenAuthentication
+    from rest_framework.authtoken.models import Token
+
+    from core.authentication import CachedTokenAuthentication
+    from core.models import Venue
+    from venue.views import VenueViewSet
+
+    with test_database():
+        user = get_user_model().objects.create_user(
+            email='bench@example.com', password='password123')
+        token = Token.objects.create(user=user)
+        Venue.objects.bulk_create(
+            Venue(venue_name=f'Venue {i}', primary_contact=user)
+            for i in range(args.venues)
+        )
+        client = Client()
+        headers = {'HTTP_AUTHORIZATION': f'Token {token.key}'}
+        url = '/api/venue/venues/'
+
+        for label, auth_class in [
+            ('TokenAuthentication', TokenAuthentication),
+            ('CachedTokenAuthentication', CachedTokenAuthentication),
+        ]:
+            VenueViewSet.authentication_classes = [auth_class]
+            run(client, url, headers, 50)
+            rps = run(client, url, headers, args.requests)
+            print(f'{label:<30} {rps:10.1f} req/s')
+
+
+if __name__ == '__main__':
+    main()
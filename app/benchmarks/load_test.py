@@ -0,0 +1,230 @@
+"""
+Load test the read API at increasing concurrency.
+
+By default the ASGI application is driven in-process against a throwaway
+test database, once with the async read views and once with the plain
+synchronous views, which Django 3.2 runs on a single thread under ASGI:
+
+    python -m benchmarks.load_test --db-latency 2
+
+`--db-latency` adds a simulated round trip to every query, so a local
+SQLite database behaves like a networked Postgres. To load a running
+server instead (e.g. `uvicorn app.asgi:application`):
+
+    python -m benchmarks.load_test --url http://localhost:8000 --token KEY
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from benchmarks import setup, test_database
+
+
+PATHS = ['/api/venue/venues/', '/api/group/groups/', '/api/event/events/']
+
+
+async def drive(request, paths, concurrency, duration):
+    """Run concurrency workers for duration seconds.
+
+    Return (requests per second, p50, p99 latency in seconds).
+    """
+    latencies = []
+    deadline = time.perf_counter() + duration
+
+    async def worker(offset):
+        index = offset
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            status = await request(paths[index % len(paths)])
+            assert status == 200, status
+            latencies.append(time.perf_counter() - start)
+            index += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return len(latencies) / elapsed, statistics.median(latencies), p99
+
+
+def asgi_requester(application, token):
+    """Return a coroutine issuing a GET to an in-process ASGI app."""
+    headers = [
+        (b'host', b'testserver'),
+        (b'authorization', f'Token {token}'.encode()),
+    ]
+
+    async def request(path):
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': b'',
+            'headers': headers,
+            'client': ('127.0.0.1', 0),
+            'server': ('testserver', 80),
+        }
+        status = None
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+
+        await application(scope, receive, send)
+        return status
+
+    return request
+
+
+def http_requester(base_url, token):
+    """Return a coroutine issuing a GET to a running server."""
+    url = urlsplit(base_url)
+    host, port = url.hostname, url.port or 80
+
+    async def request(path):
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write((
+            f'GET {path} HTTP/1.1\r\n'
+            f'Host: {url.netloc}\r\n'
+            f'Authorization: Token {token}\r\n'
+            'Connection: close\r\n\r\n'
+        ).encode())
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        await reader.read()
+        writer.close()
+        return status
+
+    return request
+
+
+def add_db_latency(seconds):
+    """Sleep before every query, on every connection."""
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+
+    def delay(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def install(connection, **kwargs):
+        if delay not in connection.execute_wrappers:
+            connection.execute_wrappers.append(delay)
+
+    connection_created.connect(install, weak=False)
+    for connection in connections.all():
+        install(connection)
+
+
+def use_sync_views():
+    """Swap the async read views back to the wrapped sync views."""
+    from django.urls import get_resolver
+
+    def unwrap(patterns):
+        for pattern in patterns:
+            if hasattr(pattern, 'url_patterns'):
+                unwrap(pattern.url_patterns)
+            elif hasattr(pattern.callback, '__wrapped__'):
+                pattern.callback = pattern.callback.__wrapped__
+
+    unwrap(get_resolver().url_patterns)
+
+
+def seed(rows):
+    """Create a user with a token and rows of each resource."""
+    from django.contrib.auth import get_user_model
+    from rest_framework.authtoken.models import Token
+
+    from core.models import Event, Group, SubGroup, Venue
+
+    user = get_user_model().objects.create_user(
+        email='load@example.com', password='password123', is_staff=True)
+    Venue.objects.bulk_create(
+        Venue(venue_name=f'Venue {i}', primary_contact=user)
+        for i in range(rows))
+    Group.objects.bulk_create(
+        Group(group_name=f'Group {i}', primary_contact=user)
+        for i in range(rows))
+    venue = Venue.objects.first()
+    group = Group.objects.first()
+    subgroup = SubGroup.objects.create(
+        display_name='Subgroup', group_id=group)
+    Event.objects.bulk_create(
+        Event(
+            title=f'Event {i}', venue_id=venue, group_id=group,
+            subgroup_id=subgroup,
+        )
+        for i in range(rows))
+    return Token.objects.create(user=user).key
+
+
+def run_levels(request, levels, duration):
+    for concurrency in levels:
+        rps, p50, p99 = asyncio.run(
+            drive(request, PATHS, concurrency, duration))
+        print(
+            f'  concurrency {concurrency:>4}  {rps:10.1f} req/s'
+            f'  p50 {p50 * 1000:8.2f} ms  p99 {p99 * 1000:8.2f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--url', help='load a running server instead')
+    parser.add_argument('--token', help='auth token for --url')
+    parser.add_argument(
+        '--concurrency', default='1,4,16,64',
+        help='comma separated concurrency levels')
+    parser.add_argument(
+        '--duration', type=float, default=5.0,
+        help='seconds per concurrency level')
+    parser.add_argument('--rows', type=int, default=20)
+    parser.add_argument(
+        '--db-latency', type=float, default=0.0,
+        help='simulated milliseconds per query (in-process only)')
+    args = parser.parse_args()
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    if args.url:
+        print(args.url)
+        run_levels(http_requester(args.url, args.token), levels, args.duration)
+        return
+
+    setup()
+    from django.conf import settings
+    from django.core.asgi import get_asgi_application
+
+    from core.cache import get_cache
+
+    settings.RESPONSE_CACHE_TIMEOUT = 0
+    application = get_asgi_application()
+    with test_database():
+        token = seed(args.rows)
+        if args.db_latency:
+            add_db_latency(args.db_latency / 1000)
+        request = asgi_requester(application, token)
+
+        get_cache().clear()
+        print(f'async read views ({settings.ASYNC_READ_THREADS} threads)')
+        run_levels(request, levels, args.duration)
+
+        use_sync_views()
+        print('sync views')
+        run_levels(request, levels, args.duration)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+"""
+Which venues and events non-staff users may see.
+
+A user sees the venues they are the contact for, the venues whose
+contact shares a group with them, the events at those venues and the
+events of their groups. Users belong to the groups named by their
+`user_org`.
+
+Both relations are kept as rows rather than worked out per request:
+`Membership` holds (user, group) pairs, and `VenueAccess` the (user,
+venue) pairs. Signals update them as users, groups and venues change.
+Scoped lists then read a single index range, and detail views check
+permission within the same query that fetches the object.
+
+Every function here diffs the rows it is given against what they should
+be, so it is safe to run again, and invalidates the cached responses of
+the users whose access changed.
+"""
+from django.db.models import Q
+
+from core import cache
+from core.models import Event, Group, Membership, User, Venue, VenueAccess
+
+
+def is_unscoped(user):
+    return user.is_staff or user.is_superuser
+
+
+def visible_venues(queryset, user):
+    """Filter a venue queryset to the venues user may see."""
+    if is_unscoped(user):
+        return queryset
+    return queryset.filter(access__user=user)
+
+
+def event_scope(user, venue='venue_id', group='group_id'):
+    """Return a filter for rows of the events user may see.
+
+    `venue` and `group` name the rows' venue and group fields.
+    """
+    venues = VenueAccess.objects.filter(user=user).values('venue')
+    groups = Membership.objects.filter(user=user).values('group')
+    return Q(**{f'{venue}__in': venues}) | Q(**{f'{group}__in': groups})
+
+
+def visible_events(queryset, user):
+    """Filter an event queryset to the events user may see."""
+    if is_unscoped(user):
+        return queryset
+    return queryset.filter(event_scope(user))
+
+
+def event_viewers(event):
+    """Return the pks of the non-staff users who may see event."""
+    return set(VenueAccess.objects.filter(
+        venue=event.venue_id_id,
+    ).values_list('user', flat=True).union(Membership.objects.filter(
+        group=event.group_id_id,
+    ).values_list('user', flat=True)))
+
+
+def venue_viewers(venue_pks):
+    """Return the pks of the non-staff users who may see the venues."""
+    return set(VenueAccess.objects.filter(
+        venue__in=venue_pks).values_list('user', flat=True))
+
+
+def invalidate_users(user_pks):
+    """Invalidate the cached venue and event lists of the users."""
+    parts = [cache.user_scope(pk) for pk in user_pks]
+    if parts:
+        cache.invalidate(Venue, parts)
+        cache.invalidate(Event, parts)
+
+
+def _sync(model, existing, wanted, first, second):
+    """Insert and delete rows of model so existing holds just wanted.
+
+    `wanted` is a set of (first, second) pk pairs. Return the pairs
+    added and removed.
+    """
+    rows = {
+        (a, b): pk
+        for pk, a, b in existing.values_list('pk', first, second)
+    }
+    added = wanted - rows.keys()
+    removed = rows.keys() - wanted
+    if removed:
+        model.objects.filter(
+            pk__in=[rows[pair] for pair in removed]).delete()
+    if added:
+        model.objects.bulk_create([
+            model(**{f'{first}_id': a, f'{second}_id': b})
+            for a, b in added
+        ], ignore_conflicts=True)
+    return added, removed
+
+
+def refresh_user_access(user_pks):
+    """Recompute the venues the users may see.
+
+    Return the pks of the users whose access changed.
+    """
+    user_pks = list(user_pks)
+    if not user_pks:
+        return set()
+    wanted = set(Venue.objects.filter(
+        primary_contact__in=user_pks,
+    ).values_list('primary_contact', 'pk'))
+    # The venues of everyone sharing a group with each user.
+    wanted |= set(Membership.objects.filter(
+        user__in=user_pks,
+        group__memberships__user__venue__isnull=False,
+    ).values_list('user', 'group__memberships__user__venue'))
+    added, removed = _sync(
+        VenueAccess, VenueAccess.objects.filter(user__in=user_pks),
+        wanted, 'user', 'venue')
+    changed = {user for user, _ in added | removed}
+    invalidate_users(changed)
+    return changed
+
+
+def refresh_venue_access(venue_pks):
+    """Recompute the users who may see the venues.
+
+    Return the pks of the users who could see any of them before or
+    after, whose cached lists may include them.
+    """
+    venue_pks = list(venue_pks)
+    if not venue_pks:
+        return set()
+    venues = Venue.objects.filter(pk__in=venue_pks)
+    wanted = set(venues.filter(
+        primary_contact__isnull=False,
+    ).values_list('primary_contact', 'pk'))
+    peers = 'primary_contact__memberships__group__memberships__user'
+    wanted |= set(venues.filter(
+        **{f'{peers}__isnull': False},
+    ).values_list(peers, 'pk'))
+    added, removed = _sync(
+        VenueAccess, VenueAccess.objects.filter(venue__in=venue_pks),
+        wanted, 'user', 'venue')
+    invalidate_users({user for user, _ in added | removed})
+    return {user for user, _ in wanted | removed}
+
+
+def _sync_memberships(existing, wanted):
+    """Apply membership changes and refresh the access they affect."""
+    added, removed = _sync(Membership, existing, wanted, 'user', 'group')
+    if not added and not removed:
+        return set()
+    # Joining or leaving a group changes what the user sees, and what
+    # everyone else in the group sees of the user's venues.
+    groups = {group for _, group in added | removed}
+    users = {user for user, _ in added | removed}
+    users.update(Membership.objects.filter(
+        group__in=groups).values_list('user', flat=True))
+    return refresh_user_access(users)
+
+
+def sync_user_memberships(user):
+    """Make user a member of exactly the groups named by `user_org`."""
+    groups = []
+    if user.user_org:
+        groups = Group.objects.filter(
+            group_name=user.user_org).values_list('pk', flat=True)
+    return _sync_memberships(
+        Membership.objects.filter(user=user),
+        {(user.pk, group) for group in groups},
+    )
+
+
+def sync_group_memberships(group):
+    """Make the users whose `user_org` names group its members."""
+    users = []
+    if group.group_name:
+        users = User.objects.filter(
+            user_org=group.group_name).values_list('pk', flat=True)
+    return _sync_memberships(
+        Membership.objects.filter(group=group),
+        {(user, group.pk) for user in users},
+    )
+
+
+def sync_groups_memberships(group_pks):
+    """Like `sync_group_memberships`, for the groups with the given pks."""
+    group_pks = list(group_pks)
+    names = {
+        pk: name
+        for pk, name in Group.objects.filter(
+            pk__in=group_pks).values_list('pk', 'group_name')
+        if name
+    }
+    members = {}
+    for pk, org in User.objects.filter(
+            user_org__in=set(names.values())).values_list('pk', 'user_org'):
+        members.setdefault(org, []).append(pk)
+    return _sync_memberships(
+        Membership.objects.filter(group__in=group_pks),
+        {
+            (user, group)
+            for group, name in names.items()
+            for user in members.get(name, ())
+        },
+    )
+
+
+def rebuild(batch_size=1000):
+    """Recompute every membership and venue access row.
+
+    Users are processed batch_size at a time. Return the number of
+    users whose access changed.
+    """
+    names = {}
+    for pk, name in Group.objects.values_list('pk', 'group_name'):
+        names.setdefault(name, []).append(pk)
+    user_pks = list(User.objects.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(user_pks), batch_size):
+        batch = user_pks[start:start + batch_size]
+        wanted = {
+            (pk, group)
+            for pk, org in User.objects.filter(
+                pk__in=batch).values_list('pk', 'user_org')
+            for group in names.get(org, ()) if org
+        }
+        _sync(
+            Membership, Membership.objects.filter(user__in=batch),
+            wanted, 'user', 'group')
+    changed = set()
+    for start in range(0, len(user_pks), batch_size):
+        changed |= refresh_user_access(user_pks[start:start + batch_size])
+    return len(changed)
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from core import cache, signals  # noqa: F401
+        from core.db import routers
+        cache.check_settings()
+        routers.check_settings()
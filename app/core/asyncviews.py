@@ -0,0 +1,123 @@
+"""
+Async entry points for the read-only API views.
+
+Under ASGI, Django 3.2 runs every synchronous view on one shared thread,
+so a server handles a single request at a time no matter how many
+connections it holds. The views wrapped here are async: safe requests run
+the regular DRF view in a bounded pool of `ASYNC_READ_THREADS` threads,
+each with its own database connection, and the response is rendered
+there as well. Writes keep Django's default thread-sensitive handling,
+except logins, which get a pool of `ASYNC_LOGIN_THREADS` threads.
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.routers import DefaultRouter
+
+from core.middleware import render_response
+
+
+_executors = {}
+_executor_lock = threading.Lock()
+
+
+def _get_executor(name, setting, default):
+    executor = _executors.get(name)
+    if executor is None:
+        with _executor_lock:
+            executor = _executors.get(name)
+            if executor is None:
+                executor = _executors[name] = ThreadPoolExecutor(
+                    max_workers=getattr(settings, setting, default),
+                    thread_name_prefix=name,
+                )
+    return executor
+
+
+def get_executor():
+    """Return the thread pool that serves async reads."""
+    return _get_executor('async-read', 'ASYNC_READ_THREADS', 8)
+
+
+def get_login_executor():
+    """Return the thread pool that serves logins."""
+    return _get_executor('async-login', 'ASYNC_LOGIN_THREADS', 8)
+
+
+def get_stream_executor():
+    """Return the thread pool that produces streamed responses."""
+    return _get_executor('stream', 'STREAM_THREADS', 4)
+
+
+def _run_view(view, request, args, kwargs):
+    close_old_connections()
+    try:
+        return render_response(view(request, *args, **kwargs))
+    finally:
+        close_old_connections()
+
+
+def async_read_view(view):
+    """Wrap a sync view so ASGI reads run in the read thread pool.
+
+    Other requests, including every request served over WSGI or by the
+    test client, call the view on Django's thread-sensitive executor as
+    if it were still synchronous.
+    """
+    sync_view = sync_to_async(view)
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if not isinstance(request, ASGIRequest) or \
+                request.method not in SAFE_METHODS:
+            return await sync_view(request, *args, **kwargs)
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            get_executor(),
+            functools.partial(
+                context.run, _run_view, view, request, args, kwargs),
+        )
+
+    return wrapper
+
+
+def async_login_view(view):
+    """Wrap the login view so ASGI logins run in the login thread pool.
+
+    Logins would otherwise queue on the one thread Django shares between
+    synchronous views. In the pool a login only waits while its password
+    is checked in the hash process pool (see `core.passwords`), so slow
+    hashing holds neither the shared thread nor the GIL.
+    """
+    sync_view = sync_to_async(view)
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if not isinstance(request, ASGIRequest):
+            return await sync_view(request, *args, **kwargs)
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            get_login_executor(),
+            functools.partial(
+                context.run, _run_view, view, request, args, kwargs),
+        )
+
+    return wrapper
+
+
+class AsyncReadRouter(DefaultRouter):
+    """`DefaultRouter` whose views are wrapped with `async_read_view`."""
+
+    def get_urls(self):
+        urls = super().get_urls()
+        for url in urls:
+            url.callback = async_read_view(url.callback)
+        return urls
@@ -0,0 +1,119 @@
+"""
+Token authentication with an in-process cache.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication
+
+
+class TokenCache:
+    """Bounded, thread-safe LRU of token key -> (user, token) entries.
+
+    Entries expire `ttl` seconds after they are stored, which also bounds
+    how long another process can serve a token after it is revoked.
+    """
+
+    def __init__(self, max_size=10000, ttl=60, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the cached (user, token) for key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user, token, expires = entry
+            if expires <= self.clock():
+                self._pop(key)
+                return None
+            self._entries.move_to_end(key)
+        return copy.copy(user), token
+
+    def set(self, key, user, token):
+        """Cache (user, token) for key, evicting the oldest entries."""
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (user, token, self.clock() + self.ttl)
+            self._keys_by_user.setdefault(user.pk, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._pop(next(iter(self._entries)))
+
+    def discard(self, key):
+        """Forget a single token."""
+        with self._lock:
+            self._pop(key)
+
+    def discard_user(self, user_pk):
+        """Forget every token belonging to a user."""
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_pk, ())):
+                self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._keys_by_user.get(entry[0].pk)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[entry[0].pk]
+
+
+def _build_cache():
+    options = getattr(settings, 'TOKEN_AUTH_CACHE', {})
+    return TokenCache(
+        max_size=options.get('MAX_SIZE', 10000),
+        ttl=options.get('TTL', 60),
+    )
+
+
+token_cache = _build_cache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Drop-in `TokenAuthentication` that skips the Token/User join for
+    recently seen tokens. Entries are dropped by signal handlers when the
+    token is deleted or its user is saved (e.g. deactivated).
+    """
+    cache = token_cache
+
+    def authenticate_credentials(self, key):
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        user, token = super().authenticate_credentials(key)
+        self.cache.set(key, user, token)
+        return copy.copy(user), token
+
+
+class QueryTokenAuthentication(CachedTokenAuthentication):
+    """Read the token from `?token=`.
+
+    Only for feeds consumed by clients that cannot send headers, such as
+    calendar apps subscribing to a URL.
+    """
+    query_param = 'token'
+
+    def authenticate(self, request):
+        key = request.query_params.get(self.query_param)
+        if not key:
+            return None
+        return self.authenticate_credentials(key)
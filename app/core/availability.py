@@ -0,0 +1,260 @@
+"""
+Venue availability and double booking checks.
+
+An event occupies its venue for the half-open interval [datetime, ends_at).
+Events without a datetime or with no duration occupy nothing. Bookings at
+a venue never overlap, which PostgreSQL enforces with the
+`event_venue_no_overlap` exclusion constraint, so the only single booking
+that can overlap a new interval is the last one starting before it ends.
+That is a single seek on the (venue, datetime) index, whatever the number
+of events.
+
+Recurring events occupy the venue at each occurrence. They are few, read
+from the `Recurrence` table, and only expanded for the window being
+checked. A new series is checked against other series for
+`RECURRENCE_CHECK_DAYS`, and against every later single booking however
+far ahead, see `series_conflict`.
+"""
+import bisect
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError
+from rest_framework.exceptions import ValidationError
+
+from core.models import EndTimeField, Event, Recurrence, Venue
+from core.recurrence import occurrences
+
+
+Interval = namedtuple('Interval', ['start', 'end', 'event'])
+
+# The name of the exclusion constraint added by migration 0009.
+OVERLAP_CONSTRAINT = 'event_venue_no_overlap'
+
+
+def get_check_days():
+    """Return how far ahead a recurring booking is checked, in days."""
+    return getattr(settings, 'RECURRENCE_CHECK_DAYS', 366)
+
+
+def _bookings(venue, exclude=None):
+    queryset = Event.objects.filter(
+        venue_id=venue, datetime__isnull=False, duration__gt=0,
+        recurrence__isnull=True)
+    if exclude is not None:
+        queryset = queryset.exclude(pk=exclude)
+    return queryset
+
+
+def series_intervals(venue, start, end, exclude=None):
+    """Yield the occurrences of recurring events overlapping [start, end).
+
+    Each series is yielded in order, one series after another.
+    """
+    series = Recurrence.objects.filter(
+        event__venue_id=venue, event__datetime__lt=end,
+        event__duration__gt=0,
+    )
+    if exclude is not None:
+        series = series.exclude(pk=exclude)
+    rows = series.values_list(
+        'pk', 'rule', 'event__datetime', 'event__duration')
+    for pk, rule, dtstart, duration in rows:
+        length = timedelta(minutes=duration)
+        for value in occurrences(rule, dtstart, start - length, end):
+            if value + length > start:
+                yield Interval(value, value + length, pk)
+
+
+def find_conflict(venue, intervals, exclude=None):
+    """Return the id of an event overlapping any of intervals at venue.
+
+    `intervals` are (start, end) pairs, and `exclude` is the id of an event
+    being moved, which cannot conflict with itself.
+    """
+    intervals = [(start, end) for start, end in intervals if end > start]
+    if not intervals:
+        return None
+    if len(intervals) > 1:
+        booked = IntervalSet()
+        for interval in busy_intervals(
+                venue, min(start for start, _ in intervals),
+                max(end for _, end in intervals), exclude):
+            booked.add(*interval)
+        for start, end in intervals:
+            conflict = booked.conflict(start, end)
+            if conflict is not None:
+                return conflict.event
+        return None
+    start, end = intervals[0]
+    latest = _bookings(venue, exclude).filter(datetime__lt=end) \
+        .order_by('-datetime').values_list('pk', 'ends_at').first()
+    if latest is not None and latest[1] > start:
+        return latest[0]
+    for interval in series_intervals(venue, start, end, exclude):
+        return interval.event
+    return None
+
+
+def series_conflict(venue, rule, intervals, exclude=()):
+    """Return the id of a single booking overlapping a series, or None.
+
+    `intervals` are the series' `booking()` intervals, and `exclude` the
+    ids of events being moved. Every single booking at venue from the
+    series' start on is checked, however far ahead, while the occurrences
+    of the series are walked in step with them, so the series is only
+    expanded as far as the last booking.
+    """
+    if not intervals:
+        return None
+    start, end = intervals[0]
+    length = end - start
+    bookings = _bookings(venue).exclude(pk__in=list(exclude))
+    fields = ('datetime', 'ends_at', 'pk')
+    rows = bookings.filter(datetime__gte=start).order_by('datetime') \
+        .values_list(*fields)
+    before = bookings.filter(datetime__lt=start).order_by('-datetime') \
+        .values_list(*fields).first()
+    if before is not None and before[1] > start:
+        return before[2]
+    series = occurrences(rule, start, start)
+    occurrence = next(series, None)
+    for booked_start, booked_end, pk in rows.iterator():
+        while occurrence is not None and \
+                occurrence + length <= booked_start:
+            occurrence = next(series, None)
+        if occurrence is None:
+            return None
+        if occurrence < booked_end:
+            return pk
+    return None
+
+
+def busy_intervals(venue, start, end, exclude=None):
+    """Return the bookings overlapping [start, end) at venue, by start."""
+    bookings = _bookings(venue, exclude)
+    fields = ('datetime', 'ends_at', 'pk')
+    intervals = [
+        Interval(*row)
+        for row in bookings.filter(datetime__gte=start, datetime__lt=end)
+        .order_by('datetime').values_list(*fields)
+    ]
+    before = bookings.filter(datetime__lt=start).order_by('-datetime') \
+        .values_list(*fields).first()
+    if before is not None and before[1] > start:
+        intervals.insert(0, Interval(*before))
+    intervals.extend(series_intervals(venue, start, end, exclude))
+    intervals.sort()
+    return intervals
+
+
+def free_intervals(busy, start, end, min_length=None):
+    """Return the gaps in [start, end) between sorted busy intervals.
+
+    Gaps shorter than the `min_length` timedelta are left out.
+    """
+    gaps, cursor = [], start
+    for interval in busy:
+        if interval.start > cursor:
+            gaps.append(Interval(cursor, min(interval.start, end), None))
+        cursor = max(cursor, interval.end)
+        if cursor >= end:
+            break
+    if cursor < end:
+        gaps.append(Interval(cursor, end, None))
+    if min_length is not None:
+        gaps = [gap for gap in gaps if gap.end - gap.start >= min_length]
+    return gaps
+
+
+class IntervalSet:
+    """Non-overlapping intervals kept sorted by start, in memory.
+
+    Used to check a batch of bookings against each other before any of
+    them is written. `conflict` and `add` cost O(log n) comparisons, and
+    `remove` a pass over the set.
+    """
+
+    def __init__(self):
+        self.starts = []
+        self.intervals = []
+
+    def conflict(self, start, end):
+        """Return the interval overlapping [start, end), or None."""
+        if start is None or end <= start:
+            return None
+        index = bisect.bisect_left(self.starts, end)
+        if index and self.intervals[index - 1].end > start:
+            return self.intervals[index - 1]
+        return None
+
+    def add(self, start, end, event=None):
+        """Add [start, end), which must not overlap the set."""
+        if start is None or end <= start:
+            return
+        index = bisect.bisect_left(self.starts, start)
+        self.starts.insert(index, start)
+        self.intervals.insert(index, Interval(start, end, event))
+
+    def remove(self, event):
+        """Remove and return the intervals of event."""
+        removed = [
+            interval for interval in self.intervals if interval.event == event]
+        if removed:
+            self.intervals = [
+                interval for interval in self.intervals
+                if interval.event != event]
+            self.starts = [interval.start for interval in self.intervals]
+        return removed
+
+
+def booking(attrs, instance=None):
+    """Return the (venue id, intervals) an event write would book.
+
+    `attrs` are the validated fields being written; anything missing comes
+    from `instance`, or from the model defaults for a new event. A
+    recurring event books each occurrence within `RECURRENCE_CHECK_DAYS`
+    of its start; check single bookings after that with
+    `series_conflict`.
+    """
+    def value(name, default):
+        if name in attrs:
+            return attrs[name]
+        return getattr(instance, name) if instance is not None else default
+
+    if 'venue_id' in attrs:
+        venue = attrs['venue_id'].pk
+    elif instance is not None:
+        venue = instance.venue_id_id
+    else:
+        venue = Venue.get_default_venue_pk()
+    start = value('datetime', None)
+    duration = value('duration', 0)
+    rule = value('rule', '')
+    if start is None or duration <= 0:
+        return venue, []
+    length = EndTimeField.compute(start, duration) - start
+    if not rule:
+        return venue, [(start, start + length)]
+    horizon = start + timedelta(days=get_check_days())
+    return venue, [
+        (occurrence, occurrence + length)
+        for occurrence in occurrences(rule, start, start, horizon)
+    ]
+
+
+def conflict_error(event=None, item=None):
+    """Return the error for a booking that overlaps event, or bulk item."""
+    if event is not None:
+        message = f'The venue is already booked by event {event}.'
+    elif item is not None:
+        message = f'Overlaps item {item} of this request.'
+    else:
+        message = 'The venue is already booked at this time.'
+    return ValidationError({'datetime': [message]}, code='conflict')
+
+
+def is_overlap_violation(exc):
+    """Return True if exc is a breach of the overlap constraint."""
+    return isinstance(exc, IntegrityError) and OVERLAP_CONSTRAINT in str(exc)
@@ -0,0 +1,278 @@
+"""
+Response caching and conditional GET for the API viewsets.
+
+Cached responses are keyed on the model, the user's scope and a set of
+version stamps kept in the cache itself. Writes bump the stamps for the
+scopes and objects they touch, so stale entries are never read again and
+simply age out of the backend. The same stamps double as ETags and
+Last-Modified dates.
+
+The stamps must live in a cache every process shares. In a per-process
+cache a write only bumps the stamps of the process that handled it, and
+the others keep serving their cached bodies and 304s. Startup fails when
+`RESPONSE_CACHE_ALIAS` is per-process, unless `ALLOW_PROCESS_LOCAL_CACHE`
+says a single process serves requests, as with runserver. Setting
+`RESPONSE_CACHE_ENABLED` to False turns off both the cache and ETags.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+
+ALL = 'all'
+STAFF = 'staff'
+# Version part of every response that inlines a model's rows through
+# `?expand=`, kept under that model's label.
+EXPANDED = 'expanded'
+
+
+def get_cache():
+    """Return the cache backend used for responses."""
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def is_enabled():
+    """Return whether responses are cached and carry ETags."""
+    return getattr(settings, 'RESPONSE_CACHE_ENABLED', True)
+
+
+def is_process_local(alias):
+    """Return whether each process keeps its own cache under alias."""
+    return settings.CACHES[alias]['BACKEND'] == \
+        'django.core.cache.backends.locmem.LocMemCache'
+
+
+def check_shared(alias, feature):
+    """Raise ImproperlyConfigured if feature would use a per-process cache.
+
+    A per-process cache is accepted while `ALLOW_PROCESS_LOCAL_CACHE`
+    says a single process serves requests.
+    """
+    if getattr(settings, 'ALLOW_PROCESS_LOCAL_CACHE', True) or \
+            not is_process_local(alias):
+        return
+    raise ImproperlyConfigured(
+        f'{feature} needs a cache shared by all processes, but the '
+        f'{alias!r} cache is process-local. Point it at Redis or '
+        f'Memcached, or set ALLOW_PROCESS_LOCAL_CACHE when a single '
+        f'process serves requests.')
+
+
+def check_settings():
+    """Refuse to cache responses in a per-process cache."""
+    if is_enabled():
+        check_shared(
+            getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default'),
+            'The response cache')
+
+
+def user_scope(user_pk):
+    """Return the scope name for a non-staff user."""
+    return f'user:{user_pk}'
+
+
+def object_part(pk):
+    """Return the version part name for a single object."""
+    return f'obj:{pk}'
+
+
+def _version_key(label, part):
+    return f'rc:v:{label}:{part}'
+
+
+def get_versions(label, parts):
+    """Return the version stamps for parts of a model's cache.
+
+    Missing stamps are created from the clock rather than from zero, so a
+    stamp evicted from the backend can never repeat an old value.
+    """
+    return _get_stamps([_version_key(label, part) for part in parts])
+
+
+def _get_stamps(keys):
+    cache = get_cache()
+    found = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        for key, value in missing.items():
+            cache.add(key, value, timeout=None)
+        found.update(cache.get_many(list(missing)))
+    return [found.get(key, 0) for key in keys]
+
+
+def _bump(label, parts):
+    now = time.time_ns()
+    get_cache().set_many(
+        {_version_key(label, part): now for part in parts}, timeout=None)
+
+
+def invalidate(model, parts=(ALL, EXPANDED)):
+    """Bump the version stamps for parts of model's cache.
+
+    Stamps are bumped immediately and again on commit, so a reader that
+    caches pre-commit data in between is invalidated too.
+    """
+    label = model._meta.label_lower
+    parts = list(parts)
+    _bump(label, parts)
+    transaction.on_commit(lambda: _bump(label, parts))
+
+
+class VersionedViewMixin:
+    """Resolve the version stamps the current response depends on."""
+
+    def get_cache_scope(self):
+        user = self.request.user
+        if user.is_staff or user.is_superuser:
+            return STAFF
+        return user_scope(user.pk)
+
+    def get_cache_parts(self):
+        """Return the version parts the current response depends on."""
+        parts = [ALL, self.get_cache_scope()]
+        if self.detail:
+            parts.append(object_part(self.kwargs[self.lookup_field]))
+        return parts
+
+    def get_expanded_models(self):
+        """Return the models whose rows `?expand=` inlines, if any."""
+        get_sparse_options = getattr(self, 'get_sparse_options', None)
+        if get_sparse_options is None:
+            return []
+        _, expand = get_sparse_options()
+        meta = self.queryset.model._meta
+        return [meta.get_field(name).related_model for name in expand]
+
+    def get_cache_versions(self):
+        """Return (parts, versions), looked up once per request.
+
+        Expanded models add their `EXPANDED` part, so the response also
+        changes when an inlined row does.
+        """
+        if getattr(self, '_cache_versions', None) is None:
+            label = self.queryset.model._meta.label_lower
+            parts = self.get_cache_parts()
+            keys = [_version_key(label, part) for part in parts]
+            for model in self.get_expanded_models():
+                related = model._meta.label_lower
+                parts.append(f'{related}:{EXPANDED}')
+                keys.append(_version_key(related, EXPANDED))
+            self._cache_versions = parts, _get_stamps(keys)
+        return self._cache_versions
+
+    def get_cache_key(self):
+        label = self.queryset.model._meta.label_lower
+        parts, versions = self.get_cache_versions()
+        path = hashlib.md5(
+            self.request.get_full_path().encode('utf-8')).hexdigest()
+        stamp = '.'.join(str(version) for version in versions)
+        return f'rc:{label}:{self.action}:{parts[1]}:{path}:{stamp}'
+
+
+class ConditionalGetMixin(VersionedViewMixin):
+    """Add strong ETag and Last-Modified headers to `list`/`retrieve`.
+
+    Both are computed from the version stamps, so a matching
+    `If-None-Match` or `If-Modified-Since` gets a 304 before the queryset
+    is evaluated or anything is serialized.
+    """
+
+    def get_etag(self):
+        parts, versions = self.get_cache_versions()
+        digest = hashlib.sha1('|'.join([
+            self.queryset.model._meta.label_lower,
+            self.action,
+            self.request.accepted_media_type or '',
+            self.request.get_full_path(),
+            *parts,
+            *(str(version) for version in versions),
+        ]).encode('utf-8')).hexdigest()
+        return f'"{digest}"'
+
+    def get_last_modified(self):
+        """Return the newest version stamp as a unix timestamp."""
+        _, versions = self.get_cache_versions()
+        return max(versions) // 10 ** 9
+
+    def is_not_modified(self, etag, last_modified):
+        headers = self.request.headers
+        if 'If-None-Match' in headers:
+            etags = parse_etags(headers['If-None-Match'])
+            return any(
+                tag[2:] == etag if tag.startswith('W/') else tag == etag
+                for tag in etags
+            )
+        since = parse_http_date_safe(headers.get('If-Modified-Since', ''))
+        if since is None or last_modified > since:
+            return False
+        # Last-Modified has one second resolution; a stamp from the
+        # current second could still be followed by another write.
+        _, versions = self.get_cache_versions()
+        return time.time_ns() - max(versions) >= 10 ** 9
+
+    def conditional_response(self, view, request, *args, **kwargs):
+        if not is_enabled():
+            return view(request, *args, **kwargs)
+        etag = self.get_etag()
+        last_modified = self.get_last_modified()
+        if self.is_not_modified(etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = view(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs)
+
+
+class CachedResponseMixin(VersionedViewMixin):
+    """Serve `list` and `retrieve` from the response cache.
+
+    Responses are cached per scope: staff share one scope, everybody else
+    has their own. Responses computed inside a transaction are not stored,
+    since the transaction may still roll back.
+    """
+    cache_timeout = None
+
+    def should_cache(self, response):
+        """Return True if response may be stored."""
+        return response.status_code == status.HTTP_200_OK and \
+            not connection.in_atomic_block
+
+    def cached_response(self, view, request, *args, **kwargs):
+        if not is_enabled():
+            return view(request, *args, **kwargs)
+        cache = get_cache()
+        key = self.get_cache_key()
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = view(request, *args, **kwargs)
+        if self.should_cache(response):
+            timeout = self.cache_timeout or getattr(
+                settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+            cache.set(key, response.data, timeout)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,153 @@
+"""
+iCalendar (RFC 5545) feeds of events.
+"""
+import datetime
+
+from django.conf import settings
+
+from core import cache
+from core.asyncviews import async_read_view
+from core.authentication import (
+    CachedTokenAuthentication,
+    QueryTokenAuthentication,
+)
+from core.models import Event, Venue
+from core.renderers import ICalendarRenderer
+from core.streaming import streaming_response
+
+
+def escape_text(value):
+    """Escape a TEXT property value."""
+    return (value or '').replace('\\', '\\\\').replace(';', '\\;') \
+        .replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n')
+
+
+def fold(line):
+    """Fold a content line into 75 octet pieces, ending with CRLF."""
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return data + b'\r\n'
+    parts, start, limit = [], 0, 75
+    while start < len(data):
+        end = min(start + limit, len(data))
+        # Never split a multi-byte character.
+        while end < len(data) and (data[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(data[start:end])
+        start, limit = end, 74
+    return b'\r\n '.join(parts) + b'\r\n'
+
+
+def format_datetime(value):
+    return value.astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def calendar_lines(name, rows, stamp):
+    """Yield the encoded lines of a calendar of event rows.
+
+    Rows are (id, title, datetime, duration in minutes, description,
+    venue name, recurrence rule or None) tuples. Recurring events are
+    sent as one VEVENT with an RRULE, for the calendar app to expand.
+    """
+    yield fold('BEGIN:VCALENDAR')
+    yield fold('VERSION:2.0')
+    yield fold('PRODID:-//lyre-api//calendar//EN')
+    yield fold('CALSCALE:GREGORIAN')
+    yield fold(f'X-WR-CALNAME:{escape_text(name)}')
+    dtstamp = format_datetime(stamp)
+    for pk, title, start, duration, description, location, rule in rows:
+        yield fold('BEGIN:VEVENT')
+        yield fold(f'UID:event-{pk}@lyre-api')
+        yield fold(f'DTSTAMP:{dtstamp}')
+        yield fold(f'DTSTART:{format_datetime(start)}')
+        yield fold(f'DURATION:PT{max(duration or 0, 0)}M')
+        if rule:
+            yield fold(f'RRULE:{rule}')
+        yield fold(f'SUMMARY:{escape_text(title)}')
+        if description:
+            yield fold(f'DESCRIPTION:{escape_text(description)}')
+        if location:
+            yield fold(f'LOCATION:{escape_text(location)}')
+        yield fold('END:VEVENT')
+    yield fold('END:VCALENDAR')
+
+
+class CalendarFeedMixin:
+    """Add a `calendar` view streaming an object's events as iCalendar.
+
+    Rows are read with `.iterator()` in chunks of `CALENDAR_CHUNK_SIZE`
+    and encoded as they are sent, so memory does not grow with the number
+    of events. Used with `ConditionalGetMixin`, the ETag and Last-Modified
+    come from the event, venue and feed object version stamps, so an
+    unchanged feed costs one primary key lookup and a 304.
+    """
+    calendar_event_field = None
+    calendar_name_field = None
+
+    def get_calendar_dependencies(self):
+        """Return (model, parts) pairs whose changes alter the feed."""
+        model = self.queryset.model
+        dependencies = [
+            (model, [cache.ALL, cache.object_part(
+                self.kwargs[self.lookup_field])]),
+            (Event, [cache.ALL, cache.STAFF]),
+        ]
+        if model is not Venue:
+            # Events carry their venue's name as LOCATION.
+            dependencies.append((Venue, [cache.ALL, cache.STAFF]))
+        return dependencies
+
+    def get_cache_versions(self):
+        if self.action != 'calendar':
+            return super().get_cache_versions()
+        if getattr(self, '_cache_versions', None) is None:
+            parts, versions = [], []
+            for model, model_parts in self.get_calendar_dependencies():
+                label = model._meta.label_lower
+                parts.extend(f'{label}:{part}' for part in model_parts)
+                versions.extend(cache.get_versions(label, model_parts))
+            self._cache_versions = parts, versions
+        return self._cache_versions
+
+    def get_calendar_rows(self, obj):
+        chunk_size = getattr(settings, 'CALENDAR_CHUNK_SIZE', 2000)
+        return Event.objects.filter(
+            **{self.calendar_event_field: obj.pk},
+            datetime__isnull=False,
+        ).order_by('datetime', 'id').values_list(
+            'id', 'title', 'datetime', 'duration', 'description',
+            'venue_id__venue_name', 'recurrence__rule',
+        ).iterator(chunk_size=chunk_size)
+
+    def calendar(self, request, *args, **kwargs):
+        """Stream the object's events as an iCalendar feed."""
+        obj = self.get_object()
+        return self.conditional_response(
+            self.calendar_response, request, obj)
+
+    def calendar_response(self, request, obj):
+        name = getattr(obj, self.calendar_name_field) or str(obj)
+        stamp = datetime.datetime.fromtimestamp(
+            self.get_last_modified(), datetime.timezone.utc)
+        response = streaming_response(
+            request,
+            lambda: calendar_lines(name, self.get_calendar_rows(obj), stamp),
+            content_type='text/calendar; charset=utf-8',
+        )
+        response['Content-Disposition'] = \
+            f'inline; filename="{obj._meta.model_name}-{obj.pk}.ics"'
+        return response
+
+
+def calendar_view(viewset):
+    """Return the view serving viewset's `calendar` feed.
+
+    Feeds also accept the token as `?token=`, since calendar apps can only
+    be given a URL.
+    """
+    return async_read_view(viewset.as_view(
+        {'get': 'calendar'},
+        authentication_classes=[
+            CachedTokenAuthentication, QueryTokenAuthentication],
+        renderer_classes=[ICalendarRenderer],
+    ))
@@ -0,0 +1,115 @@
+"""
+PostgreSQL backend with optional pooling and health checks on reuse.
+
+Extra keys in the `DATABASES` entry:
+
+    HEALTH_CHECKS   check a persistent connection with `SELECT 1` the first
+                    time it is used in each request, and reconnect if the
+                    server dropped it.
+    POOL            {'MIN_SIZE', 'MAX_SIZE', 'TIMEOUT'} to share a pool of
+                    connections between the threads of each process.
+                    Closing a connection returns it to the pool, so use it
+                    with `CONN_MAX_AGE = 0`.
+"""
+import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+from django.db.backends.postgresql import base
+
+from core.db.pool import ConnectionPool, get_pool
+
+
+def connect(conn_params, options):
+    """Open a raw connection the way Django's backend does."""
+    connection = psycopg2.connect(**conn_params)
+    isolation_level = options.get('isolation_level')
+    if isolation_level is not None and \
+            isolation_level != connection.isolation_level:
+        connection.set_session(isolation_level=isolation_level)
+    psycopg2.extras.register_default_jsonb(
+        conn_or_curs=connection, loads=lambda x: x)
+    return connection
+
+
+def check(connection):
+    """Return True if the server still answers on connection."""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    return True
+
+
+def reset(connection):
+    """Roll back leftover work; return False if connection is broken."""
+    if connection.closed:
+        return False
+    status = connection.info.transaction_status
+    if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+        return False
+    if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+        connection.rollback()
+    return True
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+        self.pool = None
+
+    def get_pool(self, conn_params=None):
+        """Return this process's pool, or None if pooling is off."""
+        options = self.settings_dict.get('POOL')
+        if not options:
+            return None
+        if conn_params is None:
+            conn_params = self.get_connection_params()
+        params = tuple(sorted(
+            (key, str(value)) for key, value in conn_params.items()))
+        return get_pool(self.alias, lambda: ConnectionPool(
+            self.alias,
+            lambda: connect(conn_params, self.settings_dict['OPTIONS']),
+            min_size=options.get('MIN_SIZE', 0),
+            max_size=options.get('MAX_SIZE', 10),
+            timeout=options.get('TIMEOUT', 5.0),
+            check=check if self.settings_dict.get('HEALTH_CHECKS') else None,
+            reset=reset,
+        ), params)
+
+    def warm_pool(self):
+        """Open the pool's `MIN_SIZE` connections; return how many."""
+        pool = self.get_pool()
+        return pool.warm() if pool is not None else 0
+
+    def get_new_connection(self, conn_params):
+        pool = self.get_pool(conn_params)
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        connection = pool.acquire()
+        self.pool = pool
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level)
+        return connection
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def _close(self):
+        pool, self.pool = self.pool, None
+        if pool is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            pool.release(self.connection)
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def ensure_connection(self):
+        if self.connection is not None and not self.health_check_done and \
+                self.settings_dict.get('HEALTH_CHECKS'):
+            if not self.in_atomic_block and not self.is_usable():
+                self.close()
+            self.health_check_done = True
+        super().ensure_connection()
@@ -0,0 +1,196 @@
+"""
+A small blocking connection pool shared by the threads of a process.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from django.db import connections
+from django.db.utils import OperationalError
+
+from core.metrics import registry
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """Bounded pool of DB-API connections.
+
+    `acquire()` hands out an idle connection, opens a new one while fewer
+    than `max_size` exist, or waits up to `timeout` seconds for one to be
+    released. `check(conn)` is called on idle connections before reuse
+    and `reset(conn)` on release; either returning False discards the
+    connection.
+    """
+
+    def __init__(self, alias, connect, min_size=0, max_size=10, timeout=5.0,
+                 check=None, reset=None, clock=time.monotonic):
+        self.alias = alias
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check = check
+        self.reset = reset
+        self.clock = clock
+        self.in_use = 0
+        self.waiting = 0
+        self.timeouts = 0
+        self._idle = deque()
+        self._condition = threading.Condition()
+
+    @property
+    def idle(self):
+        return len(self._idle)
+
+    def acquire(self):
+        """Return a connection, raising OperationalError on timeout."""
+        start = self.clock()
+        while True:
+            conn = self._take(start)
+            if conn is None:
+                try:
+                    conn = self.connect()
+                except Exception:
+                    self._give_back(None)
+                    raise
+                break
+            if self.check is None or self._usable(self.check, conn):
+                break
+            self._give_back(None)
+        registry.observe(
+            'lyre_db_pool_wait_seconds', (('alias', self.alias),),
+            self.clock() - start)
+        return conn
+
+    def release(self, conn):
+        """Return conn to the pool, or close it if it is unusable."""
+        if self.reset is not None and not self._usable(self.reset, conn):
+            conn = None
+        self._give_back(conn)
+
+    def warm(self):
+        """Open connections until at least `min_size` exist."""
+        with self._condition:
+            missing = self.min_size - self.in_use - len(self._idle)
+        conns = [self.acquire() for _ in range(max(missing, 0))]
+        for conn in conns:
+            self.release(conn)
+        return len(conns)
+
+    def close_all(self):
+        """Close every idle connection."""
+        with self._condition:
+            idle, self._idle = list(self._idle), deque()
+        for conn in idle:
+            self._close(conn)
+
+    def _take(self, start):
+        """Reserve a slot; return an idle connection or None to open one."""
+        with self._condition:
+            while not self._idle and \
+                    self.in_use + len(self._idle) >= self.max_size:
+                remaining = self.timeout - (self.clock() - start)
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise OperationalError(
+                        f'Timed out after {self.timeout}s waiting for a '
+                        f'connection from the {self.alias!r} pool.')
+                self.waiting += 1
+                try:
+                    self._condition.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.in_use += 1
+            return self._idle.pop() if self._idle else None
+
+    def _give_back(self, conn):
+        with self._condition:
+            self.in_use -= 1
+            if conn is not None:
+                self._idle.append(conn)
+            self._condition.notify()
+
+    def _usable(self, test, conn):
+        try:
+            if test(conn):
+                return True
+        except Exception:
+            pass
+        self._close(conn)
+        return False
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def get_pool(alias, factory, params=()):
+    """Return this process's pool for alias and connection params,
+    creating it with factory().
+
+    Pools are not inherited across fork(): a child process starts with
+    none, leaving the parent's sockets alone.
+    """
+    key = (alias, params, os.getpid())
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                for stale in [k for k in _pools if k[2] != key[2]]:
+                    del _pools[stale]
+                pool = _pools[key] = factory()
+    return pool
+
+
+def get_pools():
+    """Return the pools created in this process."""
+    pid = os.getpid()
+    return [pool for (_, _, owner), pool in list(_pools.items())
+            if owner == pid]
+
+
+def warm_pools():
+    """Open `MIN_SIZE` connections in every pooled database.
+
+    Return {alias: connections opened}.
+    """
+    warmed = {}
+    for alias in connections:
+        warm = getattr(connections[alias], 'warm_pool', None)
+        if warm is not None:
+            warmed[alias] = warm()
+    return warmed
+
+
+def _pool_connections():
+    stats = {}
+    for pool in get_pools():
+        alias = ('alias', pool.alias)
+        stats[(alias, ('state', 'in_use'))] = pool.in_use
+        stats[(alias, ('state', 'idle'))] = pool.idle
+        stats[(alias, ('state', 'waiting'))] = pool.waiting
+        stats[(alias, ('state', 'max'))] = pool.max_size
+    return stats
+
+
+def _pool_timeouts():
+    return {(('alias', pool.alias),): pool.timeouts for pool in get_pools()}
+
+
+registry.histogram(
+    'lyre_db_pool_wait_seconds',
+    'Time spent waiting for a pooled database connection.')
+registry.gauge(
+    'lyre_db_pool_connections',
+    'Pooled database connections by state.', _pool_connections)
+registry.counter(
+    'lyre_db_pool_timeouts_total',
+    'Requests that gave up waiting for a pooled connection.', _pool_timeouts)
@@ -0,0 +1,92 @@
+"""
+Route reads to replicas when a view allows it.
+
+Reads only go to a replica while `replica_reads()` is active, which the
+`ReplicaReadMixin` views do for safe requests. A user who has just written
+is pinned to the primary for `REPLICA_PIN_SECONDS`, so they always read
+their own writes despite replication lag. Pins are kept in the
+`REPLICA_PIN_CACHE_ALIAS` cache, which every process must share so the
+pin follows the user to whichever worker serves their next read; startup
+fails with replicas and a per-process pin cache, see
+`core.cache.check_shared`.
+"""
+import contextlib
+import contextvars
+import random
+
+from django.conf import settings
+from django.core.cache import caches
+
+from core.cache import check_shared
+
+
+_use_replica = contextvars.ContextVar('use_replica', default=False)
+
+
+def get_replicas():
+    """Return the aliases of the configured replicas."""
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def get_pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+
+
+@contextlib.contextmanager
+def replica_reads():
+    """Send the reads made inside the block to a replica."""
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def reading_from_replica():
+    return _use_replica.get() and bool(get_replicas())
+
+
+def get_pin_cache_alias():
+    return getattr(settings, 'REPLICA_PIN_CACHE_ALIAS', 'default')
+
+
+def get_pin_cache():
+    return caches[get_pin_cache_alias()]
+
+
+def check_settings():
+    """Refuse to keep replica pins in a per-process cache."""
+    if get_replicas():
+        check_shared(get_pin_cache_alias(), 'The replica pin')
+
+
+def _pin_key(user_pk):
+    return f'replica:pin:{user_pk}'
+
+
+def pin_to_primary(user):
+    """Route user's reads to the primary for the replication lag window."""
+    get_pin_cache().set(_pin_key(user.pk), True, get_pin_seconds())
+
+
+def is_pinned(user):
+    return bool(get_pin_cache().get(_pin_key(user.pk)))
+
+
+class ReplicaRouter:
+    """Read from a random replica inside `replica_reads()`, else primary."""
+
+    def db_for_read(self, model, **hints):
+        if not _use_replica.get():
+            return None
+        replicas = get_replicas()
+        return random.choice(replicas) if replicas else None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in get_replicas()
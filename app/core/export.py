@@ -0,0 +1,168 @@
+"""
+Streaming NDJSON and CSV exports of venues, groups, subgroups and events.
+"""
+import csv
+import datetime
+import io
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+
+from core.db.routers import replica_reads
+from core.models import Event, Group, SubGroup, Venue
+from core.params import parse_bool, parse_datetime, parse_id
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised without orjson
+    orjson = None
+
+
+class Export:
+    """The columns of a model to export and the filters it accepts.
+
+    `filters` maps query params to (lookup, parser) pairs. Every export
+    also accepts `after`, to resume after the last id received.
+    """
+
+    def __init__(self, model, fields, filters):
+        self.model = model
+        self.fields = fields
+        self.filters = dict(filters, after=('pk__gt', parse_id))
+
+    def get_queryset(self, params):
+        """Return the filtered rows as value tuples, ordered by id."""
+        lookups = {}
+        for name, (lookup, parse) in self.filters.items():
+            value = parse(params, name)
+            if value is not None:
+                lookups[lookup] = value
+        return self.model.objects.filter(**lookups).order_by('pk') \
+            .values_list(*self.fields)
+
+
+EXPORTS = {
+    'venues': Export(
+        Venue,
+        ['id', 'venue_name', 'address', 'primary_contact'],
+        {'primary_contact': ('primary_contact', parse_id)},
+    ),
+    'groups': Export(
+        Group,
+        ['id', 'group_name', 'primary_contact', 'is_active'],
+        {
+            'primary_contact': ('primary_contact', parse_id),
+            'is_active': ('is_active', parse_bool),
+        },
+    ),
+    'subgroups': Export(
+        SubGroup,
+        ['id', 'group_id', 'display_name'],
+        {'group': ('group_id', parse_id)},
+    ),
+    'events': Export(
+        Event,
+        [
+            'id', 'title', 'datetime', 'duration', 'description',
+            'venue_id', 'group_id', 'subgroup_id', 'last_modified_by',
+        ],
+        {
+            'venue': ('venue_id', parse_id),
+            'group': ('group_id', parse_id),
+            'subgroup': ('subgroup_id', parse_id),
+            'start': ('datetime__gte', parse_datetime),
+            'end': ('datetime__lt', parse_datetime),
+        },
+    ),
+}
+
+
+def iter_rows(queryset, chunk_size):
+    """Yield the rows of an id-ordered values_list queryset.
+
+    Rows come from a server-side cursor where the database supports one.
+    Behind PgBouncer in transaction mode, where server-side cursors are
+    disabled, they are read in keyset batches instead.
+    """
+    settings_dict = connections[queryset.db].settings_dict
+    if not settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+        yield from queryset.iterator(chunk_size=chunk_size)
+        return
+    batch = list(queryset[:chunk_size])
+    while batch:
+        yield from batch
+        if len(batch) < chunk_size:
+            return
+        batch = list(queryset.filter(pk__gt=batch[-1][0])[:chunk_size])
+
+
+class ExportJSONEncoder(DjangoJSONEncoder):
+    """Encode values exactly as orjson does with `OPT_UTC_Z`.
+
+    DjangoJSONEncoder cuts datetimes to milliseconds; exports keep
+    microseconds, so the format does not depend on orjson being there.
+    """
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            value = o.isoformat()
+            if value.endswith('+00:00'):
+                value = value[:-6] + 'Z'
+            return value
+        return super().default(o)
+
+
+def ndjson_chunks(fields, rows, chunk_size):
+    """Encode rows as newline delimited JSON, chunk_size rows at a time."""
+    if orjson is not None:
+        def dumps(row):
+            return orjson.dumps(
+                dict(zip(fields, row)), option=orjson.OPT_UTC_Z)
+    else:
+        def dumps(row):
+            return json.dumps(
+                dict(zip(fields, row)), cls=ExportJSONEncoder,
+                separators=(',', ':'), ensure_ascii=False).encode()
+    lines = []
+    for row in rows:
+        lines.append(dumps(row))
+        if len(lines) >= chunk_size:
+            yield b'\n'.join(lines) + b'\n'
+            lines = []
+    if lines:
+        yield b'\n'.join(lines) + b'\n'
+
+
+def csv_chunks(fields, rows, chunk_size):
+    """Encode rows as CSV with a header, chunk_size rows at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    count = 0
+    for row in rows:
+        writer.writerow([
+            value.isoformat() if isinstance(value, datetime.datetime)
+            else value
+            for value in row
+        ])
+        count += 1
+        if count >= chunk_size:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            count = 0
+    yield buffer.getvalue().encode('utf-8')
+
+
+ENCODERS = {
+    'ndjson': ndjson_chunks,
+    'csv': csv_chunks,
+}
+
+
+def export_chunks(export, queryset, format, chunk_size):
+    """Yield the encoded export, reading from a replica if there is one."""
+    with replica_reads():
+        yield from ENCODERS[format](
+            export.fields, iter_rows(queryset, chunk_size), chunk_size)
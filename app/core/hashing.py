@@ -0,0 +1,26 @@
+"""
+Functions run by the password hash worker processes.
+
+Workers import this module before Django is set up, so it must not
+import models; see `core.passwords`.
+"""
+from django.contrib.auth import hashers
+
+
+def init_worker():
+    import django
+    django.setup()
+
+
+def check(password, encoded):
+    """Return (valid, new hash or None) for password against encoded."""
+    updated = []
+    valid = hashers.check_password(
+        password, encoded,
+        setter=lambda raw: updated.append(hashers.make_password(raw)),
+    )
+    return valid, updated[0] if updated else None
+
+
+def make(password):
+    return hashers.make_password(password)
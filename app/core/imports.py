@@ -0,0 +1,441 @@
+"""
+Bulk loading of venues, groups, subgroups and events from NDJSON or CSV.
+
+Rows are validated a batch at a time without touching the database:
+related rows given by name (e.g. a venue name) or by id are checked
+against lookup maps read once per import. Events are also checked for
+double bookings, against each other and the venue's existing bookings.
+Valid batches are written with `COPY` on PostgreSQL and `bulk_create`
+elsewhere.
+
+Imports skip the signals that keep venue access, event summaries and
+rollups in step, so the loader notes the rows it writes and `refresh`
+recomputes just what they touched.
+"""
+import csv
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.management.color import no_style
+from django.db import connections
+from django.db.models import CharField, ForeignKey, Max, TextField
+from django.utils import timezone
+
+from core import access, rollups, summaries
+from core.availability import IntervalSet, busy_intervals
+from core.models import EndTimeField, Event, Group, SubGroup, Venue
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised without orjson
+    orjson = None
+
+
+class RowError(Exception):
+    """A row that cannot be imported, with a message per column."""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+class Import:
+    """The columns of a model that can be imported.
+
+    `fields` are model field names; foreign keys among them take the
+    related id, as in the exports. `references` maps extra columns to
+    (foreign key, natural key) pairs, so that e.g. a `venue` column can
+    name the venue instead. If several rows share a natural key the one
+    with the lowest id is used.
+    """
+
+    def __init__(self, model, fields, references=None):
+        self.model = model
+        self.fields = [model._meta.get_field(name) for name in fields]
+        self.references = {
+            column: (model._meta.get_field(name), key)
+            for column, (name, key) in (references or {}).items()
+        }
+
+
+IMPORTS = {
+    'venues': Import(
+        Venue,
+        ['venue_name', 'address', 'primary_contact'],
+        {'primary_contact_email': ('primary_contact', 'email')},
+    ),
+    'groups': Import(
+        Group,
+        ['group_name', 'primary_contact', 'is_active'],
+        {'primary_contact_email': ('primary_contact', 'email')},
+    ),
+    'subgroups': Import(
+        SubGroup,
+        ['group_id', 'display_name'],
+        {'group': ('group_id', 'group_name')},
+    ),
+    'events': Import(
+        Event,
+        [
+            'title', 'datetime', 'duration', 'description', 'venue_id',
+            'group_id', 'subgroup_id', 'last_modified_by',
+        ],
+        {
+            'venue': ('venue_id', 'venue_name'),
+            'group': ('group_id', 'group_name'),
+            'subgroup': ('subgroup_id', 'display_name'),
+            'last_modified_by_email': ('last_modified_by', 'email'),
+        },
+    ),
+}
+
+
+def read_ndjson(stream):
+    """Yield (line number, row dict) pairs from NDJSON text lines."""
+    loads = orjson.loads if orjson is not None else json.loads
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = loads(line)
+        except ValueError as exc:
+            yield number, RowError({'__all__': [f'Invalid JSON: {exc}']})
+            continue
+        if not isinstance(row, dict):
+            row = RowError({'__all__': ['Expected a JSON object.']})
+        yield number, row
+
+
+def read_csv(stream):
+    """Yield (line number, row dict) pairs from CSV with a header row."""
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, row
+
+
+READERS = {
+    'ndjson': read_ndjson,
+    'csv': read_csv,
+}
+
+
+_MISSING = object()
+
+
+class Loader:
+    """Validate rows for an `Import` and write them in batches."""
+
+    def __init__(self, spec, using='default', keep_ids=False):
+        self.spec = spec
+        self.using = using
+        self.connection = connections[using]
+        self.keep_ids = keep_ids
+        self.columns = list(spec.fields)
+        if keep_ids:
+            self.columns.insert(0, spec.model._meta.pk)
+        # Rows are cleaned by column position; hashing fields is slow.
+        self.index = {
+            field.name: index for index, field in enumerate(self.columns)}
+        self.references = {
+            column: (self.index[field.name], field, key)
+            for column, (field, key) in spec.references.items()
+        }
+        self._defaults = {}
+        self._fills = {}
+        self._ids = {}
+        self._keys = {}
+        # What the written rows touched, see `refresh`.
+        self.written_pks = set()
+        self.targets = {field: set() for field in summaries.SUMMARIZED}
+        self.days = set()
+
+    def related_ids(self, field):
+        """Return the set of ids of field's related model."""
+        model = field.related_model
+        if model not in self._ids:
+            self._ids[model] = set(
+                model._default_manager.using(self.using)
+                .values_list('pk', flat=True))
+        return self._ids[model]
+
+    def related_keys(self, field, key):
+        """Return a map of natural key to id for field's related model."""
+        if (field, key) not in self._keys:
+            # Reverse order, so that the lowest id wins on duplicates.
+            self._keys[field, key] = dict(
+                field.related_model._default_manager.using(self.using)
+                .order_by('-pk').values_list(key, 'pk'))
+        return self._keys[field, key]
+
+    def default(self, field):
+        """Return field's default, evaluated once per import."""
+        if field not in self._defaults:
+            self._defaults[field] = field.get_default()
+        return self._defaults[field]
+
+    def clean_value(self, field, value):
+        if isinstance(value, str) and value == '' and \
+                not isinstance(field, (CharField, TextField)):
+            value = None
+        if isinstance(field, ForeignKey):
+            if value is None:
+                if not field.null:
+                    raise ValidationError('This field cannot be null.')
+                return None
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                raise ValidationError('Must be an integer id.')
+            if value not in self.related_ids(field):
+                raise ValidationError(
+                    f'{field.related_model.__name__} {value} '
+                    'does not exist.')
+            return value
+        value = field.clean(value, None)
+        if isinstance(value, datetime.datetime) and timezone.is_naive(value):
+            value = timezone.make_aware(value, timezone.utc)
+        return value
+
+    def fill(self, field):
+        """Return the value of a missing column, or raise ValidationError."""
+        if field.primary_key:
+            raise ValidationError('This column is required with --keep-ids.')
+        if field.has_default() and (
+                field.null or self.default(field) is not None):
+            return self.default(field)
+        if field.null:
+            return None
+        if not isinstance(field, ForeignKey) and field.blank:
+            return ''
+        raise ValidationError('This column is required.')
+
+    def clean(self, row):
+        """Return row's values in column order, or raise RowError."""
+        values, errors = [_MISSING] * len(self.columns), {}
+        for column, value in row.items():
+            if column in self.references:
+                index, field, key = self.references[column]
+                if value in (None, ''):
+                    continue
+                pk = self.related_keys(field, key).get(value)
+                if pk is None:
+                    errors[column] = [
+                        f'No {field.related_model.__name__} with '
+                        f'{key} {value!r}.']
+                else:
+                    values[index] = pk
+            elif column in self.index:
+                index = self.index[column]
+                try:
+                    values[index] = self.clean_value(
+                        self.columns[index], value)
+                except ValidationError as exc:
+                    errors[column] = exc.messages
+            elif column != 'id':
+                errors[column] = ['Unknown column.']
+        for index, value in enumerate(values):
+            if value is _MISSING:
+                if index not in self._fills:
+                    try:
+                        self._fills[index] = self.fill(self.columns[index])
+                    except ValidationError as exc:
+                        self._fills[index] = RowError(exc.messages)
+                value = self._fills[index]
+                if isinstance(value, RowError):
+                    errors[self.columns[index].name] = value.errors
+                else:
+                    values[index] = value
+        if errors:
+            raise RowError(errors)
+        return values
+
+    def clean_batch(self, rows):
+        """Return the valid rows of a batch and (line, errors) pairs."""
+        valid, invalid = [], []
+        for number, row in rows:
+            try:
+                if isinstance(row, RowError):
+                    raise row
+                valid.append((number, self.clean(row)))
+            except RowError as exc:
+                invalid.append((number, exc.errors))
+        if self.spec.model is Event:
+            valid, conflicts = self.check_bookings(valid)
+            invalid = sorted(invalid + conflicts, key=lambda pair: pair[0])
+        return [values for _, values in valid], invalid
+
+    def check_bookings(self, rows):
+        """Split (line, values) event rows into free and double bookings.
+
+        Each venue's rows are sorted by start, so a row can only overlap
+        the last free row before it, and checked against the bookings
+        already at the venue, read once for the window the batch covers.
+        Rows written by earlier batches are among those. Return the free
+        rows and (line, errors) pairs for the others.
+        """
+        venue_index = self.index['venue_id']
+        start_index = self.index['datetime']
+        duration_index = self.index['duration']
+        free, invalid, venues = [], [], {}
+        for number, values in rows:
+            start, duration = values[start_index], values[duration_index]
+            if start is None or not duration or duration <= 0:
+                free.append((number, values))
+                continue
+            end = EndTimeField.compute(start, duration)
+            venues.setdefault(values[venue_index], []).append(
+                (start, end, number, values))
+        for venue, bookings in venues.items():
+            bookings.sort(key=lambda booking: booking[:3])
+            existing = IntervalSet()
+            window = bookings[0][0], max(booking[1] for booking in bookings)
+            for interval in busy_intervals(venue, *window):
+                existing.add(*interval)
+            last = None
+            for start, end, number, values in bookings:
+                conflict = existing.conflict(start, end)
+                if conflict is not None:
+                    message = (
+                        f'The venue is already booked by event '
+                        f'{conflict.event}.')
+                elif last is not None and last[1] > start:
+                    message = f'Overlaps line {last[2]} of this import.'
+                else:
+                    free.append((number, values))
+                    last = (start, end, number)
+                    continue
+                invalid.append((number, {'datetime': [message]}))
+        free.sort(key=lambda pair: pair[0])
+        return free, invalid
+
+    def last_pk(self):
+        """Return the highest id of the model, or 0."""
+        return self.spec.model._default_manager.using(self.using).aggregate(
+            last=Max('pk'))['last'] or 0
+
+    def write(self, rows, method):
+        """Insert cleaned rows with method 'copy' or 'bulk'."""
+        if not rows:
+            return
+        tracked = self.spec.model in (Venue, Group)
+        if tracked and not self.keep_ids:
+            # Neither COPY nor bulk_create on SQLite returns the new ids,
+            # which are all above the highest id before the write.
+            last = self.last_pk()
+        if method == 'copy':
+            self.copy(rows)
+        else:
+            model = self.spec.model
+            attnames = [field.attname for field in self.columns]
+            model._default_manager.using(self.using).bulk_create(
+                [model(**dict(zip(attnames, row))) for row in rows],
+                batch_size=1000,
+            )
+        if tracked and self.keep_ids:
+            self.written_pks.update(row[0] for row in rows)
+        elif tracked:
+            self.written_pks.update(
+                self.spec.model._default_manager.using(self.using)
+                .filter(pk__gt=last).values_list('pk', flat=True))
+        elif self.spec.model is Event:
+            self.note_events(rows)
+
+    def note_events(self, rows):
+        """Note the rows and days summarizing written event rows."""
+        columns = [
+            (field, self.index[field]) for field in summaries.SUMMARIZED]
+        start_index = self.index['datetime']
+        for row in rows:
+            for field, index in columns:
+                if row[index] is not None:
+                    self.targets[field].add(row[index])
+            if row[start_index] is not None:
+                self.days.add(timezone.localtime(row[start_index]).date())
+
+    def copy(self, rows):
+        """Insert rows with PostgreSQL's `COPY ... FROM STDIN`."""
+        quote = self.connection.ops.quote_name
+        # Derived fields such as Event.ends_at are set in pre_save, which
+        # COPY skips, so compute them here.
+        derived = [
+            (field, self.index[field.start_field],
+             self.index[field.duration_field])
+            for field in self.spec.model._meta.concrete_fields
+            if isinstance(field, EndTimeField)
+        ]
+        columns = self.columns + [field for field, _, _ in derived]
+        sql = 'COPY {} ({}) FROM STDIN WITH (FORMAT csv)'.format(
+            quote(self.spec.model._meta.db_table),
+            ', '.join(quote(field.column) for field in columns),
+        )
+        if derived:
+            rows = (
+                row + [field.compute(row[start], row[duration])
+                       for field, start, duration in derived]
+                for row in rows
+            )
+        with self.connection.cursor() as cursor:
+            cursor.copy_expert(sql, CopyBuffer(rows))
+
+    def finish(self):
+        """Move the id sequence past imported ids, if they were kept."""
+        if not self.keep_ids:
+            return
+        statements = self.connection.ops.sequence_reset_sql(
+            no_style(), [self.spec.model])
+        with self.connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def refresh(self, batch_size=1000):
+        """Recompute what the written rows touched, as signals would have.
+
+        That is the venue access of written venues, the memberships of
+        written groups, and the summaries and rollup days of the venues,
+        groups and subgroups of written events.
+        """
+        pks = sorted(self.written_pks)
+        for start in range(0, len(pks), batch_size):
+            batch = pks[start:start + batch_size]
+            if self.spec.model is Venue:
+                access.refresh_venue_access(batch)
+            else:
+                access.sync_groups_memberships(batch)
+        if self.spec.model is Event:
+            summaries.refresh(
+                {field: pk}
+                for field, pks in self.targets.items() for pk in pks)
+            rollups.refresh_days(self.days)
+
+
+def encode_copy_value(value):
+    """Encode a value for `COPY` in CSV format, where NULL is unquoted."""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, datetime.datetime):
+        value = value.isoformat()
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+class CopyBuffer:
+    """A file-like object encoding rows for `COPY` as they are read."""
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.pending = ''
+
+    def read(self, size=-1):
+        while size < 0 or len(self.pending) < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self.pending += ','.join(map(encode_copy_value, row)) + '\n'
+        if size < 0:
+            size = len(self.pending)
+        data, self.pending = self.pending[:size], self.pending[size:]
+        return data
@@ -0,0 +1,64 @@
+"""
+Django command to backfill the daily event rollups
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from core import rollups
+
+
+def date_argument(value):
+    day = parse_date(value)
+    if day is None:
+        raise ValueError(value)
+    return day
+
+
+class Command(BaseCommand):
+    """Django command to recompute the rollups of a range of days."""
+    help = (
+        'Recompute the daily event rollups from the event table, a chunk '
+        'of days per transaction. Defaults to every day with events. '
+        'Run it once after migrating, and to repair a range of days.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start',
+            type=date_argument,
+            help='First day to recompute, as YYYY-MM-DD.',
+        )
+        parser.add_argument(
+            '--end',
+            type=date_argument,
+            help='Last day to recompute, as YYYY-MM-DD.',
+        )
+        parser.add_argument(
+            '--chunk-days',
+            type=int,
+            default=31,
+            help='Days recomputed per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if options['chunk_days'] < 1:
+            raise CommandError('--chunk-days must be at least 1.')
+        if options['start'] and options['end'] and \
+                options['end'] < options['start']:
+            raise CommandError('--end must not be before --start.')
+        started = time.perf_counter()
+        written = rollups.backfill(
+            options['start'],
+            options['end'],
+            chunk_days=options['chunk_days'],
+            report=self.report if options['verbosity'] >= 2 else None,
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {written} rollup rows in {elapsed:.2f}s.'))
+
+    def report(self, start, end, rows):
+        self.stdout.write(f'Days from {start} up to {end}: {rows} rows')
@@ -0,0 +1,150 @@
+"""
+Django command to bulk import venues, groups, subgroups or events
+"""
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, connections, transaction
+
+from core.cache import invalidate
+from core.imports import IMPORTS, READERS, Loader
+
+
+def batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Command(BaseCommand):
+    """Django command to import rows from NDJSON or CSV."""
+    help = (
+        'Import venues, groups, subgroups or events from NDJSON or CSV. '
+        'Related rows can be given by id (e.g. venue_id) or by name '
+        '(e.g. venue), and the files written by /api/export/ can be '
+        'imported as they are.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('resource', choices=sorted(IMPORTS))
+        parser.add_argument(
+            'path', help='File to read, or - for standard input.')
+        parser.add_argument(
+            '--format',
+            choices=sorted(READERS),
+            help='Input format. Defaults to the file extension.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Rows validated and written at a time.',
+        )
+        parser.add_argument(
+            '--method',
+            choices=['copy', 'bulk'],
+            help='Write with COPY (PostgreSQL only) or bulk_create. '
+                 'Defaults to COPY where available.',
+        )
+        parser.add_argument(
+            '--keep-ids',
+            action='store_true',
+            help='Insert the id column as given instead of ignoring it.',
+        )
+        parser.add_argument(
+            '--skip-invalid',
+            action='store_true',
+            help='Report and skip invalid rows instead of aborting.',
+        )
+        parser.add_argument('--database', default='default')
+
+    def get_format(self, options):
+        if options['format']:
+            return options['format']
+        extension = os.path.splitext(options['path'])[1].lower()
+        if extension in ('.ndjson', '.jsonl'):
+            return 'ndjson'
+        if extension == '.csv':
+            return 'csv'
+        raise CommandError(
+            'Cannot tell the format from the file name, use --format.')
+
+    def get_method(self, options):
+        vendor = connections[options['database']].vendor
+        method = options['method']
+        if method is None:
+            return 'copy' if vendor == 'postgresql' else 'bulk'
+        if method == 'copy' and vendor != 'postgresql':
+            raise CommandError('COPY needs a PostgreSQL database.')
+        return method
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        spec = IMPORTS[options['resource']]
+        read = READERS[self.get_format(options)]
+        method = self.get_method(options)
+        loader = Loader(
+            spec, using=options['database'], keep_ids=options['keep_ids'])
+
+        if options['path'] == '-':
+            stream = sys.stdin
+        else:
+            try:
+                stream = open(options['path'], newline='', encoding='utf-8')
+            except OSError as exc:
+                raise CommandError(exc)
+
+        started = time.perf_counter()
+        imported = skipped = 0
+        try:
+            with transaction.atomic(using=options['database']):
+                for batch in batches(read(stream), options['batch_size']):
+                    valid, invalid = loader.clean_batch(batch)
+                    for number, errors in invalid:
+                        self.report(number, errors)
+                    if invalid and not options['skip_invalid']:
+                        raise CommandError(
+                            f'{len(invalid)} invalid rows in the batch '
+                            f'ending at line {batch[-1][0]}, nothing was '
+                            'imported. Use --skip-invalid to skip them.')
+                    loader.write(valid, method)
+                    imported += len(valid)
+                    skipped += len(invalid)
+                    if options['verbosity'] >= 2:
+                        self.stdout.write(
+                            f'{imported} rows '
+                            f'({self.rate(imported, started)} rows/s)')
+                loader.finish()
+                loader.refresh()
+        except IntegrityError as exc:
+            raise CommandError(f'Nothing was imported: {exc}')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        invalidate(spec.model)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} {options["resource"]} in {elapsed:.2f}s '
+            f'({self.rate(imported, started)} rows/s) with {method}.'))
+        if skipped:
+            self.stdout.write(self.style.WARNING(
+                f'Skipped {skipped} invalid rows.'))
+
+    def rate(self, count, started):
+        elapsed = time.perf_counter() - started
+        return int(count / elapsed) if elapsed > 0 else count
+
+    def report(self, number, errors):
+        for column, messages in errors.items():
+            for message in messages:
+                self.stderr.write(f'Line {number}: {column}: {message}')
@@ -0,0 +1,38 @@
+"""
+Django command to rebuild group memberships and venue access
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core import access
+
+
+class Command(BaseCommand):
+    """Django command to recompute the access index from scratch."""
+    help = (
+        'Recompute group memberships from user_org and the venues each '
+        'user may see. Signals keep both up to date; run this after '
+        'writing users, groups or venues outside the ORM.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Users recomputed at a time.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        started = time.perf_counter()
+        with transaction.atomic():
+            changed = access.rebuild(batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt access in {elapsed:.2f}s, '
+            f'{changed} users\' access changed.'))
@@ -0,0 +1,44 @@
+"""
+Django command to recompute event counts on venues, groups and subgroups
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import summaries
+
+
+class Command(BaseCommand):
+    """Django command to recompute the event summary columns."""
+    help = (
+        'Recompute event counts and next event times on venues, groups '
+        'and subgroups. With --stale, only recompute rows whose next '
+        'event has started; run that every few minutes to keep upcoming '
+        'counts current.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale',
+            action='store_true',
+            help='Only recompute rows whose next event has started.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows recomputed per UPDATE in a full rebuild.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        started = time.perf_counter()
+        if options['stale']:
+            updated = summaries.refresh_stale()
+        else:
+            updated = summaries.rebuild(batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Recomputed {updated} rows in {elapsed:.2f}s.'))
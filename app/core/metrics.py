@@ -0,0 +1,277 @@
+"""
+Request metrics, exported in the Prometheus text format.
+
+Each process records its own metrics. With several worker processes, set
+`METRICS_DIR` to a directory they all share: each worker then writes a
+snapshot of its metrics to a file there every `METRICS_FLUSH_SECONDS`,
+and `/api/metrics/` merges the snapshots of every worker, so any worker
+can answer a scrape. Histograms and counters are summed, and so are
+gauges, which are dropped from a worker's snapshot once it exits (see
+`mark_process_dead`). Without `METRICS_DIR` a scrape only shows the
+worker that served it.
+"""
+import bisect
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+
+DURATION_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class Histogram:
+    """Cumulative histogram with fixed upper bounds."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def merge(self, counts, count, total):
+        """Add the counts of another histogram with the same buckets."""
+        self.counts = [a + b for a, b in zip(self.counts, counts)]
+        self.count += count
+        self.sum += total
+
+    def samples(self):
+        """Yield (le, cumulative count) pairs, ending with +Inf."""
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield _format_number(bound), total
+        yield '+Inf', self.count
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+def _labels(labels):
+    return ','.join(f'{key}="{_escape(value)}"' for key, value in labels)
+
+
+def get_metrics_dir():
+    """Return the directory shared by the workers, or None."""
+    return getattr(settings, 'METRICS_DIR', None)
+
+
+def get_flush_seconds():
+    return getattr(settings, 'METRICS_FLUSH_SECONDS', 1.0)
+
+
+def _snapshot_path(directory, pid):
+    return os.path.join(directory, f'{pid}.json')
+
+
+def _write_snapshot(path, snapshot):
+    # Written to a temporary file and renamed, so readers never see a
+    # partial snapshot.
+    fd, temporary = tempfile.mkstemp(
+        dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(temporary, path)
+
+
+def _read_snapshot(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def clear_metrics_dir():
+    """Create the shared directory, removing the snapshots of a past run."""
+    directory = get_metrics_dir()
+    if directory is None:
+        return
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        os.remove(path)
+
+
+def mark_process_dead(pid):
+    """Drop the gauges of an exited worker, keeping its totals."""
+    directory = get_metrics_dir()
+    if directory is None:
+        return
+    path = _snapshot_path(directory, pid)
+    snapshot = _read_snapshot(path)
+    if snapshot is not None:
+        snapshot['gauge'] = {}
+        _write_snapshot(path, snapshot)
+
+
+class MetricsRegistry:
+    """Thread-safe store of labelled histograms and gauge callbacks."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._series = defaultdict(dict)
+        self._callbacks = {}
+        self._flusher = None
+        # A forked worker starts its own flusher, and its own snapshot.
+        os.register_at_fork(after_in_child=self._forked)
+
+    def _forked(self):
+        self._flusher = None
+        self.reset()
+
+    def histogram(self, name, help_text, buckets=DURATION_BUCKETS):
+        """Declare a histogram metric."""
+        self._histograms[name] = (help_text, buckets)
+
+    def gauge(self, name, help_text, callback):
+        """Declare a gauge read from callback() -> {labels tuple: value}."""
+        self._callbacks[name] = ('gauge', help_text, callback)
+
+    def counter(self, name, help_text, callback):
+        """Declare a counter read from callback() -> {labels tuple: value}."""
+        self._callbacks[name] = ('counter', help_text, callback)
+
+    def observe(self, name, labels, value):
+        """Record value in the histogram `name` for labels."""
+        labels = tuple(labels)
+        with self._lock:
+            series = self._series[name]
+            histogram = series.get(labels)
+            if histogram is None:
+                histogram = series[labels] = Histogram(
+                    self._histograms[name][1])
+            histogram.observe(value)
+        if self._flusher is None and get_metrics_dir() is not None:
+            self._start_flusher()
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def _start_flusher(self):
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(
+                target=self._flush_forever, name='metrics-flush',
+                daemon=True)
+        self._flusher.start()
+
+    def _flush_forever(self):
+        while True:
+            time.sleep(get_flush_seconds())
+            self.flush()
+
+    def snapshot(self):
+        """Return this process's metrics as JSON-serializable lists."""
+        snapshot = {'histogram': {}, 'counter': {}, 'gauge': {}}
+        with self._lock:
+            for name in self._histograms:
+                snapshot['histogram'][name] = [
+                    [labels, list(histogram.counts), histogram.count,
+                     histogram.sum]
+                    for labels, histogram in self._series[name].items()
+                ]
+        for name, (kind, _, callback) in self._callbacks.items():
+            snapshot[kind][name] = [
+                [labels, value] for labels, value in callback().items()]
+        return snapshot
+
+    def flush(self):
+        """Write this process's snapshot to `METRICS_DIR`."""
+        directory = get_metrics_dir()
+        if directory is not None:
+            _write_snapshot(
+                _snapshot_path(directory, os.getpid()), self.snapshot())
+
+    def collect(self):
+        """Return the merged (histograms, callback values) of every worker.
+
+        `histograms` maps names to {labels: Histogram}, and the callback
+        values map names to {labels: value}.
+        """
+        snapshots = [self.snapshot()]
+        directory = get_metrics_dir()
+        if directory is not None:
+            own = _snapshot_path(directory, os.getpid())
+            for path in glob.glob(os.path.join(directory, '*.json')):
+                if path != own:
+                    snapshots.append(_read_snapshot(path))
+        histograms = {name: {} for name in self._histograms}
+        values = {name: defaultdict(int) for name in self._callbacks}
+        for snapshot in filter(None, snapshots):
+            for name, series in snapshot['histogram'].items():
+                if name not in histograms:
+                    continue
+                for labels, counts, count, total in series:
+                    labels = tuple(map(tuple, labels))
+                    histogram = histograms[name].get(labels)
+                    if histogram is None:
+                        histogram = histograms[name][labels] = Histogram(
+                            self._histograms[name][1])
+                    histogram.merge(counts, count, total)
+            for kind in ('counter', 'gauge'):
+                for name, series in snapshot[kind].items():
+                    if name not in values:
+                        continue
+                    for labels, value in series:
+                        values[name][tuple(map(tuple, labels))] += value
+        return histograms, values
+
+    def render(self):
+        """Return every metric in the Prometheus text format."""
+        histograms, values = self.collect()
+        lines = []
+        for name, (help_text, _) in self._histograms.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for labels, histogram in sorted(histograms[name].items()):
+                base = _labels(labels)
+                for le, count in histogram.samples():
+                    lines.append(
+                        f'{name}_bucket{{{base},le="{le}"}} {count}')
+                total = _format_number(histogram.sum)
+                lines.append(f'{name}_sum{{{base}}} {total}')
+                lines.append(f'{name}_count{{{base}}} {histogram.count}')
+        for name, (kind, help_text, _) in self._callbacks.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in sorted(values[name].items()):
+                lines.append(f'{name}{{{_labels(labels)}}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+registry.histogram(
+    'lyre_request_duration_seconds', 'Total time spent handling a request.')
+registry.histogram(
+    'lyre_request_view_seconds',
+    'Time spent in the view, excluding response rendering.')
+registry.histogram(
+    'lyre_request_db_seconds', 'Time spent executing SQL queries.')
+registry.histogram(
+    'lyre_request_serialize_seconds', 'Time spent rendering the response.')
+registry.histogram(
+    'lyre_request_queries', 'SQL queries executed per request.',
+    buckets=QUERY_BUCKETS)
@@ -0,0 +1,150 @@
+"""
+Middleware for the API.
+"""
+import asyncio
+import contextvars
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from core.metrics import registry
+
+
+_current_timings = contextvars.ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Query count and timings collected while handling one request."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.render_start = None
+        self.serialize = 0.0
+
+    def rendered(self, response):
+        """Post-render callback closing the serialization span."""
+        if self.render_start is not None:
+            self.serialize += time.perf_counter() - self.render_start
+            self.render_start = None
+
+
+def time_query(execute, sql, params, many, context):
+    """Execute wrapper charging queries to the current request, if any.
+
+    The request is found through a context variable, so queries are
+    counted on whichever thread the view runs.
+    """
+    timings = _current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db += time.perf_counter() - start
+        timings.queries += 1
+
+
+def install_query_timer(connection):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+def _connection_created(sender, connection, **kwargs):
+    install_query_timer(connection)
+
+
+def render_response(response):
+    """Render a deferred response, timing it for the current request."""
+    if not hasattr(response, 'render') or response.is_rendered:
+        return response
+    timings = _current_timings.get()
+    if timings is None:
+        return response.render()
+    start = time.perf_counter()
+    response.render()
+    timings.serialize += time.perf_counter() - start
+    return response
+
+
+class RequestMetricsMiddleware:
+    """Record per-request SQL count, DB time, serialization and view time.
+
+    The numbers are sent back in a `Server-Timing` header and aggregated
+    into per-route histograms served at `/api/metrics/`. Set
+    `REQUEST_METRICS_ENABLED = False` to remove the middleware entirely.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', True):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Mark the instance as a coroutine function for the handler.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+        connection_created.connect(_connection_created)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        for connection in connections.all():
+            install_query_timer(connection)
+        timings = self.start(request)
+        token = _current_timings.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_timings.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = self.start(request)
+        token = _current_timings.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_timings.reset(token)
+        return self.finish(request, response, timings)
+
+    def start(self, request):
+        timings = RequestTimings()
+        request._metrics_timings = timings
+        return timings
+
+    def finish(self, request, response, timings):
+        total = time.perf_counter() - timings.start
+        view = total - timings.serialize
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={timings.db * 1000:.2f};desc="{timings.queries} queries"',
+            f'serialize;dur={timings.serialize * 1000:.2f}',
+            f'view;dur={view * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ])
+
+        match = request.resolver_match
+        labels = (
+            ('route', match.view_name if match else 'unmatched'),
+            ('method', request.method),
+        )
+        registry.observe('lyre_request_duration_seconds', labels, total)
+        registry.observe('lyre_request_view_seconds', labels, view)
+        registry.observe('lyre_request_db_seconds', labels, timings.db)
+        registry.observe(
+            'lyre_request_serialize_seconds', labels, timings.serialize)
+        registry.observe('lyre_request_queries', labels, timings.queries)
+        return response
+
+    def process_template_response(self, request, response):
+        """Open the serialization span just before the response renders."""
+        timings = request._metrics_timings
+        timings.render_start = time.perf_counter()
+        response.add_post_render_callback(timings.rendered)
+        return response
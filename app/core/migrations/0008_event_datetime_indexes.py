@@ -0,0 +1,29 @@
+# Generated by Django 3.2.25 on 2026-10-17 22:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_group_is_active'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['venue_id', 'datetime'], name='event_venue_datetime_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['group_id', 'datetime'], name='event_group_datetime_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['subgroup_id', 'datetime'], name='event_subgroup_datetime_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['datetime'], name='event_datetime_idx'),
+        ),
+    ]
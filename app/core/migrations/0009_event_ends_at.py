@@ -0,0 +1,69 @@
+# Generated by Django 3.2.25 on 2026-10-17 23:13
+
+import core.models
+from django.db import migrations
+
+
+def fill_ends_at(apps, schema_editor):
+    """Derive ends_at for the existing events."""
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "UPDATE core_event SET ends_at = datetime + "
+            "make_interval(mins => GREATEST(duration, 0)) "
+            "WHERE datetime IS NOT NULL"
+        )
+        return
+    Event = apps.get_model('core', 'Event')
+    events = Event.objects.using(schema_editor.connection.alias) \
+        .filter(datetime__isnull=False).only('datetime', 'duration')
+    batch = []
+    for event in events.iterator(chunk_size=2000):
+        event.ends_at = core.models.EndTimeField.compute(
+            event.datetime, event.duration)
+        batch.append(event)
+        if len(batch) >= 2000:
+            Event.objects.bulk_update(batch, ['ends_at'])
+            batch = []
+    Event.objects.bulk_update(batch, ['ends_at'])
+
+
+def add_overlap_constraint(apps, schema_editor):
+    """Stop two events overlapping at a venue, on PostgreSQL.
+
+    Fails, naming the rows, if the table already holds double bookings;
+    move those events and migrate again.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    schema_editor.execute(
+        "ALTER TABLE core_event ADD CONSTRAINT event_venue_no_overlap "
+        "EXCLUDE USING gist ("
+        "venue_id_id WITH =, tstzrange(datetime, ends_at, '[)') WITH &&"
+        ") WHERE (datetime IS NOT NULL)"
+    )
+
+
+def drop_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'ALTER TABLE core_event DROP CONSTRAINT IF EXISTS '
+        'event_venue_no_overlap')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_event_datetime_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='ends_at',
+            field=core.models.EndTimeField(duration_field='duration', editable=False, null=True, start_field='datetime'),
+        ),
+        migrations.RunPython(fill_ends_at, migrations.RunPython.noop),
+        migrations.RunPython(add_overlap_constraint, drop_overlap_constraint),
+    ]
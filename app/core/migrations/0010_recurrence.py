@@ -0,0 +1,22 @@
+# Generated by Django 3.2.25 on 2026-10-17 23:20
+
+import core.recurrence
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_event_ends_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Recurrence',
+            fields=[
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recurrence', serialize=False, to='core.event')),
+                ('rule', models.CharField(max_length=255, validators=[core.recurrence.validate_recurrence])),
+            ],
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 3.2.25 on 2026-10-17 23:40
+
+from django.db import migrations
+
+
+# The SQL is frozen here rather than built from core.search, so later
+# changes to the searches do not change what this migration does.
+
+POSTGRESQL_FORWARD = [
+    "CREATE INDEX event_search_idx ON core_event USING gin (((setweight(to_tsvector('english'::regconfig, COALESCE(title, '')), 'A') || setweight(to_tsvector('english'::regconfig, COALESCE(description, '')), 'B'))))",
+    "CREATE INDEX group_search_idx ON core_group USING gin ((setweight(to_tsvector('english'::regconfig, COALESCE(group_name, '')), 'A')))",
+    "CREATE INDEX venue_search_idx ON core_venue USING gin (((setweight(to_tsvector('english'::regconfig, COALESCE(venue_name, '')), 'A') || setweight(to_tsvector('english'::regconfig, COALESCE(address, '')), 'B'))))",
+]
+
+POSTGRESQL_BACKWARD = [
+    'DROP INDEX IF EXISTS event_search_idx',
+    'DROP INDEX IF EXISTS group_search_idx',
+    'DROP INDEX IF EXISTS venue_search_idx',
+]
+
+# External content FTS5 tables, filled once and kept in sync by
+# triggers. SQLite drops the triggers when a later migration rebuilds a
+# table, so such migrations must recreate them.
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE core_event_fts USING fts5(title, description, content='core_event', content_rowid='id', tokenize='porter unicode61')",
+    "INSERT INTO core_event_fts (core_event_fts) VALUES ('rebuild')",
+    'CREATE TRIGGER core_event_fts_insert AFTER INSERT ON core_event BEGIN INSERT INTO core_event_fts (rowid, title, description) VALUES (new.id, new.title, new.description); END',
+    "CREATE TRIGGER core_event_fts_delete AFTER DELETE ON core_event BEGIN INSERT INTO core_event_fts (core_event_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER core_event_fts_update AFTER UPDATE OF title, description ON core_event BEGIN INSERT INTO core_event_fts (core_event_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); INSERT INTO core_event_fts (rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE VIRTUAL TABLE core_group_fts USING fts5(group_name, content='core_group', content_rowid='id', tokenize='porter unicode61')",
+    "INSERT INTO core_group_fts (core_group_fts) VALUES ('rebuild')",
+    'CREATE TRIGGER core_group_fts_insert AFTER INSERT ON core_group BEGIN INSERT INTO core_group_fts (rowid, group_name) VALUES (new.id, new.group_name); END',
+    "CREATE TRIGGER core_group_fts_delete AFTER DELETE ON core_group BEGIN INSERT INTO core_group_fts (core_group_fts, rowid, group_name) VALUES ('delete', old.id, old.group_name); END",
+    "CREATE TRIGGER core_group_fts_update AFTER UPDATE OF group_name ON core_group BEGIN INSERT INTO core_group_fts (core_group_fts, rowid, group_name) VALUES ('delete', old.id, old.group_name); INSERT INTO core_group_fts (rowid, group_name) VALUES (new.id, new.group_name); END",
+    "CREATE VIRTUAL TABLE core_venue_fts USING fts5(venue_name, address, content='core_venue', content_rowid='id', tokenize='porter unicode61')",
+    "INSERT INTO core_venue_fts (core_venue_fts) VALUES ('rebuild')",
+    'CREATE TRIGGER core_venue_fts_insert AFTER INSERT ON core_venue BEGIN INSERT INTO core_venue_fts (rowid, venue_name, address) VALUES (new.id, new.venue_name, new.address); END',
+    "CREATE TRIGGER core_venue_fts_delete AFTER DELETE ON core_venue BEGIN INSERT INTO core_venue_fts (core_venue_fts, rowid, venue_name, address) VALUES ('delete', old.id, old.venue_name, old.address); END",
+    "CREATE TRIGGER core_venue_fts_update AFTER UPDATE OF venue_name, address ON core_venue BEGIN INSERT INTO core_venue_fts (core_venue_fts, rowid, venue_name, address) VALUES ('delete', old.id, old.venue_name, old.address); INSERT INTO core_venue_fts (rowid, venue_name, address) VALUES (new.id, new.venue_name, new.address); END",
+]
+
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS core_event_fts_insert',
+    'DROP TRIGGER IF EXISTS core_event_fts_delete',
+    'DROP TRIGGER IF EXISTS core_event_fts_update',
+    'DROP TABLE IF EXISTS core_event_fts',
+    'DROP TRIGGER IF EXISTS core_group_fts_insert',
+    'DROP TRIGGER IF EXISTS core_group_fts_delete',
+    'DROP TRIGGER IF EXISTS core_group_fts_update',
+    'DROP TABLE IF EXISTS core_group_fts',
+    'DROP TRIGGER IF EXISTS core_venue_fts_insert',
+    'DROP TRIGGER IF EXISTS core_venue_fts_delete',
+    'DROP TRIGGER IF EXISTS core_venue_fts_update',
+    'DROP TABLE IF EXISTS core_venue_fts',
+]
+
+SQL = {
+    'postgresql': (POSTGRESQL_FORWARD, POSTGRESQL_BACKWARD),
+    'sqlite': (SQLITE_FORWARD, SQLITE_BACKWARD),
+}
+
+
+def create_search_indexes(apps, schema_editor):
+    """Add GIN indexes on PostgreSQL and FTS5 tables on SQLite."""
+    forward, _ = SQL.get(schema_editor.connection.vendor, ((), ()))
+    for sql in forward:
+        schema_editor.execute(sql)
+
+
+def drop_search_indexes(apps, schema_editor):
+    _, backward = SQL.get(schema_editor.connection.vendor, ((), ()))
+    for sql in backward:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_recurrence'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 3.2.25 on 2026-10-17 23:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate(apps, schema_editor):
+    """Derive memberships from user_org, and venue access from those."""
+    User = apps.get_model('core', 'User')
+    Group = apps.get_model('core', 'Group')
+    Venue = apps.get_model('core', 'Venue')
+    Membership = apps.get_model('core', 'Membership')
+    VenueAccess = apps.get_model('core', 'VenueAccess')
+    names = {}
+    for pk, name in Group.objects.values_list('pk', 'group_name'):
+        names.setdefault(name, []).append(pk)
+    Membership.objects.bulk_create([
+        Membership(user_id=user, group_id=group)
+        for user, org in User.objects.exclude(
+            user_org='').values_list('pk', 'user_org')
+        for group in names.get(org, ())
+    ], batch_size=1000)
+    pairs = set(Venue.objects.filter(
+        primary_contact__isnull=False,
+    ).values_list('primary_contact', 'pk'))
+    peers = 'primary_contact__memberships__group__memberships__user'
+    pairs |= set(Venue.objects.filter(
+        **{f'{peers}__isnull': False},
+    ).values_list(peers, 'pk'))
+    VenueAccess.objects.bulk_create([
+        VenueAccess(user_id=user, venue_id=venue) for user, venue in pairs
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='user_org',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+        migrations.CreateModel(
+            name='VenueAccess',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='venue_access', to=settings.AUTH_USER_MODEL)),
+                ('venue', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='access', to='core.venue')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Membership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='core.group')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='venueaccess',
+            index=models.Index(fields=['venue', 'user'], name='venue_access_venue_user_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='venueaccess',
+            constraint=models.UniqueConstraint(fields=('user', 'venue'), name='venue_access_user_venue_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(fields=['group', 'user'], name='membership_group_user_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='membership',
+            constraint=models.UniqueConstraint(fields=('user', 'group'), name='membership_user_group_uniq'),
+        ),
+        migrations.RunPython(populate, migrations.RunPython.noop),
+    ]
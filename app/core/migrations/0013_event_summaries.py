@@ -0,0 +1,116 @@
+# Generated by Django 3.2.25 on 2026-10-17 23:46
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def count(events, field):
+    return Coalesce(Subquery(
+        events.values(field).annotate(count=Count('pk')).values('count'),
+        output_field=IntegerField(),
+    ), 0)
+
+
+def populate(apps, schema_editor):
+    """Count the events already pointing at each row."""
+    Event = apps.get_model('core', 'Event')
+    now = timezone.now()
+    for field, model_name in [
+        ('venue_id', 'Venue'),
+        ('group_id', 'Group'),
+        ('subgroup_id', 'SubGroup'),
+    ]:
+        events = Event.objects.filter(**{field: OuterRef('pk')}).order_by()
+        upcoming = events.filter(datetime__gte=now)
+        apps.get_model('core', model_name).objects.update(
+            event_count=count(events, field),
+            upcoming_event_count=count(upcoming, field),
+            next_event_at=Subquery(
+                upcoming.order_by('datetime').values('datetime')[:1]),
+        )
+
+
+# Frozen from migration 0011: the FTS5 triggers of the venue and group
+# tables, which SQLite drops when AddField rebuilds them, and the rebuild
+# of their FTS5 tables.
+SEARCH_TRIGGERS = [
+    'CREATE TRIGGER core_group_fts_insert AFTER INSERT ON core_group BEGIN INSERT INTO core_group_fts (rowid, group_name) VALUES (new.id, new.group_name); END',
+    "CREATE TRIGGER core_group_fts_delete AFTER DELETE ON core_group BEGIN INSERT INTO core_group_fts (core_group_fts, rowid, group_name) VALUES ('delete', old.id, old.group_name); END",
+    "CREATE TRIGGER core_group_fts_update AFTER UPDATE OF group_name ON core_group BEGIN INSERT INTO core_group_fts (core_group_fts, rowid, group_name) VALUES ('delete', old.id, old.group_name); INSERT INTO core_group_fts (rowid, group_name) VALUES (new.id, new.group_name); END",
+    'CREATE TRIGGER core_venue_fts_insert AFTER INSERT ON core_venue BEGIN INSERT INTO core_venue_fts (rowid, venue_name, address) VALUES (new.id, new.venue_name, new.address); END',
+    "CREATE TRIGGER core_venue_fts_delete AFTER DELETE ON core_venue BEGIN INSERT INTO core_venue_fts (core_venue_fts, rowid, venue_name, address) VALUES ('delete', old.id, old.venue_name, old.address); END",
+    "CREATE TRIGGER core_venue_fts_update AFTER UPDATE OF venue_name, address ON core_venue BEGIN INSERT INTO core_venue_fts (core_venue_fts, rowid, venue_name, address) VALUES ('delete', old.id, old.venue_name, old.address); INSERT INTO core_venue_fts (rowid, venue_name, address) VALUES (new.id, new.venue_name, new.address); END",
+    "INSERT INTO core_group_fts (core_group_fts) VALUES ('rebuild')",
+    "INSERT INTO core_venue_fts (core_venue_fts) VALUES ('rebuild')",
+]
+
+
+def restore_search_triggers(apps, schema_editor):
+    """Recreate the FTS5 triggers SQLite dropped with the old tables."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in SEARCH_TRIGGERS:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_membership_access'),
+    ]
+
+    operations = [
+        # Removing the columns again also rebuilds the tables.
+        migrations.RunPython(
+            migrations.RunPython.noop, restore_search_triggers),
+        migrations.AddField(
+            model_name='group',
+            name='event_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='next_event_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='upcoming_event_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='subgroup',
+            name='event_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='subgroup',
+            name='next_event_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='subgroup',
+            name='upcoming_event_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='venue',
+            name='event_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='venue',
+            name='next_event_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='venue',
+            name='upcoming_event_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(
+            restore_search_triggers, migrations.RunPython.noop),
+        migrations.RunPython(populate, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 3.2.25 on 2026-10-17 23:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_event_summaries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('week', models.DateField()),
+                ('event_count', models.IntegerField(default=0)),
+                ('booked_minutes', models.BigIntegerField(default=0)),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='core.group')),
+                ('venue', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='core.venue')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='eventrollup',
+            index=models.Index(fields=['venue', 'day'], name='event_rollup_venue_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventrollup',
+            index=models.Index(fields=['group', 'day'], name='event_rollup_group_day_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='eventrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'venue', 'group'), name='event_rollup_day_venue_group_uniq'),
+        ),
+    ]
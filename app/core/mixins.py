@@ -0,0 +1,420 @@
+"""
+Reusable mixins for the API viewsets.
+"""
+import time
+
+from django.core.exceptions import (
+    FieldDoesNotExist,
+    ValidationError as DjangoValidationError,
+)
+from django.db import connection, transaction
+from rest_framework import fields as drf_fields, relations, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from core.cache import invalidate
+from core.db import routers
+
+
+class PrefetchedRelated:
+    """Stand-in queryset for a related field that serves `get(pk=...)`
+    from rows fetched up front, so validating a batch costs one query per
+    related model instead of one per item.
+    """
+
+    def __init__(self, queryset, values):
+        self.model = queryset.model
+        pks = set()
+        for value in values:
+            try:
+                pks.add(self.model._meta.pk.to_python(value))
+            except (DjangoValidationError, TypeError):
+                continue
+        self.rows = queryset.in_bulk(pks) if pks else {}
+
+    def get(self, pk):
+        try:
+            pk = self.model._meta.pk.to_python(pk)
+        except DjangoValidationError:
+            raise ValueError(pk)
+        try:
+            return self.rows[pk]
+        except KeyError:
+            raise self.model.DoesNotExist()
+
+
+class BulkModelMixin:
+    """Add list-accepting create, update and delete actions at `bulk/`.
+
+    Items are validated together and written with `bulk_create`,
+    `bulk_update` or a single `DELETE ... WHERE id IN (...)` inside one
+    transaction. The response reports a status for every item, in order.
+    Bulk writes skip model signals, so the whole response cache for the
+    model is invalidated afterwards.
+    """
+    bulk_batch_size = 1000
+    bulk_max_items = 10000
+    # Validated fields that are not columns of the model. They are left
+    # out of the bulk write and passed to `save_bulk_deferred`.
+    bulk_deferred_fields = ()
+
+    def get_bulk_save_kwargs(self):
+        """Return attributes set on every instance a bulk request writes."""
+        return {}
+
+    def pop_bulk_deferred(self, validated_data):
+        return {
+            name: validated_data.pop(name)
+            for name in self.bulk_deferred_fields if name in validated_data
+        }
+
+    def save_bulk_deferred(self, pairs):
+        """Save the deferred values of (instance, values) pairs."""
+
+    def after_bulk_write(self, objs):
+        """Update what depends on the instances a bulk write saved."""
+
+    def check_write(self, validated_data):
+        """Raise an APIException if the user may not write this data."""
+
+    def get_bulk_data(self, request):
+        """Return the request body, which must be a list of items."""
+        data = request.data
+        if not isinstance(data, list):
+            raise ValidationError('Expected a list of items.')
+        if len(data) > self.bulk_max_items:
+            raise ValidationError(
+                f'Send at most {self.bulk_max_items} items per request.')
+        return data
+
+    def get_related_lookups(self, data):
+        """Return batch-fetched lookups for the writable related fields."""
+        lookups = {}
+        for name, field in self.get_serializer().fields.items():
+            if not isinstance(field, relations.PrimaryKeyRelatedField) or \
+                    field.read_only:
+                continue
+            values = [
+                item.get(name) for item in data
+                if isinstance(item, dict) and item.get(name) is not None
+            ]
+            lookups[name] = PrefetchedRelated(field.get_queryset(), values)
+        return lookups
+
+    def validate_bulk_items(self, data, instances=None):
+        """Validate each item and return (results, valid) lists."""
+        lookups = self.get_related_lookups(data)
+        results, valid = [], []
+        for index, item in enumerate(data):
+            instance = None
+            if instances is not None:
+                instance = instances.get(item.get('id')) \
+                    if isinstance(item, dict) else None
+                if instance is None:
+                    results.append({
+                        'index': index,
+                        'status': status.HTTP_404_NOT_FOUND,
+                        'errors': {'id': ['Not found.']},
+                    })
+                    continue
+            serializer = self.get_serializer(
+                instance, data=item, partial=instances is not None)
+            for name, lookup in lookups.items():
+                serializer.fields[name].queryset = lookup
+            if not serializer.is_valid():
+                results.append({
+                    'index': index,
+                    'status': status.HTTP_400_BAD_REQUEST,
+                    'errors': serializer.errors,
+                })
+                continue
+            try:
+                self.check_write(serializer.validated_data)
+            except APIException as exc:
+                results.append({
+                    'index': index,
+                    'status': exc.status_code,
+                    'errors': exc.get_full_details(),
+                })
+                continue
+            results.append({'index': index})
+            valid.append((results[-1], instance, serializer.validated_data))
+        return results, valid
+
+    def bulk_response(self, results, success_status, code=None):
+        """Return the per-item results with an overall status."""
+        for result in results:
+            result.setdefault('status', success_status)
+        failed = [r for r in results if r['status'] != success_status]
+        if not failed:
+            code = code or success_status
+        elif len(failed) == len(results):
+            code = status.HTTP_400_BAD_REQUEST
+        else:
+            code = status.HTTP_207_MULTI_STATUS
+        return Response({'results': results}, status=code)
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request, *args, **kwargs):
+        """Create a list of objects."""
+        data = self.get_bulk_data(request)
+        results, valid = self.validate_bulk_items(data)
+        model = self.get_queryset().model
+        extra = self.get_bulk_save_kwargs()
+        deferred = [
+            self.pop_bulk_deferred(validated_data)
+            for _, _, validated_data in valid
+        ]
+        objs = [
+            model(**dict(validated_data, **extra))
+            for _, _, validated_data in valid
+        ]
+        pairs = [
+            (obj, values) for obj, values in zip(objs, deferred)
+            if any(values.values())
+        ]
+        with transaction.atomic():
+            if pairs and not \
+                    connection.features.can_return_rows_from_bulk_insert:
+                # Deferred values need the new ids, so save those singly.
+                for obj, _ in pairs:
+                    obj.save()
+                model.objects.bulk_create(
+                    [obj for obj in objs if obj.pk is None],
+                    batch_size=self.bulk_batch_size)
+            else:
+                model.objects.bulk_create(
+                    objs, batch_size=self.bulk_batch_size)
+            self.save_bulk_deferred(pairs)
+            self.after_bulk_write(objs)
+            invalidate(model)
+        for (result, _, _), obj in zip(valid, objs):
+            result['id'] = obj.pk
+        return self.bulk_response(results, status.HTTP_201_CREATED)
+
+    @bulk.mapping.patch
+    def bulk_update(self, request, *args, **kwargs):
+        """Partially update a list of objects identified by `id`."""
+        data = self.get_bulk_data(request)
+        ids = [item.get('id') for item in data if isinstance(item, dict)]
+        model = self.get_queryset().model
+        instances = self.get_queryset().in_bulk(
+            [pk for pk in ids if isinstance(pk, int)])
+        results, valid = self.validate_bulk_items(data, instances)
+        extra = self.get_bulk_save_kwargs()
+        fields = set(extra)
+        objs, pairs = [], []
+        for result, instance, validated_data in valid:
+            values = self.pop_bulk_deferred(validated_data)
+            if values:
+                pairs.append((instance, values))
+            for name, value in dict(validated_data, **extra).items():
+                setattr(instance, name, value)
+            fields.update(validated_data)
+            result['id'] = instance.pk
+            objs.append(instance)
+        if objs and (fields or pairs):
+            with transaction.atomic():
+                if fields:
+                    model.objects.bulk_update(
+                        objs, sorted(fields),
+                        batch_size=self.bulk_batch_size)
+                self.save_bulk_deferred(pairs)
+                self.after_bulk_write(objs)
+                invalidate(model)
+        return self.bulk_response(results, status.HTTP_200_OK)
+
+    @bulk.mapping.delete
+    def bulk_destroy(self, request, *args, **kwargs):
+        """Delete a list of objects by id."""
+        data = self.get_bulk_data(request)
+        queryset = self.get_queryset()
+        found = set(queryset.filter(
+            pk__in=[pk for pk in data if isinstance(pk, int)]
+        ).values_list('pk', flat=True))
+        with transaction.atomic():
+            queryset.model.objects.filter(pk__in=found).delete()
+            invalidate(queryset.model)
+        results = []
+        for index, pk in enumerate(data):
+            result = {'index': index, 'id': pk}
+            if pk not in found:
+                result['status'] = status.HTTP_404_NOT_FOUND
+            results.append(result)
+        return self.bulk_response(
+            results, status.HTTP_204_NO_CONTENT, status.HTTP_200_OK)
+
+
+class SparseFieldsMixin:
+    """Support `?fields=` and `?expand=` on `list` and `retrieve`.
+
+    Trimmed fields are pushed down into `.only()` and expanded relations
+    are loaded with `select_related()`, so the query count of a page does
+    not grow with its size.
+    """
+    fields_query_param = 'fields'
+    expand_query_param = 'expand'
+
+    def _param_list(self, name):
+        value = self.request.query_params.get(name, '')
+        return [item.strip() for item in value.split(',') if item.strip()]
+
+    def get_sparse_options(self):
+        """Return validated (fields, expand) lists for the request."""
+        if self.action not in ('list', 'retrieve'):
+            return [], []
+        if getattr(self, '_sparse_options', None) is None:
+            serializer_class = self.get_serializer_class()
+            expandable = getattr(
+                serializer_class.Meta, 'expandable_fields', {})
+            fields = self._param_list(self.fields_query_param)
+            expand = self._param_list(self.expand_query_param)
+
+            unknown = [name for name in expand if name not in expandable]
+            if unknown:
+                raise ValidationError(
+                    {self.expand_query_param: [
+                        f'Cannot expand: {", ".join(unknown)}.']})
+            optional = getattr(serializer_class.Meta, 'optional_fields', ())
+            available = set(serializer_class().fields) | set(expandable) | \
+                set(optional)
+            unknown = [name for name in fields if name not in available]
+            if unknown:
+                raise ValidationError(
+                    {self.fields_query_param: [
+                        f'Unknown fields: {", ".join(unknown)}.']})
+            self._sparse_options = fields, expand
+        return self._sparse_options
+
+    def get_serializer(self, *args, **kwargs):
+        fields, expand = self.get_sparse_options()
+        if fields:
+            kwargs.setdefault('fields', fields)
+        if expand:
+            kwargs.setdefault('expand', expand)
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fields, expand = self.get_sparse_options()
+        if not fields and not expand:
+            return queryset
+        if expand:
+            queryset = queryset.select_related(*expand)
+        only = self._only_fields(queryset.model, self.get_serializer())
+        if only is not None:
+            ordering = getattr(self.paginator, 'ordering', ())
+            only.update(name.lstrip('-') for name in ordering)
+            queryset = queryset.only(*only)
+        return queryset
+
+    def _only_fields(self, model, serializer, prefix=''):
+        """Return the model fields serializer reads, or None if unknown."""
+        names = {prefix + model._meta.pk.name}
+        for field in serializer.fields.values():
+            if field.write_only:
+                continue
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                return None
+            if not model_field.concrete:
+                return None
+            names.add(prefix + model_field.name)
+            if hasattr(field, 'fields'):
+                nested = self._only_fields(
+                    model_field.related_model, field,
+                    prefix=f'{prefix}{model_field.name}__')
+                if nested is None:
+                    return None
+                names.update(nested)
+        return names
+
+
+FAST_FIELD_TYPES = (
+    drf_fields.BooleanField,
+    drf_fields.CharField,
+    drf_fields.IntegerField,
+    relations.PrimaryKeyRelatedField,
+)
+
+
+class FastListMixin:
+    """Serve `list` responses straight from `.values()` rows.
+
+    The serializer is only consulted for its field names, skipping the
+    per-field `to_representation` calls. This only applies when every
+    field renders the database value unchanged (str, int, bool and pk
+    relations under their own names); anything else, including
+    `?expand=`, falls back to the regular path.
+    """
+    fast_list = True
+
+    def get_fast_list_fields(self):
+        """Return the field names for the fast path, or None."""
+        if not self.fast_list:
+            return None
+        if getattr(self, 'get_sparse_options', None) and \
+                self.get_sparse_options()[1]:
+            return None
+        names = []
+        for name, field in self.get_serializer().fields.items():
+            if field.write_only:
+                continue
+            if not isinstance(field, FAST_FIELD_TYPES) or \
+                    field.source != name:
+                return None
+            names.append(name)
+        ordering = getattr(self.paginator, 'ordering', ())
+        if not {name.lstrip('-') for name in ordering} <= set(names):
+            return None
+        return names
+
+    def list(self, request, *args, **kwargs):
+        names = self.get_fast_list_fields()
+        if names is None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset()).values(*names)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(list(queryset))
+
+
+class ReplicaReadMixin:
+    """Serve safe requests from a read replica.
+
+    Unsafe requests pin their user to the primary for a while so they
+    read their own writes. Responses read from a replica shortly after
+    the data changed are not stored in the response cache, since the
+    replica may not have caught up yet.
+    """
+    replica_reads = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if not routers.get_replicas():
+            return
+        if request.method in SAFE_METHODS and \
+                not routers.is_pinned(request.user):
+            self.replica_reads = routers.replica_reads()
+            self.replica_reads.__enter__()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self.replica_reads is not None:
+            self.replica_reads.__exit__(None, None, None)
+        elif request.method not in SAFE_METHODS and \
+                routers.get_replicas() and \
+                request.user.is_authenticated and response.status_code < 400:
+            routers.pin_to_primary(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def should_cache(self, response):
+        if self.replica_reads is not None:
+            _, versions = self.get_cache_versions()
+            age = time.time_ns() - max(versions)
+            if age < routers.get_pin_seconds() * 10 ** 9:
+                return False
+        return super().should_cache(response)
@@ -1,14 +1,84 @@
 """
 Database models.
 """
+from datetime import timedelta
+
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
     PermissionsMixin,
 )
 
+from core import recurrence
+
+
+_default_pks = {}
+
+
+def get_cached_default_pk(model, **lookup):
+    """Return the pk of the default row for model, resolving it once.
+
+    The pk is only cached once the transaction that found or created the
+    row commits, so a rolled back default row is never handed out.
+    """
+    pk = _default_pks.get(model)
+    if pk is not None:
+        return pk
+    if not model.objects.exists():
+        return None
+    instance, created = model.objects.get_or_create(**lookup)
+    transaction.on_commit(
+        lambda: _default_pks.__setitem__(model, instance.pk))
+    return instance.pk
+
+
+def clear_cached_default_pk(model=None, pk=None):
+    """Forget the cached default pk for model, or for every model."""
+    if model is None:
+        _default_pks.clear()
+    elif pk is None or _default_pks.get(model) == pk:
+        _default_pks.pop(model, None)
+
+
+class EndTimeField(models.DateTimeField):
+    """The end of an interval given by a start and a duration in minutes.
+
+    The value is derived in `pre_save`, which both `save()` and
+    `bulk_create()` call, so it can be indexed and constrained without
+    ever being written by hand.
+    """
+
+    def __init__(self, *args, start_field=None, duration_field=None,
+                 **kwargs):
+        self.start_field = start_field
+        self.duration_field = duration_field
+        kwargs.setdefault('null', True)
+        kwargs.setdefault('editable', False)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['start_field'] = self.start_field
+        kwargs['duration_field'] = self.duration_field
+        return name, path, args, kwargs
+
+    @staticmethod
+    def compute(start, duration):
+        """Return the end of an interval; negative durations count as 0."""
+        if start is None:
+            return None
+        return start + timedelta(minutes=max(duration or 0, 0))
+
+    def pre_save(self, model_instance, add):
+        value = self.compute(
+            getattr(model_instance, self.start_field),
+            getattr(model_instance, self.duration_field),
+        )
+        setattr(model_instance, self.attname, value)
+        return value
+
 
 class UserManager(BaseUserManager):
     """Manager for users."""
@@ -39,14 +109,28 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
-    user_org = models.CharField(max_length=255)
+    user_org = models.CharField(max_length=255, db_index=True)
 
     objects = UserManager()
 
     USERNAME_FIELD = 'email'
 
 
-class Venue(models.Model):
+class EventSummary(models.Model):
+    """Counts of the events pointing at a row and when the next starts.
+
+    Kept up to date by `core.summaries`, so listing them costs no query.
+    """
+    event_count = models.IntegerField(default=0, editable=False)
+    upcoming_event_count = models.IntegerField(default=0, editable=False)
+    next_event_at = models.DateTimeField(
+        null=True, blank=True, editable=False, db_index=True)
+
+    class Meta:
+        abstract = True
+
+
+class Venue(EventSummary):
     """Venue Object"""
     venue_name = models.CharField(max_length=255, null=True, blank=True)
     address = models.CharField(max_length=255, null=True, blank=True)
@@ -60,15 +144,10 @@ class Venue(models.Model):
     @classmethod
     def get_default_venue_pk(cls):
         """Returns or creates a default venue for the database."""
-        if not cls.objects.exists():
-            return None
-        venue, created = cls.objects.get_or_create(
-            venue_name='default venue'
-        )
-        return venue.pk
+        return get_cached_default_pk(cls, venue_name='default venue')
 
 
-class Group(models.Model):
+class Group(EventSummary):
     """Returns or creates a default group for the database."""
     group_name = models.CharField(max_length=255, default="default group")
     primary_contact = models.ForeignKey(
@@ -81,12 +160,7 @@ class Group(models.Model):
 
     @classmethod
     def get_default_group_pk(cls):
-        if not cls.objects.exists():
-            return None
-        group, created = cls.objects.get_or_create(
-            group_name='default group'
-        )
-        return group.pk
+        return get_cached_default_pk(cls, group_name='default group')
 
     # @classmethod
     # def get_default_group_pk(cls):
@@ -94,7 +168,7 @@ class Group(models.Model):
     #     return cls.get_default_group().pk
 
 
-class SubGroup(models.Model):
+class SubGroup(EventSummary):
     """Returns or creates a default subgroupfor the database."""
     group_id = models.ForeignKey(
         settings.GROUP_MODEL,
@@ -106,12 +180,7 @@ class SubGroup(models.Model):
 
     @classmethod
     def get_default_subgroup_pk(cls):
-        if not cls.objects.exists():
-            return None
-        subgroup, created = cls.objects.get_or_create(
-            display_name='default subgroup'
-        )
-        return subgroup.pk
+        return get_cached_default_pk(cls, display_name='default subgroup')
 
 
 class Event(models.Model):
@@ -125,6 +194,7 @@ class Event(models.Model):
     title = models.CharField(max_length=255, null=True, blank=True)
     duration = models.IntegerField(default=0)
     datetime = models.DateTimeField(null=True)
+    ends_at = EndTimeField(start_field='datetime', duration_field='duration')
     venue_id = models.ForeignKey(
         settings.VENUE_MODEL,
         on_delete=models.CASCADE,
@@ -145,5 +215,152 @@ class Event(models.Model):
         default=SubGroup.get_default_subgroup_pk
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['venue_id', 'datetime'],
+                name='event_venue_datetime_idx',
+            ),
+            models.Index(
+                fields=['group_id', 'datetime'],
+                name='event_group_datetime_idx',
+            ),
+            models.Index(
+                fields=['subgroup_id', 'datetime'],
+                name='event_subgroup_datetime_idx',
+            ),
+            models.Index(fields=['datetime'], name='event_datetime_idx'),
+        ]
+
     def __str__(self):
         return self.title
+
+    @property
+    def rule(self):
+        """Return the event's recurrence rule, or '' if it happens once."""
+        try:
+            return self.recurrence.rule
+        except Recurrence.DoesNotExist:
+            return ''
+
+    def set_rule(self, rule):
+        """Make the event recur by rule, or happen once if rule is ''."""
+        if rule:
+            self.recurrence, _ = Recurrence.objects.update_or_create(
+                event=self, defaults={'rule': rule})
+        else:
+            Recurrence.objects.filter(event=self).delete()
+            self._state.fields_cache.pop('recurrence', None)
+
+
+class Recurrence(models.Model):
+    """How a recurring event repeats, as an RRULE.
+
+    Few events recur, so rules are kept in their own table rather than
+    widening every event row.
+    """
+    event = models.OneToOneField(
+        settings.EVENT_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='recurrence',
+    )
+    rule = models.CharField(
+        max_length=255, validators=[recurrence.validate_recurrence])
+
+    def __str__(self):
+        return self.rule
+
+
+class Membership(models.Model):
+    """A user's membership of a group.
+
+    Users belong to the groups named by their `user_org`; the rows are
+    kept in step by signals, so scoped queries join on integer keys
+    rather than comparing names.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='memberships',
+    )
+    group = models.ForeignKey(
+        settings.GROUP_MODEL,
+        on_delete=models.CASCADE,
+        related_name='memberships',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'group'], name='membership_user_group_uniq'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['group', 'user'], name='membership_group_user_idx'),
+        ]
+
+
+class VenueAccess(models.Model):
+    """A venue a user may see: one they are the contact for, or one
+    whose contact shares a group with them.
+
+    Denormalized from venue contacts and memberships by `core.access`,
+    so listing a user's venues is a single index range scan.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='venue_access',
+    )
+    venue = models.ForeignKey(
+        settings.VENUE_MODEL,
+        on_delete=models.CASCADE,
+        related_name='access',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'venue'], name='venue_access_user_venue_uniq'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['venue', 'user'], name='venue_access_venue_user_idx'),
+        ]
+
+
+class EventRollup(models.Model):
+    """The events and booked minutes of a venue and group on one day.
+
+    Maintained by `core.rollups`, so reports never scan events.
+    """
+    day = models.DateField()
+    # The Monday of day's week, for weekly reports.
+    week = models.DateField()
+    venue = models.ForeignKey(
+        settings.VENUE_MODEL,
+        on_delete=models.CASCADE,
+        related_name='rollups',
+    )
+    group = models.ForeignKey(
+        settings.GROUP_MODEL,
+        on_delete=models.CASCADE,
+        related_name='rollups',
+    )
+    event_count = models.IntegerField(default=0)
+    booked_minutes = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'venue', 'group'],
+                name='event_rollup_day_venue_group_uniq',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['venue', 'day'], name='event_rollup_venue_day_idx'),
+            models.Index(
+                fields=['group', 'day'], name='event_rollup_group_day_idx'),
+        ]
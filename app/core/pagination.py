@@ -0,0 +1,304 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+"""
+import binascii
+import copy
+import heapq
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from datetime import date, timedelta
+from itertools import islice
+
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_str
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from core.recurrence import occurrences, occurrences_before
+
+
+def _value(row, name):
+    """Return the value of `name` from a model instance or a values() row."""
+    if isinstance(row, dict):
+        return row[name]
+    return getattr(row, name)
+
+
+def _encodable(value):
+    """Return value in a form that survives a JSON round trip."""
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+class KeysetPagination(BasePagination):
+    """Paginate by seeking past the last row seen.
+
+    Pages are selected with a `WHERE (ordering) > (position)` filter and a
+    `LIMIT`, so there is never an `OFFSET` or a `COUNT(*)` and every page
+    costs the same. The last field in `ordering` must be unique.
+
+    NULLs sort after every other value, matching the default PostgreSQL
+    btree ordering so existing indexes can still serve the `ORDER BY`.
+    """
+    ordering = ('-id',)
+    page_size = api_settings.PAGE_SIZE or 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.model = getattr(queryset, 'model', None)
+
+        position, reverse = self.decode_cursor(request)
+        ordering = self.get_ordering(reverse)
+
+        rows = self.fetch(
+            queryset, ordering, position, self.page_size + 1, view)
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        if reverse:
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        if rows:
+            self.first_position = self._position(rows[0])
+            self.last_position = self._position(rows[-1])
+        else:
+            self.first_position = self.last_position = position
+        self.page = rows
+        return rows
+
+    def fetch(self, queryset, ordering, position, limit, view=None):
+        """Return up to limit rows after position, in ordering."""
+        queryset = queryset.order_by(*self._order_by(ordering))
+        if position is not None:
+            queryset = queryset.filter(self._after(ordering, position))
+        return list(queryset[:limit])
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        """Return the requested page size, capped at `max_page_size`."""
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, reverse=False):
+        """Return (field, descending) pairs, flipped for reverse pages."""
+        pairs = []
+        for field in self.ordering:
+            descending = field.startswith('-')
+            pairs.append((field.lstrip('-'), descending != reverse))
+        return pairs
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.last_position, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(self.first_position, reverse=True)
+
+    def encode_cursor(self, position, reverse):
+        """Return a URL pointing past `position`."""
+        payload = {'p': [_encodable(value) for value in position]}
+        if reverse:
+            payload['r'] = 1
+        token = b64encode(json.dumps(payload).encode('ascii'))
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, force_str(token))
+
+    def decode_cursor(self, request):
+        """Return (position, reverse) from the request, or (None, False)."""
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            payload = json.loads(b64decode(token.encode('ascii')))
+            position = payload['p']
+            reverse = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or \
+                len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def _nullable(self, name):
+        return self.model._meta.get_field(name).null
+
+    def _position(self, row):
+        return [_value(row, name) for name, _ in self.get_ordering()]
+
+    def _order_by(self, ordering):
+        expressions = []
+        for name, descending in ordering:
+            if not self._nullable(name):
+                expressions.append(f'-{name}' if descending else name)
+            elif descending:
+                expressions.append(F(name).desc(nulls_first=True))
+            else:
+                expressions.append(F(name).asc(nulls_last=True))
+        return expressions
+
+    def _after(self, ordering, position):
+        """Return a filter matching rows strictly after `position`."""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (name, descending), value in zip(ordering, position):
+            if value is None:
+                if descending:
+                    condition |= equal & Q(**{f'{name}__isnull': False})
+                equal &= Q(**{f'{name}__isnull': True})
+                continue
+
+            lookup = 'lt' if descending else 'gt'
+            after = Q(**{f'{name}__{lookup}': value})
+            if not descending and self._nullable(name):
+                after |= Q(**{f'{name}__isnull': True})
+            condition |= equal & after
+            equal &= Q(**{name: value})
+        return condition
+
+
+class EventKeysetPagination(KeysetPagination):
+    """Keyset pagination in chronological order for events.
+
+    When the view lists a time window, its `get_series()` returns the
+    recurring events whose occurrences belong in the list. Each page
+    merges the stored events with just enough occurrences, expanded
+    lazily, to fill it. An occurrence is a copy of its series' event with
+    the occurrence's start, so it keeps the series' id.
+    """
+    ordering = ('datetime', 'id')
+
+    def fetch(self, queryset, ordering, position, limit, view=None):
+        rows = super().fetch(queryset, ordering, position, limit, view)
+        get_series = getattr(view, 'get_series', None)
+        series = get_series() if get_series is not None else None
+        if not series:
+            return rows
+        reverse = ordering[0][1]
+        after = None
+        if position is not None:
+            if position[0] is None:
+                # Only events without a datetime are left.
+                return rows
+            try:
+                after = (parse_datetime(position[0]), int(position[1]))
+            except (TypeError, ValueError):
+                after = (None, None)
+            if after[0] is None:
+                raise NotFound(self.invalid_cursor_message)
+        start, end = view.get_window()
+        sources = [rows] + [
+            self._occurrences(event, start, end, after, reverse)
+            for event in series
+        ]
+        merged = heapq.merge(
+            *sources, key=lambda row: (row.datetime, row.id),
+            reverse=reverse)
+        return list(islice(merged, limit))
+
+    def _occurrences(self, event, start, end, after, reverse):
+        """Yield event's occurrences in the window strictly past after."""
+        length = event.ends_at - event.datetime
+        tick = timedelta(microseconds=1)
+        if reverse:
+            upper = end
+            if after is not None:
+                bound = after[0] + tick if after[1] > event.pk else after[0]
+                upper = bound if upper is None else min(upper, bound)
+            values = occurrences_before(
+                event.rule, event.datetime, upper, start)
+        else:
+            lower = start
+            if after is not None:
+                bound = after[0] + tick if after[1] >= event.pk else after[0]
+                lower = bound if lower is None else max(lower, bound)
+            values = occurrences(event.rule, event.datetime, lower, end)
+        for value in values:
+            occurrence = copy.copy(event)
+            occurrence.datetime = value
+            occurrence.ends_at = value + length
+            yield occurrence
+
+
+class SearchKeysetPagination(KeysetPagination):
+    """Keyset pagination of search results across several models.
+
+    `paginate_queryset` takes a dict of result type to a queryset
+    annotated with `rank`. Each page reads at most a page from each
+    queryset and merges them, best rank first, then by type and id.
+    """
+    ordering = ('-rank', 'type', 'id')
+
+    def fetch(self, queryset, ordering, position, limit, view=None):
+        (_, rank_descending), (_, type_descending), (_, id_descending) = \
+            ordering
+        if position is not None:
+            rank, kind, pk = position
+            if not isinstance(rank, (int, float)) or \
+                    not isinstance(kind, str) or not isinstance(pk, int):
+                raise NotFound(self.invalid_cursor_message)
+        sources = []
+        for name, rows in queryset.items():
+            if position is not None:
+                after = Q(**{
+                    'rank__lt' if rank_descending else 'rank__gt': rank})
+                later = name < kind if type_descending else name > kind
+                if name == kind:
+                    after |= Q(rank=rank) & Q(**{
+                        'pk__lt' if id_descending else 'pk__gt': pk})
+                elif later:
+                    after |= Q(rank=rank)
+                rows = rows.filter(after)
+            rows = rows.order_by(
+                '-rank' if rank_descending else 'rank',
+                '-pk' if id_descending else 'pk',
+            )[:limit]
+            page = list(rows)
+            for row in page:
+                row.type = name
+            sources.append(page)
+        merged = heapq.merge(
+            *sources, key=lambda row: (-row.rank, row.type, row.id),
+            reverse=not rank_descending)
+        return list(islice(merged, limit))
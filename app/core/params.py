@@ -0,0 +1,57 @@
+"""
+Parsers for query params.
+"""
+from django.utils import timezone
+from django.utils.dateparse import parse_date as parse_iso_date
+from django.utils.dateparse import parse_datetime as parse_iso_datetime
+from rest_framework.exceptions import ValidationError
+
+
+def parse_id(params, name):
+    """Return the integer value of query param `name`, or None."""
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({name: 'Must be an integer.'})
+
+
+def parse_datetime(params, name):
+    """Return the aware datetime value of query param `name`, or None."""
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    parsed = parse_iso_datetime(value)
+    if parsed is None:
+        raise ValidationError({name: 'Must be an ISO 8601 datetime.'})
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, timezone.utc)
+    return parsed
+
+
+def parse_date(params, name):
+    """Return the date value of query param `name`, or None."""
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        parsed = parse_iso_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: 'Must be an ISO 8601 date.'})
+    return parsed
+
+
+def parse_bool(params, name):
+    """Return the boolean value of query param `name`, or None."""
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    if value.lower() in ('1', 'true', 'yes'):
+        return True
+    if value.lower() in ('0', 'false', 'no'):
+        return False
+    raise ValidationError({name: 'Must be true or false.'})
@@ -0,0 +1,127 @@
+"""
+Password checks in a bounded process pool.
+
+Checking a password is deliberately slow: about 100ms of CPU for
+PBKDF2 at Django's default iterations. Run in the request thread, it
+holds the GIL and starves every other request the process serves.
+`PooledModelBackend` sends the work to `PASSWORD_HASH_WORKERS` worker
+processes instead. Logins then use at most that many cores, and the
+request thread only waits. Set `PASSWORD_HASH_WORKERS = 0` to hash in
+the request thread, as the tests do.
+
+Each server process starts its own pool, so a server runs
+`PASSWORD_HASH_WORKERS` extra processes per worker. Pool processes read
+the settings once, when they start: changing the hashers or their costs
+at runtime, e.g. with `override_settings`, does not reach them.
+
+Hashes made with an older algorithm or older costs are replaced with
+the preferred hasher's on the next successful login.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth import get_user_model, hashers
+from django.contrib.auth.backends import ModelBackend
+
+from core import hashing
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_hash_pool():
+    """Return the process pool that checks passwords, or None."""
+    global _pool
+    workers = getattr(settings, 'PASSWORD_HASH_WORKERS', 2)
+    if not workers:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # Forking a threaded server can copy held locks; spawn
+                # starts clean workers that only ever hash.
+                _pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=hashing.init_worker,
+                )
+    return _pool
+
+
+def shutdown_hash_pool():
+    """Stop the workers; the next check starts a new pool."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
+def _run(func, *args):
+    pool = get_hash_pool()
+    if pool is None:
+        return func(*args)
+    try:
+        return pool.submit(func, *args).result()
+    except BrokenProcessPool:
+        # A worker died, e.g. killed for memory; start over next time.
+        shutdown_hash_pool()
+        return func(*args)
+
+
+def check_password(password, encoded):
+    """Return (valid, new hash or None) for password against encoded.
+
+    The new hash is set when encoded should be upgraded to the
+    preferred hasher or its current costs.
+    """
+    return _run(hashing.check, password, encoded)
+
+
+def make_password(password):
+    """Return a hash of password made with the preferred hasher."""
+    return _run(hashing.make, password)
+
+
+class PooledModelBackend(ModelBackend):
+    """`ModelBackend` checking passwords in the hash process pool."""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash anyway, so response times don't reveal which emails
+            # have accounts.
+            make_password(password)
+            return None
+        valid, updated = check_password(password, user.password)
+        if not valid or not self.user_can_authenticate(user):
+            return None
+        if updated is not None:
+            user.password = updated
+            user.save(update_fields=['password'])
+        return user
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """Argon2 with the costs in the `PASSWORD_ARGON2` setting.
+
+    Parallelism defaults to 1, since the hash pool already checks
+    several passwords at once. Changed costs apply to new hashes, and to
+    old ones on their next login.
+    """
+
+    def __init__(self):
+        options = getattr(settings, 'PASSWORD_ARGON2', {})
+        self.time_cost = options.get('TIME_COST', self.time_cost)
+        self.memory_cost = options.get('MEMORY_COST', self.memory_cost)
+        self.parallelism = options.get('PARALLELISM', 1)
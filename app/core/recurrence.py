@@ -0,0 +1,358 @@
+"""
+Recurring events, described by a subset of RFC 5545 RRULEs.
+
+Supported parts are FREQ (DAILY, WEEKLY, MONTHLY or YEARLY), INTERVAL,
+COUNT, UNTIL, BYDAY (weekdays, for WEEKLY) and BYMONTHDAY (for MONTHLY).
+Occurrences follow the wall clock of the default time zone, so a 19:00
+rehearsal stays at 19:00 across daylight saving changes. DTSTART is always
+the first occurrence.
+
+Series are never stored as rows per occurrence. `occurrences()` expands a
+series lazily for a window, jumping straight to the first period that can
+fall in it, and caches the expansion in fixed-size chunks in a bounded LRU
+cache, so popular series are expanded once per process and long or
+unbounded series never are expanded in full.
+"""
+import calendar
+import datetime
+import functools
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+
+WEEKDAYS = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU']
+FREQUENCIES = ['DAILY', 'WEEKLY', 'MONTHLY', 'YEARLY']
+MAX_COUNT = 10000
+
+# Stop looking for the next occurrence after this many empty periods, so a
+# rule that can never match again (e.g. the 31st every 12 months from
+# April) ends instead of looping forever.
+MAX_EMPTY_PERIODS = 400
+
+CHUNK = datetime.timedelta(days=28)
+EPOCH = datetime.datetime(2000, 1, 3, tzinfo=datetime.timezone.utc)
+
+
+class RecurrenceRule:
+    """A parsed RRULE."""
+
+    def __init__(self, freq, interval=1, count=None, until=None, byday=(),
+                 bymonthday=()):
+        self.freq = freq
+        self.interval = interval
+        self.count = count
+        self.until = until
+        self.byday = tuple(sorted(byday))
+        self.bymonthday = tuple(bymonthday)
+
+    @classmethod
+    def parse(cls, text):
+        """Return the rule in text; raise ValueError if it is invalid."""
+        text = text.strip()
+        if text.upper().startswith('RRULE:'):
+            text = text[6:]
+        parts = {}
+        for part in filter(None, text.split(';')):
+            name, sep, value = part.partition('=')
+            name = name.strip().upper()
+            if not sep or not value or name in parts:
+                raise ValueError(f'Invalid rule part {part!r}.')
+            parts[name] = value.strip().upper()
+
+        freq = parts.pop('FREQ', None)
+        if freq not in FREQUENCIES:
+            raise ValueError(
+                f'FREQ must be one of {", ".join(FREQUENCIES)}.')
+        kwargs = {}
+        if 'INTERVAL' in parts:
+            kwargs['interval'] = _positive(parts.pop('INTERVAL'), 'INTERVAL')
+        if 'COUNT' in parts:
+            kwargs['count'] = _positive(parts.pop('COUNT'), 'COUNT')
+            if kwargs['count'] > MAX_COUNT:
+                raise ValueError(f'COUNT can be at most {MAX_COUNT}.')
+        if 'UNTIL' in parts:
+            kwargs['until'] = _parse_until(parts.pop('UNTIL'))
+        if 'count' in kwargs and 'until' in kwargs:
+            raise ValueError('Use COUNT or UNTIL, not both.')
+        if 'BYDAY' in parts:
+            if freq != 'WEEKLY':
+                raise ValueError('BYDAY is only supported with WEEKLY.')
+            days = parts.pop('BYDAY').split(',')
+            if not set(days) <= set(WEEKDAYS):
+                raise ValueError('BYDAY must list days such as MO,WE.')
+            kwargs['byday'] = {WEEKDAYS.index(day) for day in days}
+        if 'BYMONTHDAY' in parts:
+            if freq != 'MONTHLY':
+                raise ValueError(
+                    'BYMONTHDAY is only supported with MONTHLY.')
+            try:
+                days = [
+                    int(day) for day in parts.pop('BYMONTHDAY').split(',')]
+            except ValueError:
+                raise ValueError('BYMONTHDAY must list days of the month.')
+            if not all(1 <= abs(day) <= 31 for day in days):
+                raise ValueError(
+                    'BYMONTHDAY days must be 1 to 31 or -31 to -1.')
+            kwargs['bymonthday'] = days
+        if parts:
+            raise ValueError(f'Unsupported rule parts: {", ".join(parts)}.')
+        return cls(freq, **kwargs)
+
+    def __str__(self):
+        parts = [f'FREQ={self.freq}']
+        if self.interval != 1:
+            parts.append(f'INTERVAL={self.interval}')
+        if self.count is not None:
+            parts.append(f'COUNT={self.count}')
+        if self.until is not None:
+            parts.append(
+                'UNTIL=' + self.until.astimezone(datetime.timezone.utc)
+                .strftime('%Y%m%dT%H%M%SZ'))
+        if self.byday:
+            parts.append(
+                'BYDAY=' + ','.join(WEEKDAYS[day] for day in self.byday))
+        if self.bymonthday:
+            parts.append(
+                'BYMONTHDAY=' + ','.join(map(str, self.bymonthday)))
+        return ';'.join(parts)
+
+    def _candidates(self, first, period):
+        """Return the local candidates of a period, in order."""
+        time = first.time()
+        if self.freq == 'DAILY':
+            days = [first.date() + datetime.timedelta(
+                days=period * self.interval)]
+        elif self.freq == 'WEEKLY':
+            monday = first.date() - datetime.timedelta(days=first.weekday())
+            monday += datetime.timedelta(weeks=period * self.interval)
+            days = [
+                monday + datetime.timedelta(days=day)
+                for day in (self.byday or [first.weekday()])
+            ]
+        elif self.freq == 'MONTHLY':
+            month = first.month - 1 + period * self.interval
+            year, month = first.year + month // 12, month % 12 + 1
+            length = calendar.monthrange(year, month)[1]
+            days = sorted({
+                datetime.date(
+                    year, month, day if day > 0 else length + day + 1)
+                for day in (self.bymonthday or [first.day])
+                if abs(day) <= length
+            })
+        else:
+            try:
+                days = [first.date().replace(
+                    year=first.year + period * self.interval)]
+            except ValueError:
+                days = []
+        return [datetime.datetime.combine(day, time) for day in days]
+
+    def _first_period(self, first, after):
+        """Return the earliest period that can hold `after` or later."""
+        if after <= first:
+            return 0
+        if self.freq == 'DAILY':
+            span = (after.date() - first.date()).days
+        elif self.freq == 'WEEKLY':
+            monday = first.date() - datetime.timedelta(days=first.weekday())
+            span = (after.date() - monday).days // 7
+        elif self.freq == 'MONTHLY':
+            span = (after.year - first.year) * 12 + after.month - first.month
+        else:
+            span = after.year - first.year
+        return max(span // self.interval, 0)
+
+    def iter_local(self, first, after):
+        """Yield naive local occurrences after first, from `after` on.
+
+        Ignores COUNT and UNTIL; `occurrences()` applies both.
+        """
+        period, empty = self._first_period(first, after), 0
+        while empty < MAX_EMPTY_PERIODS:
+            found = False
+            for candidate in self._candidates(first, period):
+                if candidate > first and candidate >= after:
+                    found = True
+                    yield candidate
+            empty = 0 if found else empty + 1
+            period += 1
+
+    def last_start(self, dtstart):
+        """Return the start of the last occurrence, or None if unbounded.
+
+        For UNTIL rules this is UNTIL itself, an upper bound.
+        """
+        if self.until is not None:
+            return max(self.until, dtstart)
+        if self.count is None:
+            return None
+        if self.count == 1:
+            return dtstart
+        tz = timezone.get_default_timezone()
+        first = _local(dtstart, tz)
+        last = first
+        for index, last in enumerate(self.iter_local(first, first), 2):
+            if index >= self.count:
+                break
+        return _aware(last, tz)
+
+
+def _positive(value, name):
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise ValueError(f'{name} must be a positive integer.')
+    return number
+
+
+def _parse_until(value):
+    formats = [
+        ('%Y%m%dT%H%M%SZ', datetime.timezone.utc),
+        ('%Y%m%dT%H%M%S', None),
+        ('%Y%m%d', None),
+    ]
+    for format, tz in formats:
+        try:
+            until = datetime.datetime.strptime(value, format)
+        except ValueError:
+            continue
+        if format == '%Y%m%d':
+            until = until.replace(hour=23, minute=59, second=59)
+        if tz is not None:
+            return until.replace(tzinfo=tz)
+        return _aware(until, timezone.get_default_timezone())
+    raise ValueError('UNTIL must be a date or a UTC date-time.')
+
+
+def _local(value, tz):
+    return value.astimezone(tz).replace(tzinfo=None)
+
+
+def _aware(value, tz):
+    if hasattr(tz, 'localize'):
+        value = tz.localize(value)
+    else:
+        value = value.replace(tzinfo=tz)
+    return value.astimezone(datetime.timezone.utc)
+
+
+def validate_recurrence(value):
+    """Model field validator for RRULE text."""
+    if not value:
+        return
+    try:
+        RecurrenceRule.parse(value)
+    except ValueError as exc:
+        raise ValidationError(str(exc), code='invalid')
+
+
+@functools.lru_cache(maxsize=1024)
+def parse(text):
+    """Return the cached `RecurrenceRule` for text."""
+    return RecurrenceRule.parse(text)
+
+
+@functools.lru_cache(maxsize=1024)
+def last_start(text, dtstart):
+    return parse(text).last_start(dtstart)
+
+
+def _chunk_start(index):
+    return EPOCH + index * CHUNK
+
+
+def _chunk_index(value):
+    return (value - EPOCH) // CHUNK
+
+
+@functools.lru_cache(
+    maxsize=getattr(settings, 'RECURRENCE_CACHE_SIZE', 4096))
+def _expand_chunk(text, dtstart, index):
+    """Return (occurrences, finished) for one chunk of a series.
+
+    `finished` is True once the series can have no later occurrences.
+    """
+    rule = parse(text)
+    tz = timezone.get_default_timezone()
+    start, end = _chunk_start(index), _chunk_start(index + 1)
+    found = []
+    if start <= dtstart < end:
+        found.append(dtstart.astimezone(datetime.timezone.utc))
+    first = _local(dtstart, tz)
+    for local in rule.iter_local(first, _local(max(start, dtstart), tz)):
+        value = _aware(local, tz)
+        if rule.until is not None and value > rule.until:
+            return tuple(found), True
+        if value >= end:
+            return tuple(found), False
+        if value >= start:
+            found.append(value)
+    return tuple(found), True
+
+
+def occurrences(text, dtstart, start=None, end=None):
+    """Yield the starts of a series' occurrences in [start, end), in order.
+
+    Either bound may be None; an unbounded series is expanded only as far
+    as the caller reads.
+    """
+    last = last_start(text, dtstart)
+    lower = dtstart if start is None else max(start, dtstart)
+    index = _chunk_index(lower)
+    while True:
+        chunk_start = _chunk_start(index)
+        if end is not None and chunk_start >= end:
+            return
+        if last is not None and chunk_start > last:
+            return
+        found, finished = _expand_chunk(text, dtstart, index)
+        for value in found:
+            if value < lower:
+                continue
+            if end is not None and value >= end:
+                return
+            if last is not None and value > last:
+                return
+            yield value
+        if finished:
+            return
+        index += 1
+
+
+def occurrences_before(text, dtstart, end, start=None):
+    """Yield the occurrence starts in [start, end), in reverse order.
+
+    The series is expanded a chunk at a time backwards from end, so only
+    as far back as the caller reads. end may only be None for a series
+    with a last occurrence.
+    """
+    last = last_start(text, dtstart)
+    if end is None and last is None:
+        raise ValueError('An unbounded series has no last occurrence.')
+    lower = dtstart if start is None else max(start, dtstart)
+    upper = last if end is None else end
+    if last is not None:
+        upper = min(upper, last)
+    index = _chunk_index(upper)
+    while index >= _chunk_index(lower):
+        found, _ = _expand_chunk(text, dtstart, index)
+        for value in reversed(found):
+            if value < lower:
+                return
+            if end is not None and value >= end:
+                continue
+            if last is not None and value > last:
+                continue
+            yield value
+        index -= 1
+
+
+def clear_cache():
+    """Forget every cached expansion."""
+    parse.cache_clear()
+    last_start.cache_clear()
+    _expand_chunk.cache_clear()
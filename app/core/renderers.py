@@ -0,0 +1,68 @@
+"""
+Renderers for the API.
+"""
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised without orjson
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """`JSONRenderer` that encodes with orjson when it is installed.
+
+    For the str/int/bool/null/list/dict payloads this API produces the
+    output matches `JSONRenderer` byte for byte. Other types are passed
+    through DRF's own encoder, and indented output or anything orjson
+    rejects is rendered by the parent class.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.get_indent(
+                accepted_media_type, renderer_context or {}):
+            return super().render(
+                data, accepted_media_type, renderer_context)
+        try:
+            content = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(
+                data, accepted_media_type, renderer_context)
+        # Escape the JavaScript line separators, as JSONRenderer does.
+        return content.replace(
+            b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class StreamedRenderer(BaseRenderer):
+    """Base for formats whose views stream their own body.
+
+    Used for content negotiation; only error responses and empty 304
+    responses are rendered here, as plain text.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, dict) and 'detail' in data:
+            data = data['detail']
+        return str(data).encode(self.charset)
+
+
+class ICalendarRenderer(StreamedRenderer):
+    media_type = 'text/calendar'
+    format = 'ics'
+
+
+class NDJSONRenderer(StreamedRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+class CSVRenderer(StreamedRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
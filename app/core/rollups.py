@@ -0,0 +1,166 @@
+"""
+Daily event counts and booked minutes per venue and group.
+
+Reports over a date range read `EventRollup` rather than the event
+table. It has one row per day, venue and group with events, so the cost
+of a report grows with the days and venues it covers, not with the
+number of events behind them. Weekly figures sum the rows of a week,
+which carry its Monday in `week`.
+
+Event signals move each event between rows as it changes. Bulk writes
+and imports skip signals, so they recompute the days they touched, and
+`backfill_rollups` recomputes a range of days in chunks.
+
+Days are dates in the current time zone. A recurring event counts once,
+on the day its series starts.
+"""
+import datetime
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from core.models import Event, EventRollup
+
+
+def week_of(day):
+    """Return the Monday of day's week."""
+    return day - datetime.timedelta(days=day.weekday())
+
+
+def event_state(event):
+    """Return the (row key, minutes) an event adds, or None.
+
+    The key is a (day, venue pk, group pk) triple. Events without a
+    start are left out.
+    """
+    if event.datetime is None:
+        return None
+    day = timezone.localtime(event.datetime).date()
+    return (day, event.venue_id_id, event.group_id_id), event.duration or 0
+
+
+def _adjust(key, minutes, sign):
+    day, venue, group = key
+    rows = EventRollup.objects.filter(day=day, venue=venue, group=group)
+    changes = {
+        'event_count': F('event_count') + sign,
+        'booked_minutes': F('booked_minutes') + sign * minutes,
+    }
+    if rows.update(**changes) or sign < 0:
+        return
+    try:
+        with transaction.atomic():
+            EventRollup.objects.create(
+                day=day, week=week_of(day), venue_id=venue, group_id=group,
+                event_count=1, booked_minutes=minutes)
+    except IntegrityError:
+        # Another writer created the row first.
+        rows.update(**changes)
+
+
+def move(old, new):
+    """Move an event's contribution from the old to the new state.
+
+    Either state is an `event_state()`, or None for an event that was
+    not or is no longer counted.
+    """
+    if old == new:
+        return
+    if old is not None:
+        _adjust(*old, -1)
+    if new is not None:
+        _adjust(*new, 1)
+
+
+def _start_of(day):
+    return timezone.make_aware(
+        datetime.datetime.combine(day, datetime.time.min))
+
+
+def rebuild_days(start, end):
+    """Recompute the rows of the days from start up to end.
+
+    Return the number of rows written.
+    """
+    rows = Event.objects.filter(
+        datetime__gte=_start_of(start), datetime__lt=_start_of(end),
+    ).annotate(day=TruncDate('datetime')).order_by().values(
+        'day', 'venue_id', 'group_id',
+    ).annotate(count=Count('pk'), minutes=Sum('duration'))
+    with transaction.atomic():
+        EventRollup.objects.filter(day__gte=start, day__lt=end).delete()
+        created = EventRollup.objects.bulk_create([
+            EventRollup(
+                day=row['day'],
+                week=week_of(row['day']),
+                venue_id=row['venue_id'],
+                group_id=row['group_id'],
+                event_count=row['count'],
+                booked_minutes=row['minutes'] or 0,
+            )
+            for row in rows
+        ], batch_size=1000)
+    return len(created)
+
+
+def refresh(states):
+    """Recompute the days of an iterable of event states."""
+    refresh_days(key[0] for key, _ in filter(None, states))
+
+
+def refresh_days(days):
+    """Recompute an iterable of days.
+
+    Runs of consecutive days are recomputed together.
+    """
+    days = sorted(set(days))
+    one = datetime.timedelta(days=1)
+    start = end = None
+    for day in days:
+        if day != end:
+            if start is not None:
+                rebuild_days(start, end)
+            start = day
+        end = day + one
+    if start is not None:
+        rebuild_days(start, end)
+
+
+def event_days():
+    """Return the first and last day with events, or (None, None)."""
+    bounds = Event.objects.aggregate(
+        first=Min('datetime'), last=Max('datetime'))
+    if bounds['first'] is None:
+        return None, None
+    return (
+        timezone.localtime(bounds['first']).date(),
+        timezone.localtime(bounds['last']).date(),
+    )
+
+
+def backfill(start=None, end=None, chunk_days=31, report=None):
+    """Recompute the days from start to end, inclusive, in chunks.
+
+    Both default to the first and last day with events. Each chunk is
+    its own transaction, and report, if given, is called with the
+    chunk's start, end and rows written once it commits. Return the
+    number of rows written.
+    """
+    first, last = event_days()
+    start = start or first
+    end = end or last
+    if start is None or end is None:
+        return 0
+    step = datetime.timedelta(days=chunk_days)
+    stop = end + datetime.timedelta(days=1)
+    written = 0
+    while start < stop:
+        chunk_end = min(start + step, stop)
+        rows = rebuild_days(start, chunk_end)
+        written += rows
+        if report is not None:
+            report(start, chunk_end, rows)
+        start = chunk_end
+    return written
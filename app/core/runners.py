@@ -0,0 +1,18 @@
+"""
+Test runner for the project.
+"""
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """Run the tests with passwords hashed in the test process.
+
+    Hash pool workers read the settings once, when they start, so the
+    hashers and costs tests override would never reach them. Tests that
+    need the pool turn it on with `override_settings`.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.PASSWORD_HASH_WORKERS = 0
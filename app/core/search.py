@@ -0,0 +1,119 @@
+"""
+Full-text search over events, venues and groups.
+
+On PostgreSQL each model's text columns are matched as a weighted
+`tsvector`, served by the GIN expression indexes migration 0011 adds. The
+expression built here must stay identical to the indexed one, or the
+planner falls back to a sequential scan; the migration holds a frozen copy
+of it, so changing the fields needs a new migration. SQLite uses FTS5
+tables kept in sync by triggers, also added by migration 0011.
+
+Matches are ranked by `ts_rank` or BM25, higher first. Every term of the
+query must match, and words are stemmed in both backends.
+"""
+import re
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db import connections
+from django.db.models.expressions import RawSQL
+
+from core.models import Event, Group, Venue
+
+
+CONFIG = 'english'
+
+# Column weights, as PostgreSQL's ts_rank applies them by default.
+WEIGHTS = {'A': 1.0, 'B': 0.4, 'C': 0.2, 'D': 0.1}
+
+
+def search_terms(text):
+    """Return the words of a search, without any query syntax."""
+    return re.findall(r'\w+', text or '')
+
+
+class Searchable:
+    """The weighted text columns of a model that can be searched.
+
+    `fields` are (field name, weight) pairs with weights 'A' to 'D'.
+    `serializer` is the dotted path of the serializer used for results.
+    """
+
+    def __init__(self, model, fields, serializer):
+        self.model = model
+        self.fields = fields
+        self.serializer = serializer
+
+    @property
+    def index_name(self):
+        return f'{self.model._meta.model_name}_search_idx'
+
+    @property
+    def fts_table(self):
+        return f'{self.model._meta.db_table}_fts'
+
+    def vector(self):
+        """Return the document expression the GIN index is built on."""
+        vectors = [
+            SearchVector(name, weight=weight, config=CONFIG)
+            for name, weight in self.fields
+        ]
+        vector = vectors[0]
+        for other in vectors[1:]:
+            vector = vector + other
+        return vector
+
+    def search(self, queryset, text):
+        """Return the rows of queryset matching text, annotated with rank."""
+        terms = search_terms(text)
+        if not terms:
+            return queryset.none()
+        vendor = connections[queryset.db].vendor
+        if vendor == 'postgresql':
+            return self._search_postgresql(queryset, terms)
+        if vendor == 'sqlite':
+            return self._search_sqlite(queryset, terms)
+        raise NotImplementedError(f'Search is not supported on {vendor}.')
+
+    def _search_postgresql(self, queryset, terms):
+        query = SearchQuery(' '.join(terms), config=CONFIG)
+        vector = self.vector()
+        return queryset.alias(document=vector).filter(document=query) \
+            .annotate(rank=SearchRank(vector, query))
+
+    def _search_sqlite(self, queryset, terms):
+        connection = connections[queryset.db]
+        quote = connection.ops.quote_name
+        fts = quote(self.fts_table)
+        table = quote(self.model._meta.db_table)
+        # Each term is quoted, so FTS5 operators in it are plain text.
+        match = ' '.join('"{}"'.format(term) for term in terms)
+        weights = ', '.join(str(WEIGHTS[weight]) for _, weight in self.fields)
+        # Joining the FTS5 table lets it compute BM25 once per match.
+        return queryset.extra(
+            tables=[self.fts_table],
+            where=[f'{fts}.rowid = {table}.id', f'{fts} MATCH %s'],
+            params=[match],
+        ).annotate(rank=RawSQL(f'-bm25({fts}, {weights})', ()))
+
+
+SEARCHES = {
+    'event': Searchable(
+        Event,
+        [('title', 'A'), ('description', 'B')],
+        'event.serializers.EventSerializer',
+    ),
+    'group': Searchable(
+        Group,
+        [('group_name', 'A')],
+        'group.serializers.GroupSerializer',
+    ),
+    'venue': Searchable(
+        Venue,
+        [('venue_name', 'A'), ('address', 'B')],
+        'venue.serializers.VenueSerializer',
+    ),
+}
@@ -0,0 +1,29 @@
+"""
+Shared serializer helpers.
+"""
+from django.utils.module_loading import import_string
+
+
+class DynamicFieldsMixin:
+    """Let callers trim fields with `fields` and inline relations with
+    `expand`.
+
+    `Meta.expandable_fields` maps a relation field name to the dotted path
+    of the serializer used to inline it. `Meta.optional_fields` are only
+    rendered when named in `fields`.
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        for name in expand or ():
+            serializer_class = import_string(expandable[name])
+            self.fields[name] = serializer_class(read_only=True)
+        if fields:
+            keep = set(fields) | set(expand or ())
+            for name in list(self.fields):
+                if name not in keep:
+                    self.fields.pop(name)
+        else:
+            for name in getattr(self.Meta, 'optional_fields', ()):
+                self.fields.pop(name, None)
@@ -0,0 +1,221 @@
+"""
+Signal handlers for core models.
+"""
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from core import access, cache, rollups, summaries
+from core.authentication import token_cache
+from core.models import (
+    Event,
+    Group,
+    Membership,
+    Recurrence,
+    SubGroup,
+    User,
+    Venue,
+    clear_cached_default_pk,
+)
+
+
+@receiver(post_delete, sender=Venue)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=SubGroup)
+def forget_default_pk(sender, instance, **kwargs):
+    """Drop a cached default pk when its row is deleted."""
+    clear_cached_default_pk(sender, instance.pk)
+
+
+@receiver(post_delete, sender=Token)
+def forget_token(sender, instance, **kwargs):
+    """Stop serving a deleted token from the authentication cache."""
+    token_cache.discard(instance.key)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_user_tokens(sender, instance, **kwargs):
+    """Re-check a user's tokens after they change or are deactivated."""
+    token_cache.discard_user(instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_expanded_user(sender, instance, update_fields=None,
+                             **kwargs):
+    """Invalidate cached responses that inline the user as a contact."""
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    cache.invalidate(sender, [cache.EXPANDED])
+
+
+def updates(field, update_fields):
+    """Return whether a save with update_fields may have changed field."""
+    return update_fields is None or field in update_fields
+
+
+@receiver(post_save, sender=User)
+def sync_user_memberships(sender, instance, created, update_fields,
+                          **kwargs):
+    """Move the user to the groups named by a changed `user_org`."""
+    if created and not instance.user_org:
+        return
+    if updates('user_org', update_fields):
+        access.sync_user_memberships(instance)
+
+
+@receiver(pre_delete, sender=User)
+def remember_user_venues(sender, instance, **kwargs):
+    """Note the user's venues, whose contact is about to be cleared."""
+    instance._contact_venues = list(Venue.objects.filter(
+        primary_contact=instance).values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=User)
+def refresh_user_venues(sender, instance, **kwargs):
+    """Hide the deleted user's venues from the rest of their groups."""
+    access.refresh_venue_access(getattr(instance, '_contact_venues', []))
+
+
+@receiver(post_save, sender=Group)
+def sync_group_memberships(sender, instance, update_fields, **kwargs):
+    """Add the users whose `user_org` names a new or renamed group."""
+    if updates('group_name', update_fields):
+        access.sync_group_memberships(instance)
+
+
+@receiver(pre_delete, sender=Group)
+def remember_group_members(sender, instance, **kwargs):
+    """Note the group's members before their memberships go."""
+    instance._members = list(Membership.objects.filter(
+        group=instance).values_list('user', flat=True))
+
+
+@receiver(post_delete, sender=Group)
+def refresh_group_members(sender, instance, **kwargs):
+    """Hide the venues members could only see through the group."""
+    access.refresh_user_access(getattr(instance, '_members', []))
+
+
+def invalidate_venue(pk, viewers):
+    """Invalidate cached venue responses that may contain venue pk."""
+    parts = [cache.STAFF, cache.EXPANDED, cache.object_part(pk)]
+    parts += [cache.user_scope(user) for user in viewers]
+    cache.invalidate(Venue, parts)
+
+
+@receiver(post_save, sender=Venue)
+def refresh_venue(sender, instance, **kwargs):
+    """Update who may see instance, e.g. after its contact changed."""
+    invalidate_venue(
+        instance.pk, access.refresh_venue_access([instance.pk]))
+
+
+@receiver(pre_delete, sender=Venue)
+def remember_venue_viewers(sender, instance, **kwargs):
+    """Note who could see the venue before its access rows go."""
+    instance._viewers = access.venue_viewers([instance.pk])
+
+
+@receiver(post_delete, sender=Venue)
+def forget_venue(sender, instance, **kwargs):
+    """Invalidate cached responses of everyone who could see instance."""
+    invalidate_venue(instance.pk, getattr(instance, '_viewers', ()))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=SubGroup)
+@receiver(post_delete, sender=SubGroup)
+def invalidate_staff_only(sender, instance, **kwargs):
+    """Invalidate cached responses for models only staff can list.
+
+    Groups are also inlined in event responses through `?expand=`.
+    """
+    cache.invalidate(sender, [
+        cache.STAFF, cache.EXPANDED, cache.object_part(instance.pk)])
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def invalidate_event(sender, instance, created=True, **kwargs):
+    """Invalidate cached event responses that may contain instance.
+
+    Non-staff scopes follow who may see the event's venue and group.
+    When the venue is not already loaded, as in bulk scripts, or an
+    update may have moved the event, every event scope is invalidated
+    rather than spending a query to find out.
+    """
+    parts = [cache.object_part(instance.pk)]
+    if created and Event.venue_id.is_cached(instance):
+        parts.append(cache.STAFF)
+        parts += [
+            cache.user_scope(user) for user in access.event_viewers(instance)
+        ]
+    else:
+        parts.append(cache.ALL)
+    cache.invalidate(sender, parts)
+
+
+# The event fields summaries and rollups are worked out from.
+COUNTED_FIELDS = {'datetime', 'duration', *summaries.SUMMARIZED}
+
+
+@receiver(pre_save, sender=Event)
+def remember_stored_event(sender, instance, update_fields, **kwargs):
+    """Load the stored event's counted fields before they change."""
+    instance._stored = None
+    if instance._state.adding:
+        return
+    if update_fields is not None and \
+            not COUNTED_FIELDS & set(update_fields):
+        instance._stored = instance
+        return
+    attnames = [
+        field.attname for field in sender._meta.concrete_fields
+        if field.name in COUNTED_FIELDS
+    ]
+    values = sender.objects.filter(
+        pk=instance.pk).values_list(*attnames).first()
+    if values is not None:
+        instance._stored = sender.from_db(
+            instance._state.db, attnames, values)
+
+
+def counted(event):
+    """Return what event adds to (summaries, rollups), or Nones."""
+    if event is None:
+        return None, None
+    return summaries.event_state(event), rollups.event_state(event)
+
+
+def count_event(old, new):
+    old_summary, old_rollup = counted(old)
+    new_summary, new_rollup = counted(new)
+    summaries.move(old_summary, new_summary)
+    rollups.move(old_rollup, new_rollup)
+
+
+@receiver(post_save, sender=Event)
+def update_event_counts(sender, instance, **kwargs):
+    """Move the event's counts to where and when it is now."""
+    count_event(getattr(instance, '_stored', None), instance)
+
+
+@receiver(post_delete, sender=Event)
+def remove_event_counts(sender, instance, **kwargs):
+    """Take a deleted event out of the counts."""
+    count_event(instance, None)
+
+
+@receiver(post_save, sender=Recurrence)
+@receiver(post_delete, sender=Recurrence)
+def invalidate_recurrence(sender, instance, **kwargs):
+    """A series changes every event list its occurrences fall in."""
+    cache.invalidate(Event, [cache.object_part(instance.pk), cache.ALL])
@@ -0,0 +1,171 @@
+"""
+Helpers for streaming database rows in HTTP responses.
+
+Django 3.2 iterates streaming responses on the event loop under ASGI,
+where the ORM refuses to run and any blocking call stalls every other
+request the worker is serving. Under ASGI, rows are therefore produced
+on a thread of a pool of `STREAM_THREADS` threads, each with its own
+database connection, and `StreamingASGIHandler` awaits them without
+blocking the loop. Streams beyond the pool's size wait for a thread.
+"""
+import asyncio
+import queue
+import threading
+
+from django.core.handlers.asgi import ASGIHandler, ASGIRequest
+from django.db import connections
+from django.http import StreamingHttpResponse
+
+from core.asyncviews import get_stream_executor
+
+
+_DONE = object()
+
+
+class _Failed:
+
+    def __init__(self, exc):
+        self.exc = exc
+
+
+class ThreadedStream:
+    """Iterate generate(), run on a thread of the stream pool.
+
+    Iterate it with `async for` on the event loop; plain iteration blocks
+    while waiting and is only a fallback for other handlers. At most
+    buffer_size items wait to be sent, which keeps memory flat, and
+    closing the stream (e.g. when the client disconnects) stops the
+    producer.
+    """
+
+    def __init__(self, generate, buffer_size=16):
+        self.generate = generate
+        self.buffer_size = buffer_size
+        self.stop = threading.Event()
+        self.get = None
+
+    def produce(self, put):
+        try:
+            for item in self.generate():
+                if not put(item):
+                    return
+            put(_DONE)
+        except Exception as exc:
+            put(_Failed(exc))
+        finally:
+            connections.close_all()
+
+    def start(self, put):
+        """Start producing; put(item) returns False if it timed out."""
+        def put_unless_stopped(item):
+            while not self.stop.is_set():
+                if put(item):
+                    return True
+            return False
+
+        get_stream_executor().submit(self.produce, put_unless_stopped)
+
+    def _unwrap(self, item, end):
+        if item is _DONE:
+            raise end()
+        if isinstance(item, _Failed):
+            raise item.exc
+        return item
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.get is None:
+            items = queue.Queue(maxsize=self.buffer_size)
+
+            def put(item):
+                try:
+                    items.put(item, timeout=0.1)
+                except queue.Full:
+                    return False
+                return True
+
+            self.start(put)
+            self.get = items.get
+        return self._unwrap(self.get(), StopIteration)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.get is None:
+            items = asyncio.Queue()
+            slots = threading.Semaphore(self.buffer_size)
+            loop = asyncio.get_running_loop()
+
+            def put(item):
+                if not slots.acquire(timeout=0.1):
+                    return False
+                loop.call_soon_threadsafe(items.put_nowait, item)
+                return True
+
+            async def get():
+                item = await items.get()
+                slots.release()
+                return item
+
+            self.start(put)
+            self.get = get
+        return self._unwrap(await self.get(), StopAsyncIteration)
+
+    def close(self):
+        self.stop.set()
+
+
+def stream(request, generate, buffer_size=16):
+    """Return an iterator over generate() suitable for the current server.
+
+    `generate` is called lazily, once the response starts streaming.
+    """
+    if isinstance(request, ASGIRequest):
+        return ThreadedStream(generate, buffer_size)
+    return _lazy(generate)
+
+
+def _lazy(generate):
+    yield from generate()
+
+
+def streaming_response(request, generate, **kwargs):
+    """Return a `StreamingHttpResponse` of generate(), see `stream()`."""
+    content = stream(request, generate)
+    response = StreamingHttpResponse(content, **kwargs)
+    if isinstance(content, ThreadedStream):
+        response.async_content = content
+    return response
+
+
+class StreamingASGIHandler(ASGIHandler):
+    """ASGI handler that awaits the items of threaded streams.
+
+    Other responses are sent exactly as by Django's handler.
+    """
+
+    async def send_response(self, response, send):
+        content = getattr(response, 'async_content', None)
+        if content is None:
+            return await super().send_response(response, send)
+
+        async def send_body(message):
+            # Django's handler sends the headers, then a final empty body
+            # message once the (now empty) content is exhausted.
+            if message['type'] == 'http.response.body' and \
+                    not message.get('more_body'):
+                async for part in content:
+                    for chunk, _ in self.chunk_bytes(
+                            response.make_bytes(part)):
+                        await send({
+                            'type': 'http.response.body',
+                            'body': chunk,
+                            'more_body': True,
+                        })
+            await send(message)
+
+        response.streaming_content = ()
+        await super().send_response(response, send_body)
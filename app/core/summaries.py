@@ -0,0 +1,185 @@
+"""
+Event counts and the next upcoming event of venues, groups and
+subgroups.
+
+Dashboards show these with every row, so they are kept as columns rather
+than aggregated per request. Event signals adjust them with one UPDATE
+per related row; bulk writes and imports recompute the rows they touched
+instead, since they skip signals.
+
+Upcoming means starting at or after the time of the last update. A row
+whose `next_event_at` has passed still counts that event as upcoming
+until `rebuild_event_summaries --stale` recomputes it, so run that every
+few minutes; it only reads rows whose next event has started, through
+the index on `next_event_at`. A recurring event counts once, at the
+start of its series.
+"""
+from django.db.models import (
+    Case,
+    Count,
+    F,
+    IntegerField,
+    OuterRef,
+    Subquery,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core import cache
+from core.models import Event, Group, SubGroup, Venue
+
+
+# The event field pointing at each summarized model.
+SUMMARIZED = {'venue_id': Venue, 'group_id': Group, 'subgroup_id': SubGroup}
+SUMMARY_FIELDS = ['event_count', 'upcoming_event_count', 'next_event_at']
+# Version part of cached responses that show summary fields.
+SUMMARY_PART = 'summary'
+
+
+def event_state(event):
+    """Return the (targets, start) an event adds to the summaries.
+
+    `targets` maps each event field in `SUMMARIZED` to the related pk.
+    """
+    targets = {
+        field: getattr(event, Event._meta.get_field(field).attname)
+        for field in SUMMARIZED
+    }
+    return targets, event.datetime
+
+
+def _count(events, field):
+    return Coalesce(Subquery(
+        events.values(field).annotate(count=Count('pk')).values('count'),
+        output_field=IntegerField(),
+    ), 0)
+
+
+def _next_event(events, field, now):
+    return Subquery(events.filter(
+        **{field: OuterRef('pk')}, datetime__gte=now,
+    ).order_by('datetime').values('datetime')[:1])
+
+
+def _adjust(field, pk, start, sign, now):
+    """Add (sign 1) or remove (sign -1) an event from a row's summary."""
+    values = {'event_count': F('event_count') + sign}
+    if start is not None and start >= now:
+        values['upcoming_event_count'] = F('upcoming_event_count') + sign
+        if sign > 0:
+            values['next_event_at'] = Case(
+                When(next_event_at__lte=start, then=F('next_event_at')),
+                default=Value(start),
+            )
+        else:
+            values['next_event_at'] = Case(
+                When(next_event_at=start,
+                     then=_next_event(Event.objects, field, now)),
+                default=F('next_event_at'),
+            )
+    SUMMARIZED[field].objects.filter(pk=pk).update(**values)
+
+
+def move(old, new):
+    """Move an event's contribution from the old to the new state.
+
+    Either state is an `event_state()`, or None for an event that did
+    not or no longer exists.
+    """
+    if old == new:
+        return
+    now = timezone.now()
+    if old is not None:
+        targets, start = old
+        for field, pk in targets.items():
+            _adjust(field, pk, start, -1, now)
+    if new is not None:
+        targets, start = new
+        for field, pk in targets.items():
+            _adjust(field, pk, start, 1, now)
+    invalidate()
+
+
+def invalidate():
+    """Invalidate cached responses showing summary fields."""
+    for model in SUMMARIZED.values():
+        cache.invalidate(model, [SUMMARY_PART])
+
+
+def recompute(queryset, field, events, now):
+    """Recompute the summaries of the rows in queryset from events.
+
+    `field` is the event field pointing at the rows. Return the number
+    of rows updated.
+    """
+    related = events.filter(**{field: OuterRef('pk')}).order_by()
+    return queryset.update(
+        event_count=_count(related, field),
+        upcoming_event_count=_count(related.filter(datetime__gte=now), field),
+        next_event_at=_next_event(events, field, now),
+    )
+
+
+def refresh(states):
+    """Recompute the rows an iterable of event targets point at."""
+    pks = {field: set() for field in SUMMARIZED}
+    for targets in states:
+        for field, pk in targets.items():
+            pks[field].add(pk)
+    now = timezone.now()
+    for field, model in SUMMARIZED.items():
+        if pks[field]:
+            recompute(
+                model.objects.filter(pk__in=pks[field]),
+                field, Event.objects, now)
+    invalidate()
+
+
+def refresh_stale(now=None):
+    """Recompute the rows whose next event has started.
+
+    Return the number of rows updated.
+    """
+    now = now or timezone.now()
+    updated = sum(
+        recompute(
+            model.objects.filter(next_event_at__lt=now),
+            field, Event.objects, now)
+        for field, model in SUMMARIZED.items()
+    )
+    if updated:
+        invalidate()
+    return updated
+
+
+def rebuild(batch_size=1000):
+    """Recompute every row, batch_size rows per UPDATE.
+
+    Return the number of rows updated.
+    """
+    now = timezone.now()
+    updated = 0
+    for field, model in SUMMARIZED.items():
+        pks = list(model.objects.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(pks), batch_size):
+            updated += recompute(
+                model.objects.filter(pk__in=pks[start:start + batch_size]),
+                field, Event.objects, now)
+    invalidate()
+    return updated
+
+
+class EventSummaryMixin:
+    """Version cached responses that show summary fields by event writes.
+
+    Responses without them are not invalidated when events change.
+    """
+
+    def get_cache_parts(self):
+        parts = super().get_cache_parts()
+        fields, _ = self.get_sparse_options()
+        if set(fields) & set(SUMMARY_FIELDS):
+            parts.append(SUMMARY_PART)
+        return parts
@@ -0,0 +1,238 @@
+"""
+Tests for group memberships and the venue access index.
+"""
+from datetime import datetime
+from io import StringIO
+
+import pytz
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import access
+from core.models import (
+    Event,
+    Group,
+    Membership,
+    SubGroup,
+    Venue,
+    VenueAccess,
+)
+
+
+VENUES_URL = reverse('venue:venue-list')
+EVENTS_URL = reverse('event:event-list')
+
+
+def venue_url(venue_id):
+    return reverse('venue:venue-detail', args=[venue_id])
+
+
+def create_user(email, **params):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(
+        email=email, password='password123', **params)
+
+
+def visible(user):
+    """Return the pks of the venues user may see, per the index."""
+    return set(VenueAccess.objects.filter(
+        user=user).values_list('venue', flat=True))
+
+
+class MembershipTests(TestCase):
+    """Test memberships follow `user_org`."""
+
+    def setUp(self):
+        self.band = Group.objects.create(group_name='Band')
+        self.choir = Group.objects.create(group_name='Choir')
+
+    def groups(self, user):
+        return set(Membership.objects.filter(
+            user=user).values_list('group', flat=True))
+
+    def test_user_joins_groups_named_by_org(self):
+        user = create_user('user@example.com', user_org='Band')
+
+        self.assertEqual(self.groups(user), {self.band.pk})
+
+    def test_changing_org_moves_user(self):
+        user = create_user('user@example.com', user_org='Band')
+
+        user.user_org = 'Choir'
+        user.save()
+
+        self.assertEqual(self.groups(user), {self.choir.pk})
+
+    def test_new_and_renamed_groups_gain_members(self):
+        user = create_user('user@example.com', user_org='Strings')
+
+        strings = Group.objects.create(group_name='Strings')
+        self.assertEqual(self.groups(user), {strings.pk})
+
+        self.choir.group_name = 'Strings'
+        self.choir.save()
+        strings.group_name = 'Brass'
+        strings.save()
+        self.assertEqual(self.groups(user), {self.choir.pk})
+
+
+class VenueAccessTests(TestCase):
+    """Test the index follows contacts and memberships."""
+
+    def setUp(self):
+        Group.objects.create(group_name='Band')
+        self.alice = create_user('alice@example.com', user_org='Band')
+        self.bob = create_user('bob@example.com', user_org='Band')
+        self.carol = create_user('carol@example.com')
+        self.venue = Venue.objects.create(
+            venue_name='Smalls', primary_contact=self.alice)
+
+    def test_contact_and_group_see_venue(self):
+        self.assertEqual(visible(self.alice), {self.venue.pk})
+        self.assertEqual(visible(self.bob), {self.venue.pk})
+        self.assertEqual(visible(self.carol), set())
+
+    def test_contact_change(self):
+        self.venue.primary_contact = self.carol
+        self.venue.save()
+
+        self.assertEqual(visible(self.alice), set())
+        self.assertEqual(visible(self.bob), set())
+        self.assertEqual(visible(self.carol), {self.venue.pk})
+
+    def test_joining_and_leaving_group(self):
+        self.carol.user_org = 'Band'
+        self.carol.save()
+        self.assertEqual(visible(self.carol), {self.venue.pk})
+
+        self.bob.user_org = ''
+        self.bob.save()
+        self.assertEqual(visible(self.bob), set())
+
+    def test_deleting_contact_or_group(self):
+        self.alice.delete()
+
+        self.assertEqual(visible(self.bob), set())
+
+        other = Venue.objects.create(primary_contact=self.bob)
+        create_user('dave@example.com', user_org='Band')
+        Group.objects.get(group_name='Band').delete()
+        self.assertEqual(
+            set(VenueAccess.objects.values_list('user', 'venue')),
+            {(self.bob.pk, other.pk)},
+        )
+
+    def test_rebuild_restores_index(self):
+        wanted = set(VenueAccess.objects.values_list('user', 'venue'))
+        VenueAccess.objects.all().delete()
+        Membership.objects.all().delete()
+
+        call_command('rebuild_access', stdout=StringIO())
+
+        self.assertEqual(
+            set(VenueAccess.objects.values_list('user', 'venue')), wanted)
+        self.assertEqual(Membership.objects.count(), 2)
+        self.assertEqual(access.rebuild(), 0)
+
+    def test_venue_list_uses_access_index(self):
+        queryset = access.visible_venues(Venue.objects.all(), self.bob)
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('EXPLAIN ' + sql, params)
+            else:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+
+        # SQLite names the index of a table's unique constraint itself.
+        self.assertRegex(
+            plan,
+            'venue_access_user_venue_uniq|sqlite_autoindex_core_venueaccess')
+
+
+class ScopedAPITests(TestCase):
+    """Test group members see each other's venues and group events."""
+
+    def setUp(self):
+        self.band = Group.objects.create(group_name='Band')
+        self.choir = Group.objects.create(group_name='Choir')
+        self.alice = create_user('alice@example.com', user_org='Band')
+        self.bob = create_user('bob@example.com', user_org='Band')
+        self.venue = Venue.objects.create(
+            venue_name='Smalls', primary_contact=self.alice)
+        self.other_venue = Venue.objects.create(venue_name='Other Venue')
+        self.subgroup = SubGroup.objects.create(group_id=self.band)
+        self.client = APIClient()
+        self.client.force_authenticate(self.bob)
+
+    def create_event(self, venue, group, title):
+        return Event.objects.create(
+            title=title,
+            venue_id=venue,
+            group_id=group,
+            subgroup_id=self.subgroup,
+            datetime=pytz.utc.localize(datetime(2025, 3, 21, 19, 0)),
+        )
+
+    def test_member_lists_group_venues(self):
+        res = self.client.get(VENUES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [venue['id'] for venue in res.data['results']], [self.venue.pk])
+
+    def test_member_cannot_change_peer_venue(self):
+        res = self.client.patch(venue_url(self.venue.pk), {'address': 'x'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_detail_permission_adds_no_queries(self):
+        self.client.get(venue_url(self.venue.pk))
+        staff = APIClient()
+        staff.force_authenticate(get_user_model().objects.create_superuser(
+            'admin@example.com', 'password123'))
+        staff.get(venue_url(self.venue.pk))
+
+        with CaptureQueriesContext(connection) as member_queries:
+            self.client.get(venue_url(self.venue.pk), {'fresh': 1})
+        with CaptureQueriesContext(connection) as staff_queries:
+            res = staff.get(venue_url(self.venue.pk), {'fresh': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            len(member_queries.captured_queries),
+            len(staff_queries.captured_queries))
+
+    def test_member_lists_group_and_venue_events(self):
+        self.create_event(self.other_venue, self.band, 'Band gig')
+        self.create_event(self.venue, self.choir, 'Choir at Smalls')
+        self.create_event(self.other_venue, self.choir, 'Choir elsewhere')
+
+        res = self.client.get(EVENTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(event['title'] for event in res.data['results']),
+            ['Band gig', 'Choir at Smalls'])
+
+    def test_joining_group_invalidates_cached_list(self):
+        carol = create_user('carol@example.com')
+        client = APIClient()
+        client.force_authenticate(carol)
+        self.assertEqual(client.get(VENUES_URL).data['results'], [])
+
+        carol.user_org = 'Band'
+        carol.save()
+
+        self.assertEqual(
+            [venue['id'] for venue in client.get(VENUES_URL).data['results']],
+            [self.venue.pk])
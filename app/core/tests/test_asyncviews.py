@@ -0,0 +1,142 @@
+"""
+Tests for the async read views.
+"""
+import asyncio
+import threading
+import time
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import (
+    AsyncClient,
+    RequestFactory,
+    SimpleTestCase,
+    TransactionTestCase,
+)
+from django.test.client import AsyncRequestFactory
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from core.asyncviews import async_read_view
+from core.cache import get_cache
+from core.models import Venue
+from core.streaming import StreamingASGIHandler, streaming_response
+
+
+VENUES_URL = reverse('venue:venue-list')
+
+
+def thread_name_view(request):
+    """Respond with the name of the thread serving the request."""
+    return HttpResponse(threading.current_thread().name)
+
+
+class AsyncReadViewTests(SimpleTestCase):
+    """Test which thread a wrapped view runs on."""
+
+    def setUp(self):
+        self.view = async_read_view(thread_name_view)
+
+    def test_asgi_reads_use_pool(self):
+        request = AsyncRequestFactory().get('/')
+
+        res = async_to_sync(self.view)(request)
+
+        self.assertTrue(res.content.startswith(b'async-read'))
+
+    def test_asgi_writes_are_thread_sensitive(self):
+        request = AsyncRequestFactory().post('/')
+
+        res = async_to_sync(self.view)(request)
+
+        self.assertFalse(res.content.startswith(b'async-read'))
+
+    def test_wsgi_requests_run_inline(self):
+        request = RequestFactory().get('/')
+
+        res = async_to_sync(self.view)(request)
+
+        self.assertEqual(
+            res.content.decode(), threading.current_thread().name)
+
+
+class StreamingHandlerTests(SimpleTestCase):
+    """Test streamed responses are sent without blocking the loop."""
+
+    def send_response(self, generate, *coroutines):
+        request = AsyncRequestFactory().get('/')
+        response = streaming_response(request, generate)
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        async def run():
+            await asyncio.gather(
+                StreamingASGIHandler().send_response(response, send),
+                *coroutines)
+
+        asyncio.run(run())
+        return messages
+
+    def test_items_produced_on_stream_pool(self):
+        def generate():
+            yield threading.current_thread().name
+            yield '!'
+
+        messages = self.send_response(generate)
+
+        self.assertEqual(messages[0]['type'], 'http.response.start')
+        body = b''.join(message.get('body', b'') for message in messages)
+        self.assertTrue(body.startswith(b'stream'))
+        self.assertTrue(body.endswith(b'!'))
+        self.assertFalse(messages[-1].get('more_body'))
+
+    def test_loop_runs_while_producer_waits(self):
+        """Test a producer waiting on the loop does not deadlock."""
+        ready = threading.Event()
+
+        def generate():
+            yield 'a'
+            ready.wait(timeout=5)
+            yield 'b'
+
+        async def set_ready():
+            await asyncio.sleep(0.05)
+            ready.set()
+
+        started = time.monotonic()
+        messages = self.send_response(generate, set_ready())
+
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(
+            b''.join(message.get('body', b'') for message in messages),
+            b'ab')
+
+
+class AsyncVenueAPITests(TransactionTestCase):
+    """Test the venue API served over ASGI."""
+
+    def setUp(self):
+        get_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='password123')
+        self.token = Token.objects.create(user=self.user)
+        Venue.objects.create(venue_name='Venue', primary_contact=self.user)
+        self.client = AsyncClient()
+
+    def test_list_venues(self):
+        res = async_to_sync(self.client.get)(
+            VENUES_URL, AUTHORIZATION=f'Token {self.token.key}')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.json()['results']), 1)
+        self.assertIn('Server-Timing', res)
+
+    def test_requires_auth(self):
+        res = async_to_sync(self.client.get)(VENUES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
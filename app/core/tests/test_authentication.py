@@ -0,0 +1,138 @@
+"""
+Tests for cached token authentication.
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase, SimpleTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+
+from core.authentication import (
+    CachedTokenAuthentication,
+    TokenCache,
+    token_cache,
+)
+
+
+VENUES_URL = reverse('venue:venue-list')
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeUser:
+    def __init__(self, pk):
+        self.pk = pk
+
+
+class TokenCacheTests(SimpleTestCase):
+    """Test the LRU/TTL token cache."""
+
+    def test_evicts_least_recently_used(self):
+        """Test the cache stays within max_size, dropping the oldest."""
+        cache = TokenCache(max_size=2, ttl=60)
+        cache.set('a', FakeUser(1), 'ta')
+        cache.set('b', FakeUser(2), 'tb')
+        cache.get('a')
+
+        cache.set('c', FakeUser(3), 'tc')
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+
+    def test_entries_expire(self):
+        """Test entries are not served after their TTL."""
+        clock = FakeClock()
+        cache = TokenCache(max_size=10, ttl=30, clock=clock)
+        cache.set('a', FakeUser(1), 'ta')
+
+        clock.now = 29
+        self.assertIsNotNone(cache.get('a'))
+        clock.now = 30
+        self.assertIsNone(cache.get('a'))
+
+    def test_discard_user(self):
+        """Test every token for a user can be dropped at once."""
+        cache = TokenCache()
+        cache.set('a', FakeUser(1), 'ta')
+        cache.set('b', FakeUser(1), 'tb')
+        cache.set('c', FakeUser(2), 'tc')
+
+        cache.discard_user(1)
+
+        self.assertIsNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test the cached authentication class."""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='password123')
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def tearDown(self):
+        token_cache.clear()
+
+    def test_second_lookup_skips_database(self):
+        """Test a cached token authenticates without queries."""
+        self.auth.authenticate_credentials(self.token.key)
+
+        with self.assertNumQueries(0):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(token.key, self.token.key)
+
+    def test_deleted_token_rejected(self):
+        """Test deleting a token invalidates the cache entry."""
+        self.auth.authenticate_credentials(self.token.key)
+
+        self.token.delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_deactivated_user_rejected(self):
+        """Test deactivating a user invalidates their tokens."""
+        self.auth.authenticate_credentials(self.token.key)
+
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_cached_user_is_not_shared(self):
+        """Test each request gets its own user instance."""
+        first, _ = self.auth.authenticate_credentials(self.token.key)
+        second, _ = self.auth.authenticate_credentials(self.token.key)
+
+        first.name = 'Changed'
+
+        self.assertIsNot(first, second)
+        self.assertEqual(second.name, '')
+
+    def test_venue_list_with_token_header(self):
+        """Test the venue API accepts the cached token."""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+        res = client.get(VENUES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,299 @@
+"""
+Tests for venue availability and double booking checks.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.availability import (
+    Interval,
+    IntervalSet,
+    busy_intervals,
+    find_conflict,
+    free_intervals,
+)
+from core.models import Event, Group, SubGroup, Venue
+
+
+EVENTS_URL = reverse('event:event-list')
+BULK_URL = reverse('event:event-bulk')
+
+
+def at(hour, minute=0):
+    """Return an aware datetime on a fixed day."""
+    return datetime(2030, 5, 1, hour, minute, tzinfo=dt_timezone.utc)
+
+
+def availability_url(venue_id):
+    return reverse('venue:venue-availability', args=[venue_id])
+
+
+class IntervalTests(SimpleTestCase):
+    """Test the in-memory interval helpers."""
+
+    def test_interval_set_conflicts(self):
+        intervals = IntervalSet()
+        intervals.add(at(10), at(12), 1)
+        intervals.add(at(14), at(15), 2)
+
+        self.assertEqual(intervals.conflict(at(11), at(13)).event, 1)
+        self.assertEqual(intervals.conflict(at(9), at(14, 30)).event, 2)
+        self.assertIsNone(intervals.conflict(at(12), at(14)))
+        self.assertIsNone(intervals.conflict(at(8), at(10)))
+        self.assertIsNone(intervals.conflict(at(11), at(11)))
+
+    def test_interval_set_remove(self):
+        intervals = IntervalSet()
+        intervals.add(at(10), at(12), 1)
+        intervals.add(at(14), at(15), 2)
+
+        removed = intervals.remove(1)
+
+        self.assertEqual(removed, [Interval(at(10), at(12), 1)])
+        self.assertIsNone(intervals.conflict(at(11), at(13)))
+        self.assertEqual(intervals.conflict(at(9), at(14, 30)).event, 2)
+        self.assertEqual(intervals.remove(3), [])
+
+    def test_free_intervals(self):
+        busy = [
+            Interval(at(8), at(10), 1),
+            Interval(at(12), at(13), 2),
+            Interval(at(13), at(14), 3),
+        ]
+
+        free = free_intervals(busy, at(9), at(18))
+
+        self.assertEqual(
+            [(gap.start, gap.end) for gap in free],
+            [(at(10), at(12)), (at(14), at(18))])
+        free = free_intervals(busy, at(9), at(18), timedelta(hours=3))
+        self.assertEqual([(gap.start, gap.end) for gap in free],
+                         [(at(14), at(18))])
+
+
+class ConflictTests(TestCase):
+    """Test conflict checks against the database."""
+
+    def setUp(self):
+        self.venue = Venue.objects.create(venue_name='The Hall')
+        self.group = Group.objects.create(group_name='Band')
+        self.subgroup = SubGroup.objects.create(group_id=self.group)
+
+    def book(self, start, minutes, venue=None):
+        return Event.objects.create(
+            title='Gig',
+            datetime=start,
+            duration=minutes,
+            venue_id=venue or self.venue,
+            group_id=self.group,
+            subgroup_id=self.subgroup,
+        )
+
+    def test_ends_at_is_derived(self):
+        event = self.book(at(20), 90)
+        self.assertEqual(event.ends_at, at(21, 30))
+
+        Event.objects.bulk_create([Event(
+            datetime=at(8), duration=30, venue_id=self.venue,
+            group_id=self.group, subgroup_id=self.subgroup)])
+        self.assertEqual(
+            Event.objects.get(datetime=at(8)).ends_at, at(8, 30))
+
+    def test_find_conflict(self):
+        first = self.book(at(10), 120)
+        self.book(at(11), 0)
+        self.book(at(14), 60, Venue.objects.create())
+
+        self.assertEqual(
+            find_conflict(self.venue.pk, [(at(11, 30), at(13))]), first.pk)
+        self.assertEqual(
+            find_conflict(self.venue.pk, [(at(9), at(10, 1))]), first.pk)
+        self.assertIsNone(find_conflict(self.venue.pk, [(at(12), at(15))]))
+        self.assertIsNone(find_conflict(
+            self.venue.pk, [(at(11), at(12))], exclude=first.pk))
+        self.assertEqual(find_conflict(
+            self.venue.pk, [(at(8), at(9)), (at(11), at(12))]), first.pk)
+
+    def test_conflict_check_query_count(self):
+        """One seek for single bookings, then one read of the series."""
+        for hour in range(0, 20, 2):
+            self.book(at(hour), 60)
+
+        with self.assertNumQueries(1):
+            find_conflict(self.venue.pk, [(at(13, 30), at(14, 30))])
+        with self.assertNumQueries(2):
+            find_conflict(self.venue.pk, [(at(13), at(14))])
+
+    def test_busy_intervals(self):
+        early = self.book(at(8), 120)
+        late = self.book(at(12), 60)
+        self.book(at(16), 60)
+
+        busy = busy_intervals(self.venue.pk, at(9), at(14))
+
+        self.assertEqual([i.event for i in busy], [early.pk, late.pk])
+
+
+class BookingAPITests(TestCase):
+    """Test double bookings are rejected by the event API."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='password123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.venue = Venue.objects.create(
+            venue_name='The Hall', primary_contact=self.user)
+        self.group = Group.objects.create(group_name='Band')
+        self.subgroup = SubGroup.objects.create(group_id=self.group)
+        self.event = Event.objects.create(
+            title='Gig', datetime=at(20), duration=120,
+            venue_id=self.venue, group_id=self.group,
+            subgroup_id=self.subgroup)
+
+    def payload(self, start, minutes, **params):
+        payload = {
+            'title': 'Show',
+            'datetime': start.isoformat(),
+            'duration': minutes,
+            'venue_id': self.venue.id,
+            'group_id': self.group.id,
+            'subgroup_id': self.subgroup.id,
+        }
+        payload.update(params)
+        return payload
+
+    def test_create_overlapping_event_rejected(self):
+        res = self.client.post(
+            EVENTS_URL, self.payload(at(21), 60), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(self.event.id), str(res.data['datetime']))
+        self.assertEqual(Event.objects.count(), 1)
+
+    def test_create_adjacent_event(self):
+        res = self.client.post(
+            EVENTS_URL, self.payload(at(22), 60), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_update_into_overlap_rejected(self):
+        other = Event.objects.create(
+            title='Matinee', datetime=at(14), duration=60,
+            venue_id=self.venue, group_id=self.group,
+            subgroup_id=self.subgroup)
+        url = reverse('event:event-detail', args=[other.id])
+
+        res = self.client.patch(url, {'duration': 400}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.patch(url, {'title': 'Renamed'}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.patch(
+            reverse('event:event-detail', args=[self.event.id]),
+            {'duration': 180}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_bulk_create_checks_batch_and_existing(self):
+        payload = [
+            self.payload(at(10), 60),
+            self.payload(at(10, 30), 60),
+            self.payload(at(21), 30),
+            self.payload(at(11), 60),
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        results = res.data['results']
+        self.assertEqual(
+            [r['status'] for r in results], [201, 400, 400, 201])
+        self.assertIn('item 0', str(results[1]['errors']))
+        self.assertIn(f'event {self.event.id}', str(results[2]['errors']))
+
+    def test_bulk_update_keeps_slot_of_rejected_move(self):
+        """Test a rejected move's slot is not given to another item."""
+        first = Event.objects.create(
+            title='Early', datetime=at(10), duration=60,
+            venue_id=self.venue, group_id=self.group,
+            subgroup_id=self.subgroup)
+        second = Event.objects.create(
+            title='Late', datetime=at(23), duration=60,
+            venue_id=self.venue, group_id=self.group,
+            subgroup_id=self.subgroup)
+        payload = [
+            {'id': first.id, 'datetime': at(21).isoformat()},
+            {'id': second.id, 'datetime': at(10, 30).isoformat()},
+        ]
+
+        res = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        results = res.data['results']
+        self.assertIn(f'event {self.event.id}', str(results[0]['errors']))
+        self.assertIn(f'event {first.id}', str(results[1]['errors']))
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.datetime, at(10))
+        self.assertEqual(second.datetime, at(23))
+
+    def test_bulk_create_query_count_per_venue(self):
+        """Test existing bookings are read per venue, not per item."""
+        self.client.post(BULK_URL, [self.payload(at(1), 30)], format='json')
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(
+                BULK_URL, [self.payload(at(2), 30)], format='json')
+        with CaptureQueriesContext(connection) as large:
+            self.client.post(BULK_URL, [
+                self.payload(at(3) + timedelta(minutes=i), 1)
+                for i in range(50)
+            ], format='json')
+
+        self.assertEqual(
+            len(small.captured_queries), len(large.captured_queries))
+
+    def test_availability(self):
+        Event.objects.create(
+            title='Matinee', datetime=at(14), duration=60,
+            venue_id=self.venue, group_id=self.group,
+            subgroup_id=self.subgroup)
+
+        res = self.client.get(availability_url(self.venue.id), {
+            'start': at(12).isoformat(),
+            'end': at(23).isoformat(),
+            'min_gap': 90,
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['busy']), 2)
+        self.assertEqual(res.data['busy'][1]['event'], self.event.id)
+        self.assertEqual(
+            [(gap['start'], gap['end']) for gap in res.data['free']],
+            [(at(12), at(14)), (at(15), at(20))])
+
+    def test_availability_validates_window(self):
+        url = availability_url(self.venue.id)
+
+        res = self.client.get(url, {
+            'start': at(12).isoformat(), 'end': at(11).isoformat()})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(url, {
+            'start': at(12).isoformat(),
+            'end': (at(12) + timedelta(days=400)).isoformat()})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_availability_of_other_venue_not_found(self):
+        venue = Venue.objects.create(venue_name='Not Mine')
+
+        res = self.client.get(availability_url(venue.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
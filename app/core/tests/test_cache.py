@@ -0,0 +1,270 @@
+"""
+Tests for the response cache and conditional GET.
+"""
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.cache import check_settings, get_cache
+from core.models import Event, Group, SubGroup, Venue
+
+
+VENUES_URL = reverse('venue:venue-list')
+EVENTS_URL = reverse('event:event-list')
+
+
+def venue_url(venue_id):
+    return reverse('venue:venue-detail', args=[venue_id])
+
+
+class ResponseCacheTests(TransactionTestCase):
+    """Test cached responses are reused and invalidated precisely.
+
+    Responses computed inside a transaction are never cached, so these
+    tests run outside the usual per-test transaction.
+    """
+
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='password123')
+        self.other = get_user_model().objects.create_user(
+            email='other@example.com', password='password123')
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        get_cache().clear()
+
+    def names(self, res):
+        return [v['venue_name'] for v in res.data['results']]
+
+    def test_list_served_from_cache(self):
+        """Test a repeated list request does not hit the database."""
+        Venue.objects.create(venue_name='Smalls', primary_contact=self.user)
+        self.client.get(VENUES_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(VENUES_URL)
+
+        self.assertEqual(self.names(res), ['Smalls'])
+
+    def test_save_invalidates_owner_scope(self):
+        """Test saving a venue refreshes its contact's cached list."""
+        venue = Venue.objects.create(
+            venue_name='Smalls', primary_contact=self.user)
+        self.client.get(VENUES_URL)
+
+        venue.venue_name = 'Bigs'
+        venue.save()
+
+        self.assertEqual(self.names(self.client.get(VENUES_URL)), ['Bigs'])
+
+    def test_other_scopes_stay_cached(self):
+        """Test a write does not invalidate unrelated users' lists."""
+        Venue.objects.create(venue_name='Theirs', primary_contact=self.other)
+        self.client.force_authenticate(self.other)
+        self.client.get(VENUES_URL)
+
+        Venue.objects.create(venue_name='Mine', primary_contact=self.user)
+
+        with self.assertNumQueries(0):
+            self.client.get(VENUES_URL)
+
+    def test_contact_change_invalidates_both_scopes(self):
+        """Test moving a venue refreshes the old and new contact's lists."""
+        venue = Venue.objects.create(
+            venue_name='Smalls', primary_contact=self.user)
+        self.client.get(VENUES_URL)
+
+        venue.primary_contact = self.other
+        venue.save()
+
+        self.assertEqual(self.names(self.client.get(VENUES_URL)), [])
+        self.client.force_authenticate(self.other)
+        self.assertEqual(
+            self.names(self.client.get(VENUES_URL)), ['Smalls'])
+
+    def test_detail_invalidated_on_delete(self):
+        """Test a deleted venue is not served from the cache."""
+        venue = Venue.objects.create(
+            venue_name='Smalls', primary_contact=self.user)
+        self.assertEqual(self.client.get(venue_url(venue.id)).status_code, 200)
+
+        venue.delete()
+
+        self.assertEqual(self.client.get(venue_url(venue.id)).status_code, 404)
+
+    def test_bulk_create_invalidates(self):
+        """Test bulk writes, which skip signals, refresh cached lists."""
+        self.client.get(VENUES_URL)
+
+        self.client.post(
+            reverse('venue:venue-bulk'),
+            [{'venue_name': 'Bulk'}],
+            format='json',
+        )
+
+        self.assertEqual(self.names(self.client.get(VENUES_URL)), ['Bulk'])
+
+    def test_event_write_invalidates_event_list(self):
+        """Test creating an event refreshes the event list."""
+        venue = Venue.objects.create(
+            venue_name='Smalls', primary_contact=self.user)
+        group = Group.objects.create(group_name='Group')
+        subgroup = SubGroup.objects.create(group_id=group)
+        self.client.get(EVENTS_URL)
+
+        Event.objects.create(
+            venue_id=venue, group_id=group, subgroup_id=subgroup,
+            title='Gig')
+
+        res = self.client.get(EVENTS_URL)
+        self.assertEqual([e['title'] for e in res.data['results']], ['Gig'])
+
+    def test_expanded_venue_rename_invalidates_event_list(self):
+        """Test events inlining a venue are refreshed when it changes."""
+        venue = Venue.objects.create(
+            venue_name='Smalls', primary_contact=self.user)
+        group = Group.objects.create(group_name='Group')
+        subgroup = SubGroup.objects.create(group_id=group)
+        Event.objects.create(
+            venue_id=venue, group_id=group, subgroup_id=subgroup)
+        params = {'expand': 'venue_id'}
+        self.client.get(EVENTS_URL, params)
+
+        venue.venue_name = 'Bigs'
+        venue.save()
+
+        res = self.client.get(EVENTS_URL, params)
+        self.assertEqual(
+            res.data['results'][0]['venue_id']['venue_name'], 'Bigs')
+
+
+class ConditionalGetTests(TestCase):
+    """Test ETag and Last-Modified handling."""
+
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='password123')
+        self.client.force_authenticate(self.user)
+        self.venue = Venue.objects.create(
+            venue_name='Smalls', primary_contact=self.user)
+
+    def tearDown(self):
+        get_cache().clear()
+
+    def test_list_sets_validators(self):
+        """Test list responses carry an ETag and Last-Modified."""
+        res = self.client.get(VENUES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', res)
+
+    def test_matching_etag_short_circuits(self):
+        """Test If-None-Match returns 304 without touching the database."""
+        etag = self.client.get(VENUES_URL)['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(VENUES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertEqual(res.content, b'')
+
+    def test_write_changes_etag(self):
+        """Test a write to the venue produces a new ETag."""
+        url = venue_url(self.venue.id)
+        etag = self.client.get(url)['ETag']
+
+        self.venue.address = 'New Address'
+        self.venue.save()
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_contact_rename_changes_expanded_etag(self):
+        """Test renaming an inlined contact produces a new ETag."""
+        params = {'expand': 'primary_contact'}
+        etag = self.client.get(VENUES_URL, params)['ETag']
+
+        self.user.name = 'Renamed'
+        self.user.save()
+
+        res = self.client.get(VENUES_URL, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['results'][0]['primary_contact']['name'], 'Renamed')
+
+    def test_etag_differs_per_scope(self):
+        """Test users with different scopes never share an ETag."""
+        etag = self.client.get(VENUES_URL)['ETag']
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='password123')
+        self.client.force_authenticate(other)
+
+        res = self.client.get(VENUES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_if_modified_since(self):
+        """Test If-Modified-Since returns 304 once the second has passed."""
+        last_modified = self.client.get(VENUES_URL)['Last-Modified']
+
+        res = self.client.get(
+            VENUES_URL, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        later = time.time_ns() + 2 * 10 ** 9
+        with patch('core.cache.time.time_ns', return_value=later):
+            res = self.client.get(
+                VENUES_URL, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class CacheSettingsTests(TestCase):
+    """Test responses are only cached in a shared cache."""
+
+    @override_settings(ALLOW_PROCESS_LOCAL_CACHE=False)
+    def test_process_local_cache_refused(self):
+        """Test startup fails with stamps kept in each process."""
+        with self.assertRaises(ImproperlyConfigured):
+            check_settings()
+
+    @override_settings(
+        ALLOW_PROCESS_LOCAL_CACHE=False, RESPONSE_CACHE_ENABLED=False)
+    def test_disabled_cache_needs_no_shared_backend(self):
+        """Test no ETags are sent with the response cache turned off."""
+        check_settings()
+        user = get_user_model().objects.create_user(
+            email='user@example.com', password='password123')
+        client = APIClient()
+        client.force_authenticate(user)
+
+        res = client.get(VENUES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('ETag', res)
+
+    @override_settings(
+        ALLOW_PROCESS_LOCAL_CACHE=False,
+        CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.'
+                       'PyMemcacheCache',
+            'LOCATION': 'cache:11211',
+        }},
+    )
+    def test_shared_cache_accepted(self):
+        """Test a Memcached backend passes the check."""
+        check_settings()
@@ -0,0 +1,168 @@
+"""
+Tests for iCalendar feeds.
+"""
+import datetime
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase
+from django.test.client import AsyncClient
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.cache import get_cache
+from core.calendar import escape_text, fold
+from core.models import Event, Group, SubGroup, Venue
+
+
+def venue_calendar_url(venue_id):
+    return reverse('venue:venue-calendar', args=[venue_id])
+
+
+def group_calendar_url(group_id):
+    return reverse('group:group-calendar', args=[group_id])
+
+
+class FormatTests(TestCase):
+    """Test the iCalendar text helpers."""
+
+    def test_escape_text(self):
+        self.assertEqual(
+            escape_text('a,b;c\\d\ne'), r'a\,b\;c\\d\ne')
+
+    def test_fold_long_lines(self):
+        line = 'SUMMARY:' + 'é' * 80
+
+        folded = fold(line)
+
+        pieces = folded.split(b'\r\n ')
+        self.assertTrue(all(len(piece) <= 75 for piece in pieces))
+        self.assertEqual(
+            b''.join(pieces).decode('utf-8'), line + '\r\n')
+
+
+class CalendarFeedTests(TestCase):
+    """Test the venue and group calendar feeds."""
+
+    def setUp(self):
+        get_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='password123')
+        self.venue = Venue.objects.create(
+            venue_name='The Hall', primary_contact=self.user)
+        self.group = Group.objects.create(
+            group_name='Band', primary_contact=self.user)
+        self.subgroup = SubGroup.objects.create(group_id=self.group)
+        start = timezone.now().replace(microsecond=0)
+        for i in range(3):
+            Event.objects.create(
+                title=f'Show {i}', venue_id=self.venue, group_id=self.group,
+                subgroup_id=self.subgroup, duration=90,
+                datetime=start + datetime.timedelta(days=i))
+        Event.objects.create(
+            title='Unscheduled', venue_id=self.venue, group_id=self.group,
+            subgroup_id=self.subgroup)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_venue_calendar(self):
+        res = self.client.get(venue_calendar_url(self.venue.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'text/calendar; charset=utf-8')
+        body = b''.join(res.streaming_content).decode()
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertTrue(body.endswith('END:VCALENDAR\r\n'))
+        self.assertEqual(body.count('BEGIN:VEVENT'), 3)
+        self.assertIn('SUMMARY:Show 0\r\n', body)
+        self.assertIn('DURATION:PT90M\r\n', body)
+        self.assertIn('LOCATION:The Hall\r\n', body)
+        self.assertNotIn('Unscheduled', body)
+        self.assertLess(body.index('Show 0'), body.index('Show 2'))
+
+    def test_accepts_calendar_media_type(self):
+        res = self.client.get(
+            venue_calendar_url(self.venue.id), HTTP_ACCEPT='text/calendar')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_token_in_query_string(self):
+        token = Token.objects.create(user=self.user)
+        client = APIClient()
+
+        res = client.get(
+            venue_calendar_url(self.venue.id), {'token': token.key})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_other_users_venue_not_found(self):
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='password123')
+        self.client.force_authenticate(other)
+
+        res = self.client.get(venue_calendar_url(self.venue.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_conditional_get(self):
+        res = self.client.get(venue_calendar_url(self.venue.id))
+        etag = res['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(
+                venue_calendar_url(self.venue.id), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_new_event_changes_etag(self):
+        etag = self.client.get(venue_calendar_url(self.venue.id))['ETag']
+        Event.objects.create(
+            title='Encore', venue_id=self.venue, group_id=self.group,
+            subgroup_id=self.subgroup, datetime=timezone.now())
+
+        res = self.client.get(
+            venue_calendar_url(self.venue.id), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn(b'Encore', b''.join(res.streaming_content))
+
+    def test_group_calendar(self):
+        admin = get_user_model().objects.create_superuser(
+            email='admin@example.com', password='password123')
+        self.client.force_authenticate(admin)
+
+        res = self.client.get(group_calendar_url(self.group.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        body = b''.join(res.streaming_content).decode()
+        self.assertEqual(body.count('BEGIN:VEVENT'), 3)
+        self.assertIn('X-WR-CALNAME:Band\r\n', body)
+
+
+class AsyncCalendarFeedTests(TransactionTestCase):
+    """Test the feed streams under ASGI."""
+
+    def test_venue_calendar(self):
+        get_cache().clear()
+        user = get_user_model().objects.create_user(
+            email='user@example.com', password='password123')
+        token = Token.objects.create(user=user)
+        venue = Venue.objects.create(venue_name='Hall', primary_contact=user)
+        group = Group.objects.create(group_name='Band')
+        Event.objects.create(
+            title='Show', venue_id=venue, group_id=group,
+            subgroup_id=SubGroup.objects.create(group_id=group),
+            datetime=timezone.now())
+
+        url = f'{venue_calendar_url(venue.id)}?token={token.key}'
+
+        res = async_to_sync(AsyncClient().get)(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        body = b''.join(res.streaming_content)
+        self.assertIn(b'SUMMARY:Show\r\n', body)
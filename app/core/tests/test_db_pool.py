@@ -0,0 +1,140 @@
+"""
+Tests for the connection pool and the pooling PostgreSQL backend.
+"""
+from unittest.mock import MagicMock, patch
+
+import psycopg2
+import psycopg2.extensions
+from django.db.utils import ConnectionHandler, OperationalError
+from django.test import SimpleTestCase
+
+from core.db.pool import ConnectionPool
+from core.metrics import registry
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def fake_connection():
+    conn = MagicMock(closed=0, isolation_level=None)
+    conn.info.transaction_status = \
+        psycopg2.extensions.TRANSACTION_STATUS_IDLE
+    conn.get_parameter_status.return_value = 'UTC'
+    return conn
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Test the connection pool."""
+
+    def setUp(self):
+        self.connect = MagicMock(side_effect=lambda: fake_connection())
+
+    def test_reuses_released_connections(self):
+        pool = ConnectionPool('test', self.connect, max_size=2)
+
+        conn = pool.acquire()
+        pool.release(conn)
+        again = pool.acquire()
+
+        self.assertIs(again, conn)
+        self.assertEqual(self.connect.call_count, 1)
+        self.assertEqual((pool.in_use, pool.idle), (1, 0))
+
+    def test_times_out_when_exhausted(self):
+        clock = FakeClock()
+        pool = ConnectionPool(
+            'test', self.connect, max_size=1, timeout=0, clock=clock)
+        pool.acquire()
+
+        with self.assertRaises(OperationalError):
+            pool.acquire()
+        self.assertEqual(pool.timeouts, 1)
+        self.assertEqual(pool.in_use, 1)
+
+    def test_discards_connections_failing_check(self):
+        pool = ConnectionPool(
+            'test', self.connect, check=lambda conn: conn.healthy)
+        conn = pool.acquire()
+        conn.healthy = False
+        pool.release(conn)
+
+        again = pool.acquire()
+
+        self.assertIsNot(again, conn)
+        conn.close.assert_called_once_with()
+        self.assertEqual(pool.in_use, 1)
+
+    def test_discards_connections_failing_reset(self):
+        pool = ConnectionPool('test', self.connect, reset=lambda conn: False)
+
+        pool.release(pool.acquire())
+
+        self.assertEqual((pool.in_use, pool.idle), (0, 0))
+
+    def test_failed_connect_frees_slot(self):
+        self.connect.side_effect = psycopg2.OperationalError
+        pool = ConnectionPool('test', self.connect, max_size=1)
+
+        with self.assertRaises(psycopg2.OperationalError):
+            pool.acquire()
+        self.assertEqual(pool.in_use, 0)
+
+    def test_warm_opens_min_size(self):
+        pool = ConnectionPool('test', self.connect, min_size=3)
+
+        self.assertEqual(pool.warm(), 3)
+        self.assertEqual(pool.warm(), 0)
+        self.assertEqual(pool.idle, 3)
+
+
+@patch('psycopg2.extras.register_default_jsonb', MagicMock())
+@patch('core.db.backends.postgresql.base.psycopg2.connect')
+class PooledBackendTests(SimpleTestCase):
+    """Test the PostgreSQL backend with a pool and health checks."""
+
+    def get_connection(self, name, **options):
+        handler = ConnectionHandler({'default': {
+            'ENGINE': 'core.db.backends.postgresql',
+            'NAME': name,
+            'HEALTH_CHECKS': True,
+            **options,
+        }})
+        return handler['default']
+
+    def test_close_returns_connection_to_pool(self, patched_connect):
+        patched_connect.side_effect = lambda **kwargs: fake_connection()
+        connection = self.get_connection(
+            'pooled-close', POOL={'MAX_SIZE': 2})
+
+        connection.ensure_connection()
+        raw = connection.connection
+        connection.close()
+        connection.ensure_connection()
+
+        self.assertIs(connection.connection, raw)
+        self.assertEqual(patched_connect.call_count, 1)
+        text = registry.render()
+        self.assertIn(
+            'lyre_db_pool_connections{alias="default",state="in_use"} 1',
+            text)
+        connection.close()
+
+    def test_health_check_on_reuse(self, patched_connect):
+        patched_connect.side_effect = lambda **kwargs: fake_connection()
+        connection = self.get_connection('health-check')
+        connection.ensure_connection()
+        dead = connection.connection
+        dead.cursor.side_effect = psycopg2.OperationalError
+
+        connection.close_if_unusable_or_obsolete()
+        connection.ensure_connection()
+
+        self.assertIsNot(connection.connection, dead)
+        self.assertEqual(patched_connect.call_count, 2)
+        connection.close()
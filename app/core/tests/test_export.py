@@ -0,0 +1,160 @@
+"""
+Tests for the streaming exports.
+"""
+import csv
+import datetime
+import io
+import json
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.export import EXPORTS, iter_rows, ndjson_chunks
+from core.models import Event, Group, SubGroup, Venue
+
+
+def export_url(resource):
+    return reverse('export', args=[resource])
+
+
+def body(response):
+    return b''.join(response.streaming_content).decode('utf-8')
+
+
+class ExportTests(TestCase):
+    """Test exporting resources as NDJSON and CSV."""
+
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser(
+            email='admin@example.com', password='password123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.venue = Venue.objects.create(
+            venue_name='The Hall', primary_contact=self.admin)
+        self.group = Group.objects.create(
+            group_name='Band', primary_contact=self.admin)
+        self.subgroup = SubGroup.objects.create(
+            group_id=self.group, display_name='Horns')
+        self.start = timezone.now().replace(microsecond=0)
+        self.events = [
+            Event.objects.create(
+                title=f'Show {day}',
+                datetime=self.start + datetime.timedelta(days=day),
+                duration=90,
+                venue_id=self.venue,
+                group_id=self.group,
+                subgroup_id=self.subgroup,
+                last_modified_by=self.admin,
+            )
+            for day in range(3)
+        ]
+
+    def test_export_requires_admin(self):
+        """Test that only admins can export."""
+        user = get_user_model().objects.create_user(
+            email='user@example.com', password='password123')
+        self.client.force_authenticate(user)
+
+        res = self.client.get(export_url('venues'))
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_ndjson(self):
+        """Test that rows are streamed as one JSON object per line."""
+        res = self.client.get(export_url('events'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        self.assertIn('events.ndjson', res['Content-Disposition'])
+        rows = [json.loads(line) for line in body(res).splitlines()]
+        self.assertEqual(
+            [row['id'] for row in rows], [e.id for e in self.events])
+        self.assertEqual(rows[0]['title'], 'Show 0')
+        self.assertEqual(rows[0]['venue_id'], self.venue.id)
+        self.assertEqual(
+            datetime.datetime.fromisoformat(
+                rows[0]['datetime'].replace('Z', '+00:00')),
+            self.start)
+
+    def test_export_csv(self):
+        """Test that ?format=csv streams CSV with a header row."""
+        res = self.client.get(export_url('subgroups'), {'format': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        rows = list(csv.reader(io.StringIO(body(res))))
+        self.assertEqual(rows[0], EXPORTS['subgroups'].fields)
+        self.assertEqual(
+            rows[1],
+            [str(self.subgroup.id), str(self.group.id), 'Horns'])
+
+    def test_export_accept_header(self):
+        """Test that the format can be negotiated with Accept."""
+        res = self.client.get(export_url('groups'), HTTP_ACCEPT='text/csv')
+
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        self.assertTrue(body(res).startswith('id,group_name'))
+
+    def test_export_filters(self):
+        """Test filtering events and resuming after an id."""
+        res = self.client.get(export_url('events'), {
+            'start': (self.start + datetime.timedelta(hours=1)).isoformat(),
+            'after': self.events[1].id,
+        })
+
+        rows = [json.loads(line) for line in body(res).splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.events[2].id])
+
+    def test_export_bad_filter(self):
+        """Test that an invalid filter is a 400 before streaming starts."""
+        res = self.client.get(export_url('events'), {'venue': 'abc'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(res.streaming)
+
+    def test_export_unknown_resource(self):
+        """Test that an unknown resource is a 404."""
+        res = self.client.get(export_url('users'))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_keyset_batches_without_server_side_cursors(self):
+        """Test reading in keyset batches when cursors are disabled."""
+        queryset = EXPORTS['events'].get_queryset({})
+        settings_dict = dict(
+            connection.settings_dict, DISABLE_SERVER_SIDE_CURSORS=True)
+
+        with mock.patch.object(connection, 'settings_dict', settings_dict):
+            rows = list(iter_rows(queryset, chunk_size=2))
+
+        self.assertEqual(
+            [row[0] for row in rows], [e.id for e in self.events])
+
+
+class NDJSONEncodingTests(TestCase):
+    """Test the NDJSON encoding does not depend on orjson."""
+
+    def test_without_orjson_output_is_identical(self):
+        fields = ['id', 'title', 'datetime', 'is_active', 'contact']
+        rows = [
+            (1, 'Café "Jazz"', datetime.datetime(
+                2030, 1, 1, 20, 0, 0, 123456, tzinfo=datetime.timezone.utc),
+             True, None),
+            (2, 'Gig', datetime.datetime(
+                2030, 1, 2, 20, tzinfo=datetime.timezone.utc), False, 7),
+        ]
+
+        fast = b''.join(ndjson_chunks(fields, rows, chunk_size=1))
+        with mock.patch('core.export.orjson', None):
+            fallback = b''.join(ndjson_chunks(fields, rows, chunk_size=1))
+
+        self.assertEqual(fallback, fast)
+        self.assertIn(b'"2030-01-01T20:00:00.123456Z"', fallback)
@@ -0,0 +1,332 @@
+"""
+Tests for the import_data command.
+"""
+import datetime
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from core.imports import IMPORTS, CopyBuffer, Loader, encode_copy_value
+from core.models import (
+    Event,
+    EventRollup,
+    Group,
+    Membership,
+    SubGroup,
+    Venue,
+    VenueAccess,
+)
+
+
+class ImportDataTests(TestCase):
+    """Test importing rows from NDJSON and CSV files."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='password123')
+        self.venue = Venue.objects.create(
+            venue_name='The Hall', primary_contact=self.user)
+        self.group = Group.objects.create(
+            group_name='Band', primary_contact=self.user)
+        self.subgroup = SubGroup.objects.create(
+            group_id=self.group, display_name='Horns')
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def call(self, *args, **options):
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_data', *args, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_import_events_ndjson_by_name(self):
+        """Test related rows can be given by name."""
+        rows = [
+            {
+                'title': f'Show {i}',
+                'datetime': f'2030-01-0{i + 1}T20:00:00Z',
+                'duration': 90,
+                'venue': 'The Hall',
+                'group': 'Band',
+                'subgroup': 'Horns',
+                'last_modified_by_email': 'user@example.com',
+            }
+            for i in range(5)
+        ]
+        path = self.write(
+            'events.ndjson', '\n'.join(json.dumps(row) for row in rows))
+
+        out, err = self.call('events', path, batch_size=2)
+
+        self.assertIn('Imported 5 events', out)
+        self.assertIn('rows/s', out)
+        events = Event.objects.order_by('id')
+        self.assertEqual(events.count(), 5)
+        event = events[0]
+        self.assertEqual(event.title, 'Show 0')
+        self.assertEqual(event.venue_id, self.venue)
+        self.assertEqual(event.subgroup_id, self.subgroup)
+        self.assertEqual(event.last_modified_by, self.user)
+        self.assertEqual(event.description, '')
+        self.assertEqual(
+            event.datetime,
+            datetime.datetime(2030, 1, 1, 20, tzinfo=datetime.timezone.utc))
+
+    def test_import_csv_by_id(self):
+        """Test importing CSV with related ids, as the exports write it."""
+        path = self.write('venues.csv', (
+            'id,venue_name,address,primary_contact\n'
+            f'99,Club,1 Main St,{self.user.id}\n'
+            '100,Park,,\n'
+        ))
+
+        self.call('venues', path)
+
+        club = Venue.objects.get(venue_name='Club')
+        self.assertNotEqual(club.id, 99)
+        self.assertEqual(club.primary_contact, self.user)
+        park = Venue.objects.get(venue_name='Park')
+        self.assertIsNone(park.primary_contact)
+        self.assertEqual(park.address, '')
+
+    def test_import_keep_ids(self):
+        """Test the id column can be kept."""
+        path = self.write(
+            'groups.csv', 'id,group_name,is_active\n500,Choir,False\n')
+
+        self.call('groups', path, keep_ids=True)
+
+        group = Group.objects.get(pk=500)
+        self.assertEqual(group.group_name, 'Choir')
+        self.assertFalse(group.is_active)
+
+    def test_invalid_rows_abort(self):
+        """Test nothing is imported when a row is invalid."""
+        path = self.write('subgroups.ndjson', '\n'.join([
+            json.dumps({'group': 'Band', 'display_name': 'Strings'}),
+            json.dumps({'group': 'Nobody', 'display_name': 'Drums'}),
+            json.dumps({'group_id': 'x'}),
+        ]))
+
+        with self.assertRaises(CommandError):
+            self.call('subgroups', path)
+
+        self.assertFalse(
+            SubGroup.objects.filter(display_name='Strings').exists())
+
+    def test_skip_invalid(self):
+        """Test invalid rows are reported and skipped on request."""
+        path = self.write('subgroups.ndjson', '\n'.join([
+            json.dumps({'group': 'Band', 'display_name': 'Strings'}),
+            json.dumps({'group': 'Nobody', 'display_name': 'Drums'}),
+            json.dumps({'group_id': 12345}),
+            '{not json',
+            json.dumps({'group_id': self.group.id, 'colour': 'red'}),
+        ]))
+
+        out, err = self.call('subgroups', path, skip_invalid=True)
+
+        self.assertIn('Imported 1 subgroups', out)
+        self.assertIn('Skipped 4 invalid rows', out)
+        self.assertIn("Line 2: group: No Group with group_name 'Nobody'", err)
+        self.assertIn('Line 3: group_id: Group 12345 does not exist.', err)
+        self.assertIn('Line 4: __all__: Invalid JSON', err)
+        self.assertIn('Line 5: colour: Unknown column.', err)
+        self.assertTrue(
+            SubGroup.objects.filter(display_name='Strings').exists())
+
+    def test_copy_needs_postgres(self):
+        """Test COPY is refused on other databases."""
+        path = self.write('venues.csv', 'venue_name\nClub\n')
+
+        with self.assertRaises(CommandError):
+            self.call('venues', path, method='copy')
+
+    def test_unknown_format(self):
+        """Test the format must be given when the extension is unknown."""
+        path = self.write('venues.txt', 'venue_name\nClub\n')
+
+        with self.assertRaises(CommandError):
+            self.call('venues', path)
+
+        self.call('venues', path, format='csv')
+        self.assertTrue(Venue.objects.filter(venue_name='Club').exists())
+
+    def write_events(self, starts, **row):
+        rows = [
+            dict({
+                'title': f'Show {i}',
+                'datetime': start,
+                'duration': 60,
+                'venue': 'The Hall',
+                'group': 'Band',
+            }, **row)
+            for i, start in enumerate(starts)
+        ]
+        return self.write(
+            'events.ndjson', '\n'.join(json.dumps(row) for row in rows))
+
+    def test_double_bookings_abort(self):
+        """Test events overlapping each other are not imported."""
+        path = self.write_events([
+            '2030-01-01T20:00:00Z', '2030-01-01T20:30:00Z'])
+
+        with self.assertRaises(CommandError):
+            self.call('events', path)
+
+        self.assertFalse(Event.objects.exists())
+
+    def test_skip_double_bookings(self):
+        """Test double bookings are reported like other invalid rows."""
+        booked = Event.objects.create(
+            title='Booked', venue_id=self.venue, group_id=self.group,
+            datetime=datetime.datetime(
+                2030, 1, 1, 18, tzinfo=datetime.timezone.utc),
+            duration=60)
+        path = self.write_events([
+            '2030-01-01T21:00:00Z',
+            '2030-01-01T18:30:00Z',
+            '2030-01-01T20:30:00Z',
+            '2030-01-01T20:00:00Z',
+            '2030-01-01T21:30:00Z',
+            '2030-01-01T22:00:00Z',
+        ])
+
+        out, err = self.call(
+            'events', path, batch_size=4, skip_invalid=True)
+
+        self.assertIn('Imported 3 events', out)
+        self.assertIn('Skipped 3 invalid rows', out)
+        self.assertIn(
+            'Line 2: datetime: The venue is already booked by event '
+            f'{booked.pk}.', err)
+        self.assertIn(
+            'Line 3: datetime: Overlaps line 4 of this import.', err)
+        # Line 5 overlaps line 1, written by the first batch.
+        self.assertIn(
+            'Line 5: datetime: The venue is already booked by event', err)
+        self.assertEqual(
+            sorted(Event.objects.values_list('title', flat=True)),
+            ['Booked', 'Show 0', 'Show 3', 'Show 5'])
+
+    def test_import_refreshes_touched_rows(self):
+        """Test summaries and rollups are refreshed without a rebuild."""
+        other = Venue.objects.create(venue_name='Other')
+        path = self.write_events(
+            ['2030-01-01T20:00:00Z', '2030-01-03T20:00:00Z'])
+
+        with mock.patch('core.summaries.rebuild') as rebuild, \
+                mock.patch('core.rollups.backfill') as backfill:
+            self.call('events', path, batch_size=1)
+
+        rebuild.assert_not_called()
+        backfill.assert_not_called()
+        self.venue.refresh_from_db()
+        self.assertEqual(self.venue.event_count, 2)
+        self.assertEqual(
+            self.venue.next_event_at,
+            datetime.datetime(2030, 1, 1, 20, tzinfo=datetime.timezone.utc))
+        other.refresh_from_db()
+        self.assertEqual(other.event_count, 0)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.upcoming_event_count, 2)
+        self.assertEqual(
+            sorted(EventRollup.objects.filter(venue=self.venue)
+                   .values_list('event_count', 'booked_minutes')),
+            [(1, 60), (1, 60)])
+
+    def test_import_refreshes_access(self):
+        """Test imported venues and groups get their access rows."""
+        peer = get_user_model().objects.create_user(
+            email='peer@example.com', password='password123',
+            user_org='Choir')
+        self.user.user_org = 'Choir'
+        self.user.save()
+
+        with mock.patch('core.access.rebuild') as rebuild:
+            self.call('groups', self.write(
+                'groups.csv', 'group_name\nChoir\n'))
+            self.call('venues', self.write(
+                'venues.csv',
+                f'venue_name,primary_contact\nClub,{self.user.pk}\n'))
+
+        rebuild.assert_not_called()
+        choir = Group.objects.get(group_name='Choir')
+        self.assertEqual(
+            set(Membership.objects.filter(group=choir)
+                .values_list('user', flat=True)),
+            {self.user.pk, peer.pk})
+        club = Venue.objects.get(venue_name='Club')
+        self.assertEqual(
+            set(VenueAccess.objects.filter(venue=club)
+                .values_list('user', flat=True)),
+            {self.user.pk, peer.pk})
+
+
+class CopyTests(TestCase):
+    """Test the COPY statement sent for an import."""
+
+    def test_copy_adds_derived_columns(self):
+        """Test ends_at, which COPY cannot derive, is computed."""
+        loader = Loader(IMPORTS['events'])
+        start = datetime.datetime(2030, 1, 1, tzinfo=datetime.timezone.utc)
+        row = ['Gig', start, 30, '', 1, 1, 1, None]
+        copied = {}
+
+        def copy_expert(sql, buffer):
+            copied['sql'] = sql
+            copied['data'] = buffer.read()
+
+        cursor = mock.MagicMock()
+        cursor.__enter__.return_value.copy_expert = copy_expert
+        with mock.patch.object(
+                loader.connection, 'cursor', return_value=cursor):
+            loader.copy([row])
+
+        self.assertTrue(copied['sql'].endswith(
+            '"ends_at") FROM STDIN WITH (FORMAT csv)'))
+        self.assertTrue(copied['data'].rstrip().endswith(
+            '"2030-01-01T00:30:00+00:00"'))
+
+
+class CopyEncodingTests(TestCase):
+    """Test encoding rows for COPY."""
+
+    def test_encode_copy_value(self):
+        self.assertEqual(encode_copy_value(None), '')
+        self.assertEqual(encode_copy_value(''), '""')
+        self.assertEqual(encode_copy_value(True), 'true')
+        self.assertEqual(encode_copy_value(42), '42')
+        self.assertEqual(encode_copy_value('say "hi"'), '"say ""hi"""')
+        self.assertEqual(
+            encode_copy_value(datetime.datetime(
+                2030, 1, 1, tzinfo=datetime.timezone.utc)),
+            '"2030-01-01T00:00:00+00:00"')
+
+    def test_copy_buffer_reads_in_pieces(self):
+        rows = [(i, f'row {i}', None) for i in range(100)]
+        buffer = CopyBuffer(rows)
+
+        pieces = []
+        while True:
+            piece = buffer.read(64)
+            if not piece:
+                break
+            self.assertLessEqual(len(piece), 64)
+            pieces.append(piece)
+
+        lines = ''.join(pieces).splitlines()
+        self.assertEqual(len(lines), 100)
+        self.assertEqual(lines[7], '7,"row 7",')
@@ -0,0 +1,168 @@
+"""
+Tests for the request metrics middleware and endpoint.
+"""
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.metrics import (
+    Histogram,
+    MetricsRegistry,
+    mark_process_dead,
+    registry,
+)
+from core.middleware import RequestMetricsMiddleware
+from core.models import Venue
+
+
+METRICS_URL = reverse('metrics')
+VENUES_URL = reverse('venue:venue-list')
+
+
+class HistogramTests(TestCase):
+    """Test the histogram and its text rendering."""
+
+    def test_buckets_are_cumulative(self):
+        histogram = Histogram((1, 5, 10))
+        for value in (0, 3, 3, 7, 50):
+            histogram.observe(value)
+
+        self.assertEqual(
+            list(histogram.samples()),
+            [('1', 1), ('5', 3), ('10', 4), ('+Inf', 5)],
+        )
+        self.assertEqual(histogram.sum, 63)
+
+    def test_render_prometheus_text(self):
+        metrics = MetricsRegistry()
+        metrics.histogram('test_seconds', 'Test.', buckets=(0.5,))
+        metrics.observe('test_seconds', (('route', 'a"b'),), 0.25)
+
+        text = metrics.render()
+
+        self.assertIn('# TYPE test_seconds histogram', text)
+        self.assertIn('test_seconds_bucket{route="a\\"b",le="0.5"} 1', text)
+        self.assertIn('test_seconds_count{route="a\\"b"} 1', text)
+
+
+class SharedMetricsTests(TestCase):
+    """Test merging the metrics of several workers through METRICS_DIR."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings = override_settings(METRICS_DIR=self.directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.gauges = {(('alias', 'default'),): 3}
+
+    def make_registry(self):
+        metrics = MetricsRegistry()
+        metrics._flusher = False  # Flushed by hand in the tests.
+        metrics.histogram('test_seconds', 'Test.', buckets=(0.5,))
+        metrics.counter('test_total', 'Test.', lambda: {(): 2})
+        metrics.gauge('test_open', 'Test.', lambda: self.gauges)
+        return metrics
+
+    def write_worker(self, pid, value):
+        """Write the snapshot of another worker with pid."""
+        worker = self.make_registry()
+        worker.observe('test_seconds', (('route', 'a'),), value)
+        worker.flush()
+        os.replace(
+            os.path.join(self.directory, f'{os.getpid()}.json'),
+            os.path.join(self.directory, f'{pid}.json'))
+
+    def test_render_merges_workers(self):
+        self.write_worker(1001, 0.25)
+        self.write_worker(1002, 1.0)
+        metrics = self.make_registry()
+        metrics.observe('test_seconds', (('route', 'a'),), 0.25)
+
+        text = metrics.render()
+
+        self.assertIn('test_seconds_bucket{route="a",le="0.5"} 2', text)
+        self.assertIn('test_seconds_count{route="a"} 3', text)
+        self.assertIn('test_seconds_sum{route="a"} 1.5', text)
+        self.assertIn('test_total{} 6', text)
+        self.assertIn('test_open{alias="default"} 9', text)
+
+    def test_dead_worker_keeps_totals(self):
+        self.write_worker(1001, 0.25)
+
+        mark_process_dead(1001)
+        text = self.make_registry().render()
+
+        self.assertIn('test_seconds_count{route="a"} 1', text)
+        self.assertIn('test_total{} 4', text)
+        self.assertIn('test_open{alias="default"} 3', text)
+
+
+class RequestMetricsTests(TestCase):
+    """Test requests are timed and exported."""
+
+    def setUp(self):
+        registry.reset()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='password123')
+        self.client.force_authenticate(self.user)
+
+    def test_server_timing_header(self):
+        Venue.objects.create(venue_name='Venue', primary_contact=self.user)
+
+        res = self.client.get(VENUES_URL)
+
+        timing = res['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        for name in ('serialize', 'view', 'total'):
+            self.assertRegex(timing, rf'{name};dur=[\d.]+')
+
+    def test_query_count_recorded_per_route(self):
+        self.client.get(VENUES_URL)
+        self.client.get(VENUES_URL)
+
+        text = registry.render()
+
+        self.assertIn(
+            'lyre_request_duration_seconds_count'
+            '{route="venue:venue-list",method="GET"} 2',
+            text,
+        )
+        self.assertIn(
+            'lyre_request_queries_count'
+            '{route="venue:venue-list",method="GET"} 2',
+            text,
+        )
+
+    def test_metrics_require_admin(self):
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_metrics_for_admin(self):
+        admin = get_user_model().objects.create_superuser(
+            email='admin@example.com', password='password123')
+        self.client.force_authenticate(admin)
+        self.client.get(VENUES_URL)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        self.assertIn(
+            b'route="venue:venue-list"', res.content)
+
+    @override_settings(REQUEST_METRICS_ENABLED=False)
+    def test_disabled(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            RequestMetricsMiddleware(lambda request: HttpResponse())
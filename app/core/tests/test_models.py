@@ -3,9 +3,12 @@ Tests for models.
 """
 # from decimal import Decimal
 from datetime import datetime
+import re
 import pytz
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 
 from core import models
@@ -74,3 +77,80 @@ class ModelTests(TestCase):
     #     )
 
         # self.assertEqual(str(event), event.title)
+
+
+class DefaultPkTests(TestCase):
+    """Test the cached default venue/group/subgroup pks."""
+
+    def setUp(self):
+        self.venue = models.Venue.objects.create(venue_name='Smalls')
+        self.group = models.Group.objects.create(group_name='Group')
+        self.subgroup = models.SubGroup.objects.create(
+            group_id=self.group, display_name='Friday')
+
+    def tearDown(self):
+        models.clear_cached_default_pk()
+
+    def warm(self):
+        """Resolve and cache every default pk."""
+        with self.captureOnCommitCallbacks(execute=True):
+            models.Venue.get_default_venue_pk()
+            models.Group.get_default_group_pk()
+            models.SubGroup.get_default_subgroup_pk()
+
+    def test_default_pk_resolved_once(self):
+        """Test the default pk is only looked up on first use."""
+        self.warm()
+
+        with self.assertNumQueries(0):
+            pk = models.Venue.get_default_venue_pk()
+
+        self.assertEqual(
+            models.Venue.objects.get(pk=pk).venue_name, 'default venue')
+
+    def test_default_pk_not_cached_before_commit(self):
+        """Test an uncommitted default row is not cached."""
+        models.Venue.get_default_venue_pk()
+
+        with self.assertNumQueries(2):
+            models.Venue.get_default_venue_pk()
+
+    def test_default_pk_forgotten_on_delete(self):
+        """Test deleting the default row invalidates the cache."""
+        self.warm()
+        old_pk = models.Venue.get_default_venue_pk()
+
+        models.Venue.objects.filter(pk=old_pk).delete()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            new_pk = models.Venue.get_default_venue_pk()
+        self.assertNotEqual(new_pk, old_pk)
+        self.assertTrue(models.Venue.objects.filter(pk=new_pk).exists())
+
+    def test_create_event_writes_without_selects(self):
+        """Test creating an event with default relations reads nothing.
+
+        The default relations come from the cache. Besides the INSERT,
+        the summary signals update the venue, group and subgroup, and the
+        rollup signal adds the event to its day's row, creating it here.
+        """
+        self.warm()
+
+        with CaptureQueriesContext(connection) as queries:
+            models.Event.objects.create(
+                title='Rehearsal', duration=60,
+                datetime=pytz.utc.localize(datetime(2030, 1, 1, 20)))
+
+        statements = [
+            re.match(r'(\w+) (?:INTO )?"(\w+)"', query['sql']).groups()
+            for query in queries.captured_queries
+            if not re.match(r'(RELEASE )?SAVEPOINT', query['sql'])
+        ]
+        self.assertEqual(statements, [
+            ('INSERT', 'core_event'),
+            ('UPDATE', 'core_venue'),
+            ('UPDATE', 'core_group'),
+            ('UPDATE', 'core_subgroup'),
+            ('UPDATE', 'core_eventrollup'),
+            ('INSERT', 'core_eventrollup'),
+        ])
@@ -0,0 +1,107 @@
+"""
+Tests for keyset pagination.
+"""
+from datetime import datetime, timedelta
+
+import pytz
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Event, Group, SubGroup, Venue
+
+
+VENUES_URL = reverse('venue:venue-list')
+EVENTS_URL = reverse('event:event-list')
+
+
+class KeysetPaginationTests(TestCase):
+    """Test paging through list endpoints with cursors."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin_user = get_user_model().objects.create_superuser(
+            email='admin1@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(self.admin_user)
+
+    def walk(self, url, params=None, link='next'):
+        """Follow `link` cursors from url and return every page."""
+        pages = []
+        res = self.client.get(url, params)
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append(res.data)
+            if not res.data[link]:
+                return pages
+            res = self.client.get(res.data[link])
+
+    def test_pages_cover_list_once(self):
+        """Test next cursors visit every venue exactly once."""
+        venues = [Venue.objects.create(venue_name=f'V{i}') for i in range(5)]
+
+        pages = self.walk(VENUES_URL, {'page_size': 2})
+
+        ids = [v['id'] for page in pages for v in page['results']]
+        self.assertEqual(ids, [v.id for v in reversed(venues)])
+        self.assertEqual([len(page['results']) for page in pages], [2, 2, 1])
+        self.assertIsNone(pages[0]['previous'])
+
+    def test_previous_cursor_returns_prior_page(self):
+        """Test following previous from page two returns page one."""
+        for i in range(5):
+            Venue.objects.create(venue_name=f'V{i}')
+        first = self.client.get(VENUES_URL, {'page_size': 2}).data
+        second = self.client.get(first['next']).data
+
+        res = self.client.get(second['previous'])
+
+        self.assertEqual(res.data['results'], first['results'])
+
+    def test_no_offset_or_count(self):
+        """Test deep pages are fetched with a seek, not OFFSET/COUNT."""
+        for i in range(5):
+            Venue.objects.create(venue_name=f'V{i}')
+        first = self.client.get(VENUES_URL, {'page_size': 2}).data
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(first['next'])
+
+        sql = ' '.join(q['sql'].upper() for q in queries.captured_queries)
+        self.assertNotIn('OFFSET', sql)
+        self.assertNotIn('COUNT(', sql)
+
+    def test_event_pages_in_datetime_order(self):
+        """Test events page by (datetime, id) with undated events last."""
+        venue = Venue.objects.create(venue_name='Smalls')
+        group = Group.objects.create(group_name='Group')
+        subgroup = SubGroup.objects.create(group_id=group)
+        start = pytz.utc.localize(datetime(2025, 3, 1, 20, 0))
+        moments = [start, start, start + timedelta(days=1), None, None]
+        events = [
+            Event.objects.create(
+                venue_id=venue, group_id=group, subgroup_id=subgroup,
+                title=f'E{i}', datetime=moment)
+            for i, moment in enumerate(moments)
+        ]
+
+        pages = self.walk(EVENTS_URL, {'page_size': 2})
+        ids = [e['id'] for page in pages for e in page['results']]
+        self.assertEqual(ids, [e.id for e in events])
+
+        back = self.walk(pages[-1]['previous'], link='previous')
+        ids = [e['id'] for page in reversed(back) for e in page['results']]
+        self.assertEqual(ids, [e.id for e in events[:4]])
+
+    def test_invalid_cursor(self):
+        """Test a malformed cursor returns a 404."""
+        res = self.client.get(VENUES_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
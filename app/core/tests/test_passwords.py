@@ -0,0 +1,120 @@
+"""
+Tests for pooled password checks.
+"""
+import os
+import threading
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.hashers import make_password as make_hash
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.test.client import AsyncRequestFactory
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import passwords
+from core.asyncviews import async_login_view
+
+
+TOKEN_URL = reverse('user:token')
+
+
+def thread_name_view(request):
+    """Respond with the name of the thread serving the request."""
+    return HttpResponse(threading.current_thread().name)
+
+
+class HashPoolTests(SimpleTestCase):
+    """Test where and how passwords are checked."""
+
+    @override_settings(PASSWORD_HASH_WORKERS=2)
+    def test_checks_run_in_worker_processes(self):
+        self.addCleanup(passwords.shutdown_hash_pool)
+
+        self.assertNotEqual(passwords._run(os.getpid), os.getpid())
+
+    def test_checks_run_inline_under_tests(self):
+        self.assertEqual(passwords._run(os.getpid), os.getpid())
+
+    @override_settings(PASSWORD_HASHERS=[
+        'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher'])
+    def test_overridden_hashers_are_used(self):
+        self.assertTrue(
+            passwords.make_password('secret').startswith('pbkdf2_sha1$'))
+
+    def test_check_password(self):
+        encoded = make_hash('secret')
+
+        self.assertEqual(
+            passwords.check_password('secret', encoded), (True, None))
+        self.assertEqual(
+            passwords.check_password('wrong', encoded), (False, None))
+
+    def test_old_hash_is_upgraded(self):
+        encoded = make_hash('secret', hasher='pbkdf2_sha1')
+
+        valid, updated = passwords.check_password('secret', encoded)
+
+        self.assertTrue(valid)
+        self.assertTrue(updated.startswith('pbkdf2_sha256$'))
+
+    def test_asgi_logins_use_login_pool(self):
+        view = async_login_view(thread_name_view)
+
+        res = async_to_sync(view)(AsyncRequestFactory().post('/'))
+
+        self.assertTrue(res.content.startswith(b'async-login'))
+
+    def test_wsgi_logins_run_inline(self):
+        view = async_login_view(thread_name_view)
+
+        res = async_to_sync(view)(RequestFactory().post('/'))
+
+        self.assertEqual(
+            res.content.decode(), threading.current_thread().name)
+
+
+class PooledBackendTests(TestCase):
+    """Test logging in through the pooled backend."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='password123')
+
+    def test_login_upgrades_old_hash(self):
+        self.user.password = make_hash('password123', hasher='pbkdf2_sha1')
+        self.user.save()
+
+        res = APIClient().post(TOKEN_URL, {
+            'email': 'user@example.com', 'password': 'password123'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$'))
+        self.assertTrue(self.user.check_password('password123'))
+
+    def test_wrong_password_keeps_hash(self):
+        encoded = self.user.password
+
+        user = authenticate(username='user@example.com', password='nope')
+
+        self.assertIsNone(user)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.password, encoded)
+
+    def test_unknown_and_inactive_users_rejected(self):
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertIsNone(authenticate(
+            username='user@example.com', password='password123'))
+        self.assertIsNone(authenticate(
+            username='nobody@example.com', password='password123'))
@@ -0,0 +1,317 @@
+"""
+Tests for recurring events.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import recurrence
+from core.availability import busy_intervals
+from core.models import Event, Group, Recurrence, SubGroup, Venue
+
+
+EVENTS_URL = reverse('event:event-list')
+BULK_URL = reverse('event:event-bulk')
+
+
+def day(number, hour=19):
+    """Return an aware datetime in May 2030; the 1st is a Wednesday."""
+    return datetime(2030, 5, number, hour, tzinfo=dt_timezone.utc)
+
+
+def expand(rule, dtstart, start=None, end=None):
+    return list(recurrence.occurrences(rule, dtstart, start, end))
+
+
+class RuleTests(SimpleTestCase):
+    """Test parsing and expanding rules."""
+
+    def setUp(self):
+        recurrence.clear_cache()
+
+    def test_parse_normalizes(self):
+        rule = recurrence.RecurrenceRule.parse(
+            'RRULE:freq=weekly;byday=FR,MO;interval=1;count=3')
+
+        self.assertEqual(str(rule), 'FREQ=WEEKLY;COUNT=3;BYDAY=MO,FR')
+
+    def test_parse_rejects_invalid_rules(self):
+        for text in [
+            'FREQ=HOURLY',
+            'FREQ=DAILY;COUNT=0',
+            'FREQ=DAILY;COUNT=2;UNTIL=20300601',
+            'FREQ=DAILY;BYDAY=MO',
+            'FREQ=WEEKLY;BYSETPOS=1',
+            'FREQ=MONTHLY;BYMONTHDAY=32',
+        ]:
+            with self.subTest(text=text), self.assertRaises(ValueError):
+                recurrence.RecurrenceRule.parse(text)
+
+    def test_weekly_by_day(self):
+        values = expand('FREQ=WEEKLY;BYDAY=MO,WE;COUNT=4', day(1))
+
+        self.assertEqual(values, [day(1), day(6), day(8), day(13)])
+
+    def test_until_is_inclusive(self):
+        values = expand('FREQ=DAILY;UNTIL=20300503T190000Z', day(1))
+
+        self.assertEqual(values, [day(1), day(2), day(3)])
+
+    def test_monthly_skips_short_months(self):
+        start = datetime(2030, 1, 31, 19, tzinfo=dt_timezone.utc)
+
+        values = expand('FREQ=MONTHLY;COUNT=3', start)
+
+        self.assertEqual([v.month for v in values], [1, 3, 5])
+
+    def test_window_of_unbounded_series(self):
+        """Far windows are reached without expanding earlier periods."""
+        start = datetime(2100, 1, 1, tzinfo=dt_timezone.utc)
+
+        values = expand(
+            'FREQ=DAILY', day(1), start, start + timedelta(days=2))
+
+        self.assertEqual(values, [
+            start.replace(hour=19), start.replace(day=2, hour=19)])
+        self.assertLess(recurrence._expand_chunk.cache_info().currsize, 3)
+
+    def test_unbounded_series_is_lazy(self):
+        values = recurrence.occurrences('FREQ=WEEKLY', day(1))
+
+        self.assertEqual(
+            list(islice(values, 3)), [day(1), day(8), day(15)])
+
+    def test_occurrences_before_reverse_the_window(self):
+        for rule, start, end in [
+            ('FREQ=DAILY;COUNT=10', None, day(6)),
+            ('FREQ=DAILY;COUNT=10', day(3), day(6)),
+            ('FREQ=DAILY;COUNT=10', None, None),
+            ('FREQ=WEEKLY', day(2), day(30)),
+            ('FREQ=MONTHLY;BYMONTHDAY=31', None, day(1) + timedelta(
+                days=400)),
+        ]:
+            with self.subTest(rule=rule, start=start, end=end):
+                values = recurrence.occurrences_before(
+                    rule, day(1), end, start)
+
+                self.assertEqual(
+                    list(values), expand(rule, day(1), start, end)[::-1])
+
+    def test_occurrences_before_is_lazy(self):
+        """Test a far end is reached without expanding the whole series."""
+        end = datetime(2100, 1, 1, tzinfo=dt_timezone.utc)
+
+        values = recurrence.occurrences_before('FREQ=DAILY', day(1), end)
+
+        self.assertEqual(
+            list(islice(values, 2)),
+            [datetime(2099, 12, 31, 19, tzinfo=dt_timezone.utc),
+             datetime(2099, 12, 30, 19, tzinfo=dt_timezone.utc)])
+        self.assertLess(recurrence._expand_chunk.cache_info().currsize, 3)
+
+    def test_expansion_is_cached(self):
+        expand('FREQ=DAILY;COUNT=10', day(1))
+        expand('FREQ=DAILY;COUNT=10', day(1))
+
+        self.assertGreater(recurrence._expand_chunk.cache_info().hits, 0)
+
+
+class RecurringEventAPITests(TestCase):
+    """Test recurring events through the event API."""
+
+    def setUp(self):
+        recurrence.clear_cache()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='password123', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.venue = Venue.objects.create(venue_name='The Hall')
+        self.group = Group.objects.create(group_name='Band')
+        self.subgroup = SubGroup.objects.create(group_id=self.group)
+
+    def payload(self, start, minutes=60, **params):
+        payload = {
+            'title': 'Rehearsal',
+            'datetime': start.isoformat(),
+            'duration': minutes,
+            'venue_id': self.venue.id,
+            'group_id': self.group.id,
+            'subgroup_id': self.subgroup.id,
+        }
+        payload.update(params)
+        return payload
+
+    def create_series(self, rule='FREQ=WEEKLY', start=None):
+        event = Event.objects.create(
+            title='Rehearsal', datetime=start or day(1), duration=60,
+            venue_id=self.venue, group_id=self.group,
+            subgroup_id=self.subgroup)
+        event.set_rule(rule)
+        return event
+
+    def test_create_recurring_event(self):
+        res = self.client.post(EVENTS_URL, self.payload(
+            day(1), recurrence='freq=weekly;count=5'), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['recurrence'], 'FREQ=WEEKLY;COUNT=5')
+        event = Event.objects.get(pk=res.data['id'])
+        self.assertEqual(event.rule, 'FREQ=WEEKLY;COUNT=5')
+
+    def test_invalid_rule_rejected(self):
+        res = self.client.post(EVENTS_URL, self.payload(
+            day(1), recurrence='FREQ=SECONDLY'), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('recurrence', res.data)
+        self.assertFalse(Event.objects.exists())
+
+    def test_overlapping_occurrences_rejected(self):
+        res = self.client.post(EVENTS_URL, self.payload(
+            day(1), 60 * 30, recurrence='FREQ=DAILY'), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('duration', res.data)
+
+    def test_booking_over_an_occurrence_rejected(self):
+        series = self.create_series()
+
+        res = self.client.post(
+            EVENTS_URL, self.payload(day(15, 19)), format='json')
+        ok = self.client.post(
+            EVENTS_URL, self.payload(day(16, 19)), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(series.pk), str(res.data['datetime']))
+        self.assertEqual(ok.status_code, status.HTTP_201_CREATED)
+
+    def test_series_over_a_booking_rejected(self):
+        Event.objects.create(
+            title='Gig', datetime=day(22), duration=30,
+            venue_id=self.venue, group_id=self.group,
+            subgroup_id=self.subgroup)
+
+        res = self.client.post(EVENTS_URL, self.payload(
+            day(1), recurrence='FREQ=WEEKLY'), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_series_over_a_far_booking_rejected(self):
+        """Test bookings past RECURRENCE_CHECK_DAYS are checked too."""
+        Event.objects.create(
+            title='Gig', datetime=day(1) + timedelta(weeks=104),
+            duration=30, venue_id=self.venue, group_id=self.group,
+            subgroup_id=self.subgroup)
+
+        res = self.client.post(EVENTS_URL, self.payload(
+            day(1), recurrence='FREQ=WEEKLY'), format='json')
+        bulk = self.client.post(BULK_URL, [self.payload(
+            day(1), recurrence='FREQ=WEEKLY')], format='json')
+        ok = self.client.post(EVENTS_URL, self.payload(
+            day(1, 8), recurrence='FREQ=WEEKLY'), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            bulk.data['results'][0]['status'], status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(ok.status_code, status.HTTP_201_CREATED)
+
+    def test_update_removes_rule(self):
+        series = self.create_series()
+
+        res = self.client.patch(
+            reverse('event:event-detail', args=[series.pk]),
+            {'recurrence': ''}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['recurrence'], '')
+        self.assertFalse(Recurrence.objects.exists())
+
+    def test_bulk_create_with_rules(self):
+        res = self.client.post(BULK_URL, [
+            self.payload(day(1), recurrence='FREQ=WEEKLY'),
+            self.payload(day(2)),
+            self.payload(day(8), title='Clash'),
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        statuses = [item['status'] for item in res.data['results']]
+        self.assertEqual(statuses, [201, 201, 400])
+        series = Event.objects.get(pk=res.data['results'][0]['id'])
+        self.assertEqual(series.rule, 'FREQ=WEEKLY')
+        self.assertEqual(Recurrence.objects.count(), 1)
+
+    def test_list_window_expands_occurrences(self):
+        series = self.create_series('FREQ=WEEKLY;COUNT=10')
+        single = Event.objects.create(
+            title='Gig', datetime=day(9), duration=30,
+            venue_id=self.venue, group_id=self.group,
+            subgroup_id=self.subgroup)
+
+        res = self.client.get(EVENTS_URL, {
+            'start': day(5).isoformat(), 'end': day(20).isoformat()})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        rows = [(r['id'], r['datetime']) for r in res.data['results']]
+        self.assertEqual([pk for pk, _ in rows],
+                         [series.pk, single.pk, series.pk])
+        self.assertEqual(rows[0][1], '2030-05-08T19:00:00Z')
+        self.assertEqual(rows[2][1], '2030-05-15T19:00:00Z')
+
+    def test_list_pages_through_occurrences(self):
+        self.create_series('FREQ=DAILY')
+        seen, url = [], EVENTS_URL
+        params = {
+            'start': day(1).isoformat(), 'end': day(11).isoformat(),
+            'page_size': 3,
+        }
+        while url:
+            res = self.client.get(url, params)
+            params = None
+            seen.extend(r['datetime'] for r in res.data['results'])
+            url = res.data['next']
+
+        self.assertEqual(len(seen), 10)
+        self.assertEqual(seen, sorted(set(seen)))
+
+        previous = self.client.get(
+            self.client.get(EVENTS_URL, {
+                'start': day(1).isoformat(), 'end': day(11).isoformat(),
+                'page_size': 3,
+            }).data['next']).data['previous']
+        res = self.client.get(previous)
+
+        self.assertEqual(
+            [r['datetime'] for r in res.data['results']], seen[:3])
+
+    def test_list_without_window_lists_series_once(self):
+        self.create_series()
+
+        res = self.client.get(EVENTS_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['recurrence'], 'FREQ=WEEKLY')
+
+    def test_busy_intervals_include_occurrences(self):
+        series = self.create_series('FREQ=DAILY;COUNT=3')
+
+        busy = busy_intervals(self.venue.pk, day(2, 0), day(10))
+
+        self.assertEqual(
+            [(i.start, i.event) for i in busy],
+            [(day(2), series.pk), (day(3), series.pk)])
+
+    def test_calendar_sends_rrule(self):
+        self.create_series('FREQ=WEEKLY;COUNT=3')
+
+        res = self.client.get(
+            reverse('venue:venue-calendar', args=[self.venue.pk]))
+        body = b''.join(res.streaming_content).decode()
+
+        self.assertIn('RRULE:FREQ=WEEKLY;COUNT=3\r\n', body)
+        self.assertEqual(body.count('BEGIN:VEVENT'), 1)
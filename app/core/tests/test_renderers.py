@@ -0,0 +1,96 @@
+"""
+Tests for the fast JSON renderer and the fast list path.
+"""
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytz
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import Group, Venue
+from core.renderers import FastJSONRenderer
+from group.views import GroupViewSet
+from venue.views import VenueViewSet
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """Test FastJSONRenderer matches JSONRenderer byte for byte."""
+
+    def assertSameBytes(self, data):
+        self.assertEqual(
+            FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_plain_payloads(self):
+        """Test plain API payloads encode identically."""
+        self.assertSameBytes({
+            'next': None,
+            'results': [
+                {'id': 1, 'venue_name': 'Café ☃', 'active': True},
+                {'id': 2, 'venue_name': 'Line Break', 'address': None},
+            ],
+        })
+
+    def test_types_handled_by_drf_encoder(self):
+        """Test datetimes and decimals go through DRF's encoder."""
+        self.assertSameBytes({
+            'when': pytz.utc.localize(datetime(2025, 3, 1, 20, 0)),
+            'price': Decimal('12.50'),
+        })
+
+    def test_non_string_keys_fall_back(self):
+        """Test payloads orjson rejects are rendered by the parent."""
+        self.assertSameBytes({1: 'one'})
+
+    def test_without_orjson(self):
+        """Test the renderer works when orjson is not installed."""
+        with patch('core.renderers.orjson', None):
+            self.assertSameBytes({'id': 1})
+
+
+class FastListTests(TestCase):
+    """Test the fast list path returns the same bytes as serializers."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin_user = get_user_model().objects.create_superuser(
+            email='admin1@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(self.admin_user)
+        for name in ['Smalls', 'Café Bar', None]:
+            Venue.objects.create(venue_name=name, address='1 Main St')
+            Group.objects.create(
+                group_name=name or 'Unnamed',
+                primary_contact=self.admin_user,
+            )
+
+    def assertSameContent(self, viewset, url, params=None):
+        fast = self.client.get(url, params).content
+        with patch.object(viewset, 'fast_list', False):
+            slow = self.client.get(url, params).content
+        self.assertEqual(fast, slow)
+
+    def test_venue_list(self):
+        self.assertSameContent(
+            VenueViewSet, reverse('venue:venue-list'), {'page_size': 2})
+
+    def test_venue_list_with_fields(self):
+        self.assertSameContent(
+            VenueViewSet, reverse('venue:venue-list'), {'fields': 'id'})
+
+    def test_group_list(self):
+        self.assertSameContent(GroupViewSet, reverse('group:group-list'))
+
+    def test_fast_path_skips_serializer(self):
+        """Test rows are not built into model instances."""
+        with patch('core.models.Venue.__init__') as init:
+            self.client.get(reverse('venue:venue-list'))
+
+        init.assert_not_called()
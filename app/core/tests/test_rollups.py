@@ -0,0 +1,243 @@
+"""
+Tests for the daily event rollups and the event report.
+"""
+from datetime import date, datetime
+from io import StringIO
+
+import pytz
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import rollups
+from core.models import Event, EventRollup, Group, SubGroup, Venue
+
+
+REPORT_URL = reverse('event-report')
+EVENTS_BULK_URL = reverse('event:event-bulk')
+
+
+def at(day, hour=19):
+    """Return an aware datetime on a day of March 2025."""
+    return pytz.utc.localize(datetime(2025, 3, day, hour, 0))
+
+
+def stored():
+    """Return the rollup rows as (day, venue, group, count, minutes)."""
+    return set(EventRollup.objects.values_list(
+        'day', 'venue', 'group', 'event_count', 'booked_minutes'))
+
+
+class RollupFixture(TestCase):
+
+    def setUp(self):
+        self.venue = Venue.objects.create(venue_name='Smalls')
+        self.other_venue = Venue.objects.create(venue_name='Other Venue')
+        self.group = Group.objects.create(group_name='Band')
+        self.other_group = Group.objects.create(group_name='Choir')
+        self.subgroup = SubGroup.objects.create(group_id=self.group)
+
+    def create_event(self, day, duration=60, venue=None, group=None,
+                     hour=19):
+        return Event.objects.create(
+            venue_id=venue or self.venue,
+            group_id=group or self.group,
+            subgroup_id=self.subgroup,
+            datetime=at(day, hour),
+            duration=duration,
+        )
+
+
+class RollupTests(RollupFixture):
+    """Test the rows follow event writes."""
+
+    def test_create_adds_to_day(self):
+        self.create_event(17, 60)
+        self.create_event(17, 90, hour=21)
+        self.create_event(18, 30)
+
+        self.assertEqual(stored(), {
+            (date(2025, 3, 17), self.venue.pk, self.group.pk, 2, 150),
+            (date(2025, 3, 18), self.venue.pk, self.group.pk, 1, 30),
+        })
+        self.assertEqual(
+            set(EventRollup.objects.values_list('week', flat=True)),
+            {date(2025, 3, 17)})
+
+    def test_moving_and_deleting_event(self):
+        event = self.create_event(17, 60)
+        self.create_event(17, 30)
+
+        event.datetime = at(20)
+        event.venue_id = self.other_venue
+        event.duration = 45
+        event.save()
+        self.assertEqual(stored(), {
+            (date(2025, 3, 17), self.venue.pk, self.group.pk, 1, 30),
+            (date(2025, 3, 20), self.other_venue.pk, self.group.pk, 1, 45),
+        })
+
+        event.delete()
+        self.assertEqual(stored(), {
+            (date(2025, 3, 17), self.venue.pk, self.group.pk, 1, 30),
+            (date(2025, 3, 20), self.other_venue.pk, self.group.pk, 0, 0),
+        })
+
+    def test_event_without_start_is_left_out(self):
+        event = Event.objects.create(
+            venue_id=self.venue, group_id=self.group,
+            subgroup_id=self.subgroup)
+
+        self.assertEqual(stored(), set())
+        event.datetime = at(17)
+        event.save()
+        self.assertEqual(EventRollup.objects.get().event_count, 1)
+
+    def test_bulk_update_refreshes_old_and_new_days(self):
+        event = self.create_event(17, 60)
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_superuser(
+            'admin@example.com', 'password123'))
+
+        res = client.patch(EVENTS_BULK_URL, [
+            {'id': event.pk, 'datetime': at(19).isoformat()},
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(stored(), {
+            (date(2025, 3, 19), self.venue.pk, self.group.pk, 1, 60),
+        })
+
+    def test_backfill_command_repairs_drift(self):
+        self.create_event(3, 60)
+        self.create_event(17, 30)
+        self.create_event(30, 15, venue=self.other_venue)
+        expected = stored()
+        EventRollup.objects.update(event_count=9)
+        EventRollup.objects.filter(day=date(2025, 3, 30)).delete()
+
+        out = StringIO()
+        call_command(
+            'backfill_rollups', chunk_days=7, verbosity=2, stdout=out)
+
+        self.assertEqual(stored(), expected)
+        # Four chunks of a week cover the 3rd to the 30th.
+        self.assertEqual(out.getvalue().count('Days from'), 4)
+        self.assertEqual(rollups.backfill(start=date(2025, 3, 4)), 2)
+
+    def test_backfill_command_validates_options(self):
+        with self.assertRaises(CommandError):
+            call_command('backfill_rollups', chunk_days=0, stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command(
+                'backfill_rollups', start='2025-03-20', end='2025-03-01',
+                stdout=StringIO())
+
+
+class EventReportTests(RollupFixture):
+    """Test the event report endpoint."""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_superuser(
+                'admin@example.com', 'password123'))
+
+    def report(self, **params):
+        params.setdefault('start', '2025-03-01')
+        params.setdefault('end', '2025-03-31')
+        return self.client.get(REPORT_URL, params)
+
+    def test_weekly_by_venue(self):
+        self.create_event(17, 60)
+        self.create_event(19, 30)
+        self.create_event(19, 45, venue=self.other_venue)
+        self.create_event(25, 90)
+
+        res = self.report()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(row['period'], row['venue'], row['event_count'],
+              row['booked_minutes']) for row in res.data['results']],
+            [
+                (date(2025, 3, 17), self.venue.pk, 2, 90),
+                (date(2025, 3, 17), self.other_venue.pk, 1, 45),
+                (date(2025, 3, 24), self.venue.pk, 1, 90),
+            ])
+        self.assertEqual(
+            res.data['totals'], {'event_count': 4, 'booked_minutes': 225})
+
+    def test_daily_by_group_within_range(self):
+        self.create_event(17, 60)
+        self.create_event(17, 20, group=self.other_group)
+        self.create_event(18, 30)
+        self.create_event(20, 30)
+
+        res = self.report(
+            start='2025-03-17', end='2025-03-18', period='day', by='group',
+            venue=self.venue.pk)
+
+        self.assertEqual(
+            [(row['period'], row['group'], row['booked_minutes'])
+             for row in res.data['results']],
+            [
+                (date(2025, 3, 17), self.group.pk, 60),
+                (date(2025, 3, 17), self.other_group.pk, 20),
+                (date(2025, 3, 18), self.group.pk, 30),
+            ])
+
+    def test_member_sees_group_and_venue_events(self):
+        user = get_user_model().objects.create_user(
+            email='user@example.com', password='password123',
+            user_org='Choir')
+        self.create_event(17, 60)
+        self.create_event(17, 20, group=self.other_group)
+        self.client.force_authenticate(user)
+
+        res = self.report(by='group')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [row['group'] for row in res.data['results']],
+            [self.other_group.pk])
+
+    def test_invalid_params(self):
+        for params in (
+            {'start': ''},
+            {'end': 'March'},
+            {'start': '2025-03-02', 'end': '2025-03-01'},
+            {'start': '2020-01-01'},
+            {'period': 'month'},
+            {'by': 'subgroup'},
+        ):
+            with self.subTest(params=params):
+                res = self.report(**params)
+                self.assertEqual(
+                    res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_requires_authentication(self):
+        res = APIClient().get(REPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_queries_do_not_grow_with_events(self):
+        self.create_event(17)
+        with CaptureQueriesContext(connection) as few:
+            self.report()
+        for hour in range(10):
+            self.create_event(18, hour=hour)
+        with CaptureQueriesContext(connection) as many:
+            res = self.report()
+
+        self.assertEqual(res.data['totals']['event_count'], 11)
+        self.assertEqual(
+            len(few.captured_queries), len(many.captured_queries))
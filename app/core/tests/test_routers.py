@@ -0,0 +1,117 @@
+"""
+Tests for routing reads to replicas.
+"""
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.cache import get_cache
+from core.db.routers import ReplicaRouter, check_settings, replica_reads
+from core.models import Venue
+
+
+VENUES_URL = reverse('venue:venue-list')
+EVENTS_URL = reverse('event:event-list')
+
+
+@override_settings(DATABASE_REPLICAS=['replica_a', 'replica_b'])
+class ReplicaRouterTests(SimpleTestCase):
+    """Test the router on its own."""
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_use_primary_by_default(self):
+        self.assertIsNone(self.router.db_for_read(Venue))
+
+    def test_reads_use_replica_when_enabled(self):
+        with replica_reads():
+            alias = self.router.db_for_read(Venue)
+
+        self.assertIn(alias, ['replica_a', 'replica_b'])
+
+    def test_writes_use_primary(self):
+        with replica_reads():
+            self.assertEqual(self.router.db_for_write(Venue), 'default')
+
+    def test_no_migrations_on_replicas(self):
+        self.assertTrue(self.router.allow_migrate('default', 'core'))
+        self.assertFalse(self.router.allow_migrate('replica_a', 'core'))
+
+    @override_settings(ALLOW_PROCESS_LOCAL_CACHE=False)
+    def test_pins_need_shared_cache(self):
+        with self.assertRaises(ImproperlyConfigured):
+            check_settings()
+        with self.settings(DATABASE_REPLICAS=[]):
+            check_settings()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaReadTests(TransactionTestCase):
+    """Test API reads against a second connection to the test database.
+
+    The `replica` alias is a copy of `default`, so it sees the same data
+    through its own connection and queries can be told apart.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        connections.settings['replica'] = dict(
+            connections['default'].settings_dict)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        super().tearDownClass()
+
+    def setUp(self):
+        get_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='password123')
+        Venue.objects.create(venue_name='Venue', primary_contact=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_safe_requests_read_replica(self):
+        with CaptureQueriesContext(connections['replica']) as replica:
+            res = self.client.get(VENUES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertGreater(len(replica), 0)
+
+    def test_event_reads_use_replica(self):
+        with CaptureQueriesContext(connections['replica']) as replica:
+            self.client.get(EVENTS_URL)
+
+        self.assertGreater(len(replica), 0)
+
+    def test_read_your_writes_after_create(self):
+        with CaptureQueriesContext(connections['replica']) as replica:
+            res = self.client.post(VENUES_URL, {'venue_name': 'New'})
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            res = self.client.get(VENUES_URL)
+
+        self.assertEqual(len(replica), 0)
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_pin_is_per_user(self):
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='password123')
+        self.client.post(VENUES_URL, {'venue_name': 'New'})
+        client = APIClient()
+        client.force_authenticate(other)
+
+        with CaptureQueriesContext(connections['replica']) as replica:
+            client.get(VENUES_URL)
+
+        self.assertGreater(len(replica), 0)
@@ -0,0 +1,166 @@
+"""
+Tests for full-text search.
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Event, Group, SubGroup, Venue
+from core.search import search_terms
+
+
+SEARCH_URL = reverse('search')
+
+
+class SearchTests(TestCase):
+    """Test the search endpoint."""
+
+    def setUp(self):
+        self.staff = get_user_model().objects.create_user(
+            email='staff@example.com', password='password123', is_staff=True)
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='password123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+        self.venue = Venue.objects.create(
+            venue_name='Jazz Cellar', address='1 Harbour Street',
+            primary_contact=self.user)
+        self.other_venue = Venue.objects.create(venue_name='Town Hall')
+        self.group = Group.objects.create(group_name='Jazz Quartet')
+        self.subgroup = SubGroup.objects.create(group_id=self.group)
+
+    def event(self, title, description='', venue=None):
+        return Event.objects.create(
+            title=title, description=description,
+            venue_id=venue or self.venue, group_id=self.group,
+            subgroup_id=self.subgroup)
+
+    def search(self, **params):
+        res = self.client.get(SEARCH_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+        return res.data
+
+    def test_search_terms_drop_syntax(self):
+        self.assertEqual(
+            search_terms('jazz" OR NEAR(cellar*'),
+            ['jazz', 'OR', 'NEAR', 'cellar'])
+
+    def test_search_across_types(self):
+        event = self.event('Jazz night')
+        self.event('Folk night')
+
+        data = self.search(q='jazz')
+
+        found = {(r['type'], r['id']) for r in data['results']}
+        self.assertEqual(found, {
+            ('event', event.pk),
+            ('venue', self.venue.pk),
+            ('group', self.group.pk),
+        })
+        self.assertEqual(
+            data['results'][0]['object']['id'], data['results'][0]['id'])
+
+    def test_every_term_must_match_and_words_are_stemmed(self):
+        match = self.event('Rehearsals', 'Strings rehearsing the quartet')
+        self.event('Rehearsal', 'Brass only')
+
+        data = self.search(q='rehearsal quartets', type='event')
+
+        self.assertEqual([r['id'] for r in data['results']], [match.pk])
+
+    def test_title_ranks_above_description(self):
+        in_description = self.event('Concert', 'A night of blues')
+        in_title = self.event('Blues night')
+
+        data = self.search(q='blues', type='event')
+
+        self.assertEqual(
+            [r['id'] for r in data['results']],
+            [in_title.pk, in_description.pk])
+        ranks = [r['rank'] for r in data['results']]
+        self.assertGreater(ranks[0], ranks[1])
+
+    def test_index_follows_updates_and_deletes(self):
+        event = self.event('Opera')
+        event.title = 'Ballet'
+        event.save()
+        gone = self.event('Ballet gala')
+        gone.delete()
+
+        self.assertEqual(self.search(q='opera')['results'], [])
+        self.assertEqual(
+            [r['id'] for r in self.search(q='ballet')['results']],
+            [event.pk])
+
+    def test_bulk_created_rows_are_found(self):
+        Event.objects.bulk_create([
+            Event(title=f'Recital {i}', venue_id=self.venue,
+                  group_id=self.group, subgroup_id=self.subgroup)
+            for i in range(3)
+        ])
+
+        data = self.search(q='recital')
+
+        self.assertEqual(len(data['results']), 3)
+
+    def test_pages_cover_every_result_once(self):
+        for i in range(7):
+            self.event(f'Choir {i}', 'choir ' * (i % 3))
+
+        seen, url, params = [], SEARCH_URL, {'q': 'choir', 'page_size': 3}
+        while url:
+            res = self.client.get(url, params)
+            params = None
+            seen.extend((r['type'], r['id']) for r in res.data['results'])
+            url = res.data['next']
+        previous = self.client.get(
+            self.client.get(SEARCH_URL, {'q': 'choir', 'page_size': 3})
+            .data['next']).data['previous']
+
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(len(set(seen)), 7)
+        self.assertEqual(
+            [(r['type'], r['id'])
+             for r in self.client.get(previous).data['results']],
+            seen[:3])
+
+    def test_search_query_count(self):
+        for i in range(5):
+            self.event(f'Gig {i}')
+
+        with self.assertNumQueries(3):
+            self.search(q='gig')
+
+    def test_non_staff_only_find_their_rows(self):
+        mine = self.event('Jazz brunch')
+        self.event('Jazz supper', venue=self.other_venue)
+        self.client.force_authenticate(self.user)
+
+        data = self.search(q='jazz')
+
+        found = {(r['type'], r['id']) for r in data['results']}
+        self.assertEqual(
+            found, {('event', mine.pk), ('venue', self.venue.pk)})
+
+    def test_query_is_required(self):
+        res = self.client.get(SEARCH_URL, {'q': ' '})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unknown_type_rejected(self):
+        res = self.client.get(SEARCH_URL, {'q': 'jazz', 'type': 'user'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_cursor_not_found(self):
+        res = self.client.get(SEARCH_URL, {'q': 'jazz', 'cursor': 'nope'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_requires_authentication(self):
+        res = APIClient().get(SEARCH_URL, {'q': 'jazz'})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
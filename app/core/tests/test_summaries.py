@@ -0,0 +1,180 @@
+"""
+Tests for the event summary columns.
+"""
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import summaries
+from core.models import Event, Group, SubGroup, Venue
+
+
+VENUES_URL = reverse('venue:venue-list')
+GROUPS_URL = reverse('group:group-list')
+EVENTS_BULK_URL = reverse('event:event-bulk')
+
+
+class SummaryTests(TestCase):
+    """Test the columns follow event writes."""
+
+    def setUp(self):
+        self.now = timezone.now().replace(microsecond=0)
+        self.venue = Venue.objects.create(venue_name='Smalls')
+        self.other_venue = Venue.objects.create(venue_name='Other Venue')
+        self.group = Group.objects.create(group_name='Band')
+        self.subgroup = SubGroup.objects.create(group_id=self.group)
+
+    def create_event(self, hours, venue=None):
+        return Event.objects.create(
+            title='Gig',
+            venue_id=venue or self.venue,
+            group_id=self.group,
+            subgroup_id=self.subgroup,
+            datetime=self.now + timedelta(hours=hours),
+        )
+
+    def summary(self, obj):
+        obj.refresh_from_db()
+        return obj.event_count, obj.upcoming_event_count, obj.next_event_at
+
+    def test_create_counts_event_everywhere(self):
+        self.create_event(-1)
+        self.create_event(3)
+        self.create_event(2)
+
+        expected = (3, 2, self.now + timedelta(hours=2))
+        self.assertEqual(self.summary(self.venue), expected)
+        self.assertEqual(self.summary(self.group), expected)
+        self.assertEqual(self.summary(self.subgroup), expected)
+
+    def test_moving_event(self):
+        event = self.create_event(2)
+        self.create_event(5)
+
+        event.venue_id = self.other_venue
+        event.save()
+        self.assertEqual(
+            self.summary(self.venue), (1, 1, self.now + timedelta(hours=5)))
+        self.assertEqual(
+            self.summary(self.other_venue),
+            (1, 1, self.now + timedelta(hours=2)))
+
+        event.datetime = self.now + timedelta(hours=9)
+        event.save()
+        self.assertEqual(
+            self.summary(self.group), (2, 2, self.now + timedelta(hours=5)))
+
+    def test_deleting_next_event(self):
+        event = self.create_event(2)
+        self.create_event(5)
+
+        event.delete()
+
+        self.assertEqual(
+            self.summary(self.venue), (1, 1, self.now + timedelta(hours=5)))
+
+    def test_stale_rows_roll_forward(self):
+        self.create_event(1)
+        self.create_event(2)
+
+        updated = summaries.refresh_stale(
+            now=self.now + timedelta(minutes=90))
+
+        self.assertEqual(updated, 3)
+        self.assertEqual(
+            self.summary(self.venue), (2, 1, self.now + timedelta(hours=2)))
+        self.assertEqual(self.summary(self.other_venue), (0, 0, None))
+
+    def test_rebuild_command_repairs_drift(self):
+        self.create_event(1)
+        Venue.objects.update(event_count=7, next_event_at=None)
+
+        call_command('rebuild_event_summaries', stdout=StringIO())
+
+        self.assertEqual(
+            self.summary(self.venue), (1, 1, self.now + timedelta(hours=1)))
+        self.assertEqual(self.summary(self.other_venue), (0, 0, None))
+
+    def test_bulk_update_refreshes_old_and_new_rows(self):
+        event = self.create_event(2)
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_superuser(
+            'admin@example.com', 'password123'))
+
+        res = client.patch(EVENTS_BULK_URL, [
+            {'id': event.pk, 'venue_id': self.other_venue.pk},
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.summary(self.venue), (0, 0, None))
+        self.assertEqual(self.summary(self.other_venue)[:2], (1, 1))
+
+
+class SummaryFieldTests(TestCase):
+    """Test the optional serializer fields."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_superuser(
+                'admin@example.com', 'password123'))
+        self.group = Group.objects.create(group_name='Band')
+        self.subgroup = SubGroup.objects.create(group_id=self.group)
+        self.venues = [
+            Venue.objects.create(venue_name=f'Venue {i}') for i in range(3)]
+        Event.objects.create(
+            venue_id=self.venues[0],
+            group_id=self.group,
+            subgroup_id=self.subgroup,
+            datetime=timezone.now() + timedelta(days=1),
+        )
+
+    def test_fields_left_out_by_default(self):
+        res = self.client.get(VENUES_URL)
+
+        self.assertNotIn('event_count', res.data['results'][0])
+
+    def test_fields_cost_no_queries(self):
+        params = {'fields': 'id,event_count,upcoming_event_count'}
+        with CaptureQueriesContext(connection) as plain:
+            self.client.get(VENUES_URL, {'fields': 'id'})
+        with CaptureQueriesContext(connection) as summary:
+            res = self.client.get(VENUES_URL, params)
+
+        self.assertEqual(
+            len(plain.captured_queries), len(summary.captured_queries))
+        self.assertEqual(
+            [(row['id'], row['event_count']) for row in res.data['results']],
+            [(venue.pk, int(venue is self.venues[0]))
+             for venue in reversed(self.venues)],
+        )
+
+    def test_group_next_event_at(self):
+        res = self.client.get(GROUPS_URL, {'fields': 'id,next_event_at'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNotNone(res.data['results'][0]['next_event_at'])
+
+    def test_cached_summaries_follow_event_writes(self):
+        params = {'fields': 'id,event_count'}
+        self.client.get(VENUES_URL, params)
+
+        Event.objects.create(
+            venue_id=self.venues[1],
+            group_id=self.group,
+            subgroup_id=self.subgroup,
+        )
+        res = self.client.get(VENUES_URL, params)
+
+        counts = {row['id']: row['event_count'] for row in res.data['results']}
+        self.assertEqual(counts[self.venues[1].pk], 1)
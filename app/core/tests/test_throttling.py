@@ -0,0 +1,185 @@
+"""
+Tests for token-bucket rate limiting.
+"""
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import token_cache
+from core.throttling import (
+    CacheBucketStore,
+    LocalBucketStore,
+    client_ip,
+    parse_rate,
+)
+
+
+ME_URL = reverse('user:me')
+TOKEN_URL = reverse('user:token')
+VENUES_URL = reverse('venue:venue-list')
+
+
+def throttle(**rates):
+    """Return THROTTLE settings with only the given rates."""
+    return override_settings(THROTTLE={'ENABLED': True, 'RATES': rates})
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class BucketTests(SimpleTestCase):
+    """Test the bucket stores."""
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('120/min'), (120, 2.0))
+        self.assertEqual(parse_rate('5/s'), (5, 5.0))
+        self.assertIsNone(parse_rate(None))
+        for rate in ['ten/min', '5/fortnight', '0/s', '5']:
+            with self.subTest(rate=rate), self.assertRaises(ValueError):
+                parse_rate(rate)
+
+    def test_bucket_allows_burst_then_refills(self):
+        clock = FakeClock()
+        store = LocalBucketStore(clock=clock)
+
+        results = [store.consume('k', 3, 1.0)[0] for _ in range(4)]
+        allowed, wait = store.consume('k', 3, 1.0)
+
+        self.assertEqual(results, [True, True, True, False])
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(wait, 1.0)
+        clock.now += 1
+        self.assertTrue(store.consume('k', 3, 1.0)[0])
+        self.assertFalse(store.consume('k', 3, 1.0)[0])
+
+    def test_buckets_are_per_key(self):
+        store = LocalBucketStore()
+
+        self.assertTrue(store.consume('a', 1, 1.0)[0])
+        self.assertTrue(store.consume('b', 1, 1.0)[0])
+        self.assertFalse(store.consume('a', 1, 1.0)[0])
+
+    def test_store_is_bounded(self):
+        store = LocalBucketStore(max_size=2)
+
+        for key in 'abc':
+            store.consume(key, 1, 1.0)
+
+        self.assertEqual(len(store), 2)
+        self.assertTrue(store.consume('a', 1, 1.0)[0])
+
+    def test_cache_store_is_shared(self):
+        clock = FakeClock()
+        first = CacheBucketStore('default', clock=clock)
+        second = CacheBucketStore('default', clock=clock)
+        first.cache.clear()
+
+        self.assertTrue(first.consume('k', 2, 1.0)[0])
+        self.assertTrue(second.consume('k', 2, 1.0)[0])
+        self.assertFalse(first.consume('k', 2, 1.0)[0])
+
+    def test_cache_store_falls_back_when_locked(self):
+        store = CacheBucketStore('default')
+        store.cache.clear()
+        store.cache.add('throttle:k:lock', 1)
+
+        self.assertTrue(store.consume('k', 1, 1.0)[0])
+        self.assertFalse(store.consume('k', 1, 1.0)[0])
+        self.assertEqual(len(store.fallback), 1)
+
+    def test_client_ip_trusts_only_known_proxies(self):
+        request = type('Request', (), {'META': {
+            'REMOTE_ADDR': '10.0.0.1',
+            'HTTP_X_FORWARDED_FOR': '6.6.6.6, 1.2.3.4',
+        }})
+
+        self.assertEqual(client_ip(request), '10.0.0.1')
+        self.assertEqual(client_ip(request, num_proxies=1), '1.2.3.4')
+
+
+class ThrottleMiddlewareTests(TestCase):
+    """Test requests over a limit are rejected."""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='password123')
+        self.token = Token.objects.create(user=self.user)
+
+    def client_for(self, token=None, ip='127.0.0.1'):
+        client = APIClient(REMOTE_ADDR=ip)
+        if token is not None:
+            client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+        return client
+
+    @throttle(ip='2/min')
+    def test_ip_limit_returns_429_without_queries(self):
+        client = self.client_for()
+        client.get(VENUES_URL)
+        client.get(VENUES_URL)
+
+        with self.assertNumQueries(0):
+            res = client.get(VENUES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['Retry-After'], '30')
+        self.assertIn('throttled', res.json()['detail'])
+        other = client.get(VENUES_URL, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(other.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @throttle(token='2/min')
+    def test_token_limit_applies_across_ips(self):
+        client = self.client_for(self.token.key)
+        statuses = [
+            client.get(ME_URL, REMOTE_ADDR=f'10.0.0.{i}').status_code
+            for i in range(3)
+        ]
+
+        self.assertEqual(statuses, [200, 200, 429])
+
+    @throttle(user='2/min')
+    def test_user_limit_charged_once_per_request(self):
+        client = self.client_for(self.token.key)
+        statuses = [client.get(ME_URL).status_code for _ in range(3)]
+
+        self.assertEqual(statuses, [200, 200, 429])
+
+    @throttle(user='1/min')
+    def test_user_limit_without_cached_token(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        self.assertEqual(client.get(ME_URL).status_code, 200)
+        res = client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @throttle(ip='100/min', login='2/min')
+    def test_login_limit(self):
+        client = self.client_for()
+        payload = {'email': 'user@example.com', 'password': 'wrong'}
+        statuses = [
+            client.post(TOKEN_URL, payload).status_code for _ in range(3)]
+
+        self.assertEqual(statuses, [400, 400, 429])
+        self.assertEqual(
+            client.get(ME_URL).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(THROTTLE={'ENABLED': False})
+    def test_disabled(self):
+        client = self.client_for()
+
+        for _ in range(3):
+            res = client.get(VENUES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
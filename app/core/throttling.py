@@ -0,0 +1,275 @@
+"""
+Token-bucket rate limiting per IP, per token and per user.
+
+Each client key owns a bucket holding up to `capacity` tokens, refilled
+at a steady rate; every request takes one token and is rejected with a
+429 while the bucket is empty. Rates are written like DRF's, e.g.
+'100/min', which allows bursts of 100 and 100 requests a minute after.
+
+`ThrottleMiddleware` checks the IP and token buckets before sessions,
+authentication or any query, from the `Authorization` header alone, so
+rejecting a hot client costs a dictionary lookup. Buckets live in the
+process by default; `THROTTLE['CACHE_ALIAS']` shares them between
+processes through a Django cache instead.
+"""
+import asyncio
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import JsonResponse
+from django.urls import NoReverseMatch, reverse
+from rest_framework.throttling import BaseThrottle
+
+from core.authentication import token_cache
+
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """Return (capacity, tokens per second) for a rate like '100/min'."""
+    if rate is None:
+        return None
+    count, _, period = rate.partition('/')
+    try:
+        count = int(count)
+        seconds = PERIODS[period.strip()[0]]
+    except (ValueError, IndexError, KeyError):
+        raise ValueError(f'Invalid rate {rate!r}.')
+    if count < 1:
+        raise ValueError(f'Invalid rate {rate!r}.')
+    return count, count / seconds
+
+
+def refill(state, capacity, per_second, now):
+    """Return (allowed, wait, new state) after taking one token.
+
+    `state` is the bucket's (tokens, updated) pair, or None for a full
+    bucket; `wait` is how long until a token is free, in seconds.
+    """
+    tokens, updated = state if state is not None else (capacity, now)
+    tokens = min(capacity, tokens + max(now - updated, 0) * per_second)
+    if tokens >= 1:
+        return True, 0.0, (tokens - 1, now)
+    return False, (1 - tokens) / per_second, (tokens, now)
+
+
+class LocalBucketStore:
+    """Buckets in a bounded, thread-safe LRU of this process.
+
+    Evicting a bucket refills it, so `max_size` should comfortably exceed
+    the number of clients active within one refill period.
+    """
+
+    def __init__(self, max_size=100000, clock=time.monotonic):
+        self.max_size = max_size
+        self.clock = clock
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def consume(self, key, capacity, per_second):
+        """Take a token from key's bucket; return (allowed, wait)."""
+        with self._lock:
+            allowed, wait, self._buckets[key] = refill(
+                self._buckets.get(key), capacity, per_second, self.clock())
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self.max_size:
+                self._buckets.popitem(last=False)
+        return allowed, wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBucketStore:
+    """Buckets shared between processes through a Django cache.
+
+    Each update holds a short lock taken with the cache's atomic `add`.
+    If the lock stays busy, the request is checked against `fallback`, a
+    bucket of this process, rather than waiting.
+    """
+    prefix = 'throttle:'
+    lock_timeout = 1
+    attempts = 3
+
+    def __init__(self, alias, fallback=None, clock=time.time):
+        self.cache = caches[alias]
+        self.fallback = fallback or LocalBucketStore()
+        self.clock = clock
+
+    def consume(self, key, capacity, per_second):
+        name = self.prefix + key
+        lock = name + ':lock'
+        for attempt in range(self.attempts):
+            if self.cache.add(lock, 1, self.lock_timeout):
+                break
+            time.sleep(0.001 * (attempt + 1))
+        else:
+            return self.fallback.consume(key, capacity, per_second)
+        try:
+            allowed, wait, state = refill(
+                self.cache.get(name), capacity, per_second, self.clock())
+            # Once full, a bucket no longer needs storing.
+            timeout = math.ceil(capacity / per_second) + 1
+            self.cache.set(name, state, timeout)
+        finally:
+            self.cache.delete(lock)
+        return allowed, wait
+
+
+def build_store(options):
+    alias = options.get('CACHE_ALIAS')
+    local = LocalBucketStore(max_size=options.get('MAX_KEYS', 100000))
+    if alias:
+        return CacheBucketStore(alias, fallback=local)
+    return local
+
+
+def client_ip(request, num_proxies=0):
+    """Return the client address, trusting num_proxies proxies."""
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if forwarded and num_proxies:
+        addresses = [part.strip() for part in forwarded.split(',')]
+        return addresses[-min(num_proxies, len(addresses))]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def request_token(request):
+    """Return the API token a request carries, without checking it."""
+    words = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(words) == 2 and words[0].lower() == 'token':
+        return words[1]
+    # Calendar feeds take the token as ?token=.
+    return request.GET.get('token') or None
+
+
+def token_digest(key):
+    """Return a short digest of a token, so stores never hold tokens."""
+    return hashlib.blake2b(key.encode(), digest_size=12).hexdigest()
+
+
+def throttled_response(wait):
+    seconds = max(math.ceil(wait), 1)
+    response = JsonResponse(
+        {'detail': 'Request was throttled. '
+                   f'Expected available in {seconds} seconds.'},
+        status=429,
+    )
+    response['Retry-After'] = str(seconds)
+    return response
+
+
+class ThrottleMiddleware:
+    """Reject clients over their rate with a 429, before any other work.
+
+    Every request takes a token from its IP's bucket, and requests with
+    an API token from that token's bucket. When the token's user is in
+    the authentication cache, the user's bucket is charged here too;
+    otherwise `UserRateThrottle` charges it once DRF has authenticated
+    the request. Requests to the login endpoint also draw on a stricter
+    per-IP `login` bucket, since checking a password is deliberately
+    slow.
+
+    Configured by the `THROTTLE` setting; set `ENABLED` to False to
+    remove the middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        options = getattr(settings, 'THROTTLE', {})
+        if not options.get('ENABLED', True):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Mark the instance as a coroutine function for the handler.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+        self.rates = {
+            scope: parse_rate(rate)
+            for scope, rate in options.get('RATES', {}).items()
+        }
+        self.num_proxies = options.get('NUM_PROXIES', 0)
+        self.store = build_store(options)
+        self.shared = isinstance(self.store, CacheBucketStore)
+        try:
+            self.login_path = reverse('user:token')
+        except NoReverseMatch:
+            self.login_path = None
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.check(request)
+        if response is not None:
+            return response
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if self.shared:
+            response = await sync_to_async(self.check)(request)
+        else:
+            response = self.check(request)
+        if response is not None:
+            return response
+        return await self.get_response(request)
+
+    def consume(self, scope, ident):
+        """Take a token from a bucket; return (allowed, wait)."""
+        rate = self.rates.get(scope)
+        if rate is None:
+            return True, 0.0
+        return self.store.consume(f'{scope}:{ident}', *rate)
+
+    def check(self, request):
+        """Return a 429 response if the request is over a limit."""
+        request.throttle = self
+        ip = client_ip(request, self.num_proxies)
+        buckets = [('ip', ip)]
+        if request.path == self.login_path:
+            buckets.append(('login', ip))
+        key = request_token(request)
+        if key is not None:
+            buckets.append(('token', token_digest(key)))
+            cached = token_cache.get(key)
+            if cached is not None:
+                request.throttled_user = cached[0].pk
+                buckets.append(('user', cached[0].pk))
+        for scope, ident in buckets:
+            allowed, wait = self.consume(scope, ident)
+            if not allowed:
+                return throttled_response(wait)
+        return None
+
+
+class UserRateThrottle(BaseThrottle):
+    """Charge the user's bucket when the middleware could not.
+
+    That happens when the token was not cached yet, or for session
+    authentication.
+    """
+
+    def allow_request(self, request, view):
+        self.delay = None
+        user = request.user
+        raw = request._request
+        middleware = getattr(raw, 'throttle', None)
+        if middleware is None or not user.is_authenticated or \
+                getattr(raw, 'throttled_user', None) == user.pk:
+            return True
+        raw.throttled_user = user.pk
+        allowed, self.delay = middleware.consume('user', user.pk)
+        return allowed
+
+    def wait(self):
+        return self.delay
@@ -0,0 +1,205 @@
+"""
+Views for the core app.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Sum
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+from rest_framework import authentication, permissions
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import access
+from core.authentication import CachedTokenAuthentication
+from core.export import EXPORTS, export_chunks
+from core.metrics import registry
+from core.mixins import ReplicaReadMixin
+from core.models import EventRollup
+from core.pagination import SearchKeysetPagination
+from core.params import parse_date, parse_id
+from core.renderers import CSVRenderer, NDJSONRenderer
+from core.search import SEARCHES
+from core.streaming import streaming_response
+
+
+class MetricsView(APIView):
+    """Serve request metrics in the Prometheus text format."""
+    authentication_classes = [
+        CachedTokenAuthentication,
+        authentication.SessionAuthentication,
+    ]
+    permission_classes = [permissions.IsAdminUser]
+    schema = None
+
+    def get(self, request):
+        return HttpResponse(
+            registry.render(),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
+
+
+class ExportView(APIView):
+    """Stream every row of a resource as NDJSON or CSV.
+
+    Pick the format with `?format=ndjson|csv` or the Accept header. Rows
+    are ordered by id and can be filtered with the resource's query
+    params; `after=<id>` resumes an interrupted export.
+    """
+    authentication_classes = [
+        CachedTokenAuthentication,
+        authentication.SessionAuthentication,
+    ]
+    permission_classes = [permissions.IsAdminUser]
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+    schema = None
+
+    def get(self, request, resource):
+        export = EXPORTS.get(resource)
+        if export is None:
+            raise NotFound()
+        queryset = export.get_queryset(request.query_params)
+        format = request.accepted_renderer.format
+        chunk_size = getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+        response = streaming_response(
+            request,
+            lambda: export_chunks(export, queryset, format, chunk_size),
+            content_type=request.accepted_renderer.media_type,
+        )
+        response['Content-Disposition'] = \
+            f'attachment; filename="{resource}.{format}"'
+        return response
+
+
+class SearchView(ReplicaReadMixin, APIView):
+    """Search events, venues and groups by their text.
+
+    `q` is the search and `type` optionally limits the results to a comma
+    separated list of `event`, `venue` and `group`. Results are ranked,
+    best first, and paginated with a cursor. Users only find what they
+    could list: staff see everything, others the events and venues
+    `core.access` lets them see.
+    """
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = SearchKeysetPagination
+
+    def get_types(self):
+        """Return the result types the user asked for and may see."""
+        value = self.request.query_params.get('type')
+        types = value.split(',') if value else list(SEARCHES)
+        unknown = set(types) - set(SEARCHES)
+        if unknown:
+            raise ValidationError({'type': [
+                f'Unknown type {name!r}.' for name in sorted(unknown)]})
+        user = self.request.user
+        if not (user.is_staff or user.is_superuser):
+            types = [name for name in types if name != 'group']
+        return types
+
+    def get_queryset(self, name):
+        """Return the rows of a result type the user may see."""
+        queryset = SEARCHES[name].model.objects.all()
+        user = self.request.user
+        if name == 'event':
+            return access.visible_events(
+                queryset.select_related('recurrence'), user)
+        if name == 'venue':
+            return access.visible_venues(queryset, user)
+        return queryset
+
+    def get(self, request):
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            raise ValidationError({'q': ['This query param is required.']})
+        querysets = {
+            name: SEARCHES[name].search(self.get_queryset(name), text)
+            for name in self.get_types()
+        }
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(querysets, request, view=self)
+        serializers = {
+            name: import_string(SEARCHES[name].serializer)
+            for name in querysets
+        }
+        context = {'request': request, 'view': self}
+        return paginator.get_paginated_response([
+            {
+                'type': row.type,
+                'id': row.pk,
+                'rank': row.rank,
+                'object': serializers[row.type](row, context=context).data,
+            }
+            for row in page
+        ])
+
+
+class EventReportView(ReplicaReadMixin, APIView):
+    """Report events and booked minutes per period, by venue or group.
+
+    `start` and `end` are the first and last day covered. `period` is
+    `week` (the default) or `day`, and weeks are labelled with their
+    Monday, so the first and last may be partial. `by` is `venue` (the
+    default) or `group`, and `venue` and `group` limit the report to one
+    of either. Figures come from the daily rollups, so a report costs
+    the same however many events are behind it. Users are only counted
+    the events they could list.
+    """
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    periods = {'day': 'day', 'week': 'week'}
+    keys = ('venue', 'group')
+
+    def get_choice(self, name, choices, default):
+        value = self.request.query_params.get(name) or default
+        if value not in choices:
+            raise ValidationError(
+                {name: [f'Must be one of {", ".join(choices)}.']})
+        return value
+
+    def get(self, request):
+        params = request.query_params
+        start = parse_date(params, 'start')
+        end = parse_date(params, 'end')
+        errors = {
+            name: ['This query param is required.']
+            for name, value in (('start', start), ('end', end))
+            if value is None
+        }
+        if errors:
+            raise ValidationError(errors)
+        max_days = getattr(settings, 'REPORT_MAX_DAYS', 400)
+        if end < start:
+            raise ValidationError({'end': 'Must not be before start.'})
+        if end - start >= timedelta(days=max_days):
+            raise ValidationError(
+                {'end': f'The report can cover at most {max_days} days.'})
+        period = self.get_choice('period', self.periods, 'week')
+        by = self.get_choice('by', self.keys, 'venue')
+
+        rows = EventRollup.objects.filter(day__gte=start, day__lte=end)
+        user = request.user
+        if not access.is_unscoped(user):
+            rows = rows.filter(access.event_scope(user, 'venue', 'group'))
+        for name in self.keys:
+            value = parse_id(params, name)
+            if value is not None:
+                rows = rows.filter(**{name: value})
+        totals = {
+            'event_count': Sum('event_count'),
+            'booked_minutes': Sum('booked_minutes'),
+        }
+        results = rows.order_by().values(
+            by, period=F(self.periods[period]),
+        ).annotate(**totals).order_by('period', by)
+        summary = rows.aggregate(**totals)
+        return Response({
+            'start': start,
+            'end': end,
+            'period': period,
+            'by': by,
+            'results': list(results),
+            'totals': {name: value or 0 for name, value in summary.items()},
+        })
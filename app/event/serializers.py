@@ -0,0 +1,103 @@
+"""
+Serializers for event APIs
+"""
+from django.db import transaction
+from rest_framework import serializers
+
+from core import recurrence
+from core.availability import (
+    booking,
+    conflict_error,
+    find_conflict,
+    series_conflict,
+)
+from core.models import Event
+from core.serializers import DynamicFieldsMixin
+
+
+class EventSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """Serializer for events"""
+    recurrence = serializers.CharField(
+        source='rule', required=False, allow_blank=True, max_length=255)
+
+    class Meta:
+        model = Event
+        fields = [
+            'id',
+            'title',
+            'datetime',
+            'duration',
+            'venue_id',
+            'group_id',
+            'subgroup_id',
+            'recurrence',
+        ]
+        read_only_fields = ['id']
+        expandable_fields = {
+            'venue_id': 'venue.serializers.VenueSerializer',
+            'group_id': 'group.serializers.GroupSerializer',
+            'last_modified_by': 'user.serializers.ContactSerializer',
+        }
+
+    def validate_recurrence(self, value):
+        """Store rules in one canonical spelling."""
+        if not value:
+            return ''
+        try:
+            return str(recurrence.parse(value))
+        except ValueError as exc:
+            raise serializers.ValidationError(str(exc))
+
+    def validate(self, attrs):
+        """Reject events that overlap another booking at their venue."""
+        attrs = super().validate(attrs)
+        instance = self.instance
+        if instance is not None and not {
+                'datetime', 'duration', 'venue_id', 'rule'} & set(attrs):
+            return attrs
+        rule = attrs.get('rule', getattr(instance, 'rule', ''))
+        if rule and attrs.get(
+                'datetime', getattr(instance, 'datetime', None)) is None:
+            raise serializers.ValidationError(
+                {'recurrence': 'A recurring event needs a datetime.'})
+        venue, intervals = booking(attrs, instance)
+        if any(a[1] > b[0] for a, b in zip(intervals, intervals[1:])):
+            raise serializers.ValidationError(
+                {'duration': 'Occurrences must not overlap each other.'})
+        if not self.context.get('check_conflicts', True):
+            return attrs
+        pk = getattr(instance, 'pk', None)
+        conflict = find_conflict(venue, intervals, exclude=pk)
+        if conflict is None and rule:
+            conflict = series_conflict(
+                venue, rule, intervals, exclude=[pk] if pk else ())
+        if conflict is not None:
+            raise conflict_error(conflict)
+        return attrs
+
+    def create(self, validated_data):
+        rule = validated_data.pop('rule', '')
+        with transaction.atomic():
+            event = super().create(validated_data)
+            if rule:
+                event.set_rule(rule)
+        return event
+
+    def update(self, instance, validated_data):
+        rule = validated_data.pop('rule', None)
+        with transaction.atomic():
+            event = super().update(instance, validated_data)
+            if rule is not None:
+                event.set_rule(rule)
+        return event
+
+
+class EventDetailSerializer(EventSerializer):
+    """Serializer for event detail"""
+
+    class Meta(EventSerializer.Meta):
+        fields = EventSerializer.Meta.fields + [
+            'description',
+            'last_modified_by',
+        ]
+        read_only_fields = ['id', 'last_modified_by']
@@ -0,0 +1,377 @@
+"""
+Tests for Event APIs
+"""
+from datetime import datetime
+
+import pytz
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Event,
+    Group,
+    SubGroup,
+    Venue,
+)
+
+from event.serializers import (
+    EventSerializer,
+    EventDetailSerializer,
+)
+
+
+EVENTS_URL = reverse('event:event-list')
+BULK_URL = reverse('event:event-bulk')
+
+
+def detail_url(event_id):
+    """Create and return an event detail URL."""
+    return reverse('event:event-detail', args=[event_id])
+
+
+def utc(*args):
+    """Return an aware UTC datetime."""
+    return pytz.utc.localize(datetime(*args))
+
+
+def create_user(**params):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(**params)
+
+
+def create_event(venue, group, subgroup, **params):
+    """Create and return a sample event."""
+    defaults = {
+        'title': 'Rehearsal',
+        'duration': 60,
+        'datetime': utc(2025, 3, 21, 19, 0),
+        'description': 'Weekly rehearsal.',
+    }
+    defaults.update(params)
+
+    return Event.objects.create(
+        venue_id=venue,
+        group_id=group,
+        subgroup_id=subgroup,
+        **defaults
+    )
+
+
+class PublicEventAPITests(TestCase):
+    """Test unauthenticated API requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        """Test auth is required to call API."""
+        res = self.client.get(EVENTS_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateEventAPITests(TestCase):
+    """Test authenticated API requests"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='user@example.com', password='password123')
+        self.client.force_authenticate(self.user)
+        self.admin_user = get_user_model().objects.create_superuser(
+            email='admin1@example.com',
+            password='testpass123'
+        )
+        self.venue = Venue.objects.create(
+            venue_name='Smalls', primary_contact=self.user)
+        self.other_venue = Venue.objects.create(venue_name='Other Venue')
+        self.group = Group.objects.create(group_name='Blowout 2025')
+        self.subgroup = SubGroup.objects.create(
+            group_id=self.group, display_name='Friday')
+
+    def test_event_list_limited_to_user_venues(self):
+        """Test non-staff users only see events at their venues."""
+        create_event(self.venue, self.group, self.subgroup)
+        create_event(self.other_venue, self.group, self.subgroup)
+
+        res = self.client.get(EVENTS_URL)
+
+        events = Event.objects.filter(venue_id=self.venue)
+        serializer = EventSerializer(events, many=True)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def test_filter_by_venue_and_time_range(self):
+        """Test filtering events by venue and a start/end window."""
+        self.client.force_authenticate(self.admin_user)
+        march = create_event(
+            self.venue, self.group, self.subgroup,
+            datetime=utc(2025, 3, 10, 20, 0))
+        create_event(
+            self.venue, self.group, self.subgroup,
+            datetime=utc(2025, 4, 1, 0, 0))
+        create_event(
+            self.other_venue, self.group, self.subgroup,
+            datetime=utc(2025, 3, 12, 20, 0))
+
+        res = self.client.get(EVENTS_URL, {
+            'venue': self.venue.id,
+            'start': '2025-03-01T00:00:00Z',
+            'end': '2025-04-01T00:00:00Z',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [e['id'] for e in res.data['results']], [march.id])
+
+    def test_filter_by_group_and_subgroup(self):
+        """Test filtering events by group and subgroup."""
+        self.client.force_authenticate(self.admin_user)
+        other_group = Group.objects.create(group_name='Other Group')
+        other_subgroup = SubGroup.objects.create(
+            group_id=other_group, display_name='Saturday')
+        event = create_event(self.venue, self.group, self.subgroup)
+        create_event(self.venue, other_group, other_subgroup)
+
+        res = self.client.get(EVENTS_URL, {'group': self.group.id})
+        self.assertEqual(
+            [e['id'] for e in res.data['results']], [event.id])
+
+        res = self.client.get(EVENTS_URL, {'subgroup': other_subgroup.id})
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertNotEqual(res.data['results'][0]['id'], event.id)
+
+    def test_events_ordered_by_datetime(self):
+        """Test events are listed in chronological order."""
+        self.client.force_authenticate(self.admin_user)
+        later = create_event(
+            self.venue, self.group, self.subgroup,
+            datetime=utc(2025, 5, 1, 20, 0))
+        earlier = create_event(
+            self.venue, self.group, self.subgroup,
+            datetime=utc(2025, 5, 1, 18, 0))
+
+        res = self.client.get(EVENTS_URL)
+
+        self.assertEqual(
+            [e['id'] for e in res.data['results']], [earlier.id, later.id])
+
+    def test_invalid_filters_rejected(self):
+        """Test malformed filters return a 400."""
+        res = self.client.get(EVENTS_URL, {'start': 'next tuesday'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(EVENTS_URL, {'venue': 'smalls'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_get_event_detail(self):
+        """Test get event detail."""
+        event = create_event(self.venue, self.group, self.subgroup)
+
+        res = self.client.get(detail_url(event.id))
+
+        serializer = EventDetailSerializer(event)
+        self.assertEqual(res.data, serializer.data)
+
+    def test_create_event(self):
+        """Test creating an event at a managed venue."""
+        payload = {
+            'title': 'Gig',
+            'duration': 90,
+            'datetime': '2025-06-01T20:00:00Z',
+            'venue_id': self.venue.id,
+            'group_id': self.group.id,
+            'subgroup_id': self.subgroup.id,
+        }
+
+        res = self.client.post(EVENTS_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        event = Event.objects.get(id=res.data['id'])
+        self.assertEqual(event.title, payload['title'])
+        self.assertEqual(event.last_modified_by, self.user)
+
+    def test_create_event_at_unmanaged_venue_fails(self):
+        """Test non-staff users cannot book other venues."""
+        payload = {
+            'title': 'Gig',
+            'datetime': '2025-06-01T20:00:00Z',
+            'venue_id': self.other_venue.id,
+            'group_id': self.group.id,
+            'subgroup_id': self.subgroup.id,
+        }
+
+        res = self.client.post(EVENTS_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Event.objects.exists())
+
+
+class EventIndexTests(TestCase):
+    """Test time-range queries are served by the composite indexes."""
+
+    def explain(self, queryset):
+        """Return the query plan for queryset as a string."""
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('EXPLAIN ' + sql, params)
+            else:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return ' '.join(str(row) for row in cursor.fetchall())
+
+    def test_month_query_per_filter_uses_index(self):
+        """Test each leading filter picks its (fk, datetime) index."""
+        month = {
+            'datetime__gte': utc(2025, 3, 1),
+            'datetime__lt': utc(2025, 4, 1),
+        }
+        cases = [
+            ('venue_id', 'event_venue_datetime_idx'),
+            ('group_id', 'event_group_datetime_idx'),
+            ('subgroup_id', 'event_subgroup_datetime_idx'),
+        ]
+        for field, index in cases:
+            queryset = Event.objects.filter(
+                **{field: 1}, **month).order_by('datetime', 'id')
+            self.assertIn(index, self.explain(queryset))
+
+
+class BulkEventAPITests(TestCase):
+    """Test the bulk event endpoints."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='user@example.com', password='password123')
+        self.client.force_authenticate(self.user)
+        self.venue = Venue.objects.create(
+            venue_name='Smalls', primary_contact=self.user)
+        self.other_venue = Venue.objects.create(venue_name='Other Venue')
+        self.group = Group.objects.create(group_name='Blowout 2025')
+        self.subgroup = SubGroup.objects.create(
+            group_id=self.group, display_name='Friday')
+
+    def item(self, **params):
+        """Return a bulk create item."""
+        item = {
+            'title': 'Gig',
+            'datetime': '2025-06-01T20:00:00Z',
+            'venue_id': self.venue.id,
+            'group_id': self.group.id,
+            'subgroup_id': self.subgroup.id,
+        }
+        item.update(params)
+        return item
+
+    def test_bulk_create_per_item_results(self):
+        """Test each item gets its own status."""
+        payload = [
+            self.item(),
+            self.item(venue_id=999999),
+            self.item(venue_id=self.other_venue.id),
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(
+            [r['status'] for r in res.data['results']], [201, 400, 403])
+        event = Event.objects.get()
+        self.assertEqual(event.venue_id, self.venue)
+        self.assertEqual(event.last_modified_by, self.user)
+
+    def test_bulk_create_query_count_is_constant(self):
+        """Test related ids are validated with one query per relation."""
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(BULK_URL, [self.item()], format='json')
+        with CaptureQueriesContext(connection) as large:
+            self.client.post(
+                BULK_URL, [self.item() for _ in range(100)], format='json')
+
+        self.assertEqual(
+            len(small.captured_queries), len(large.captured_queries))
+        self.assertEqual(Event.objects.count(), 101)
+
+    def test_bulk_update_mixed_moves_at_one_venue(self):
+        """Test rejected and accepted moves at one venue in one batch."""
+        events = [
+            Event.objects.create(
+                title=f'Set {hour}', datetime=utc(2025, 6, 1, hour),
+                duration=60, venue_id=self.venue, group_id=self.group,
+                subgroup_id=self.subgroup)
+            for hour in (18, 20, 22)
+        ]
+        payload = [
+            # Overlaps the last set, which has not moved yet.
+            {'id': events[0].id, 'datetime': '2025-06-01T22:30:00Z'},
+            {'id': events[1].id, 'datetime': '2025-06-01T16:00:00Z'},
+            # Into the slot the second set has just left.
+            {'id': events[2].id, 'datetime': '2025-06-01T20:00:00Z'},
+        ]
+
+        res = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(
+            [r['status'] for r in res.data['results']], [400, 200, 200])
+        self.assertEqual(
+            [event.datetime for event in Event.objects.order_by('id')],
+            [utc(2025, 6, 1, 18), utc(2025, 6, 1, 16),
+             utc(2025, 6, 1, 20)])
+
+
+class SparseEventAPITests(TestCase):
+    """Test `expand` on the event endpoints."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin_user = get_user_model().objects.create_superuser(
+            email='admin1@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(self.admin_user)
+        self.group = Group.objects.create(group_name='Blowout 2025')
+        self.subgroup = SubGroup.objects.create(
+            group_id=self.group, display_name='Friday')
+
+    def add_events(self, count):
+        for i in range(count):
+            venue = Venue.objects.create(venue_name=f'Venue {i}')
+            create_event(venue, self.group, self.subgroup)
+
+    def test_expand_venue_and_group(self):
+        """Test related venue and group are inlined."""
+        self.add_events(1)
+
+        res = self.client.get(EVENTS_URL, {
+            'expand': 'venue_id,group_id',
+            'fields': 'id,title',
+        })
+
+        event = res.data['results'][0]
+        self.assertEqual(
+            list(event.keys()), ['id', 'title', 'venue_id', 'group_id'])
+        self.assertEqual(event['venue_id']['venue_name'], 'Venue 0')
+        self.assertEqual(event['group_id']['group_name'], 'Blowout 2025')
+
+    def test_expand_query_count_is_constant(self):
+        """Test expansion uses joins rather than a query per row."""
+        self.add_events(2)
+        params = {'expand': 'venue_id,group_id'}
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(EVENTS_URL, params)
+
+        self.add_events(30)
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(EVENTS_URL, params)
+
+        self.assertEqual(
+            len(small.captured_queries), len(large.captured_queries))
@@ -0,0 +1,19 @@
+"""
+URL mappings for the event app.
+"""
+from django.urls import (
+    path,
+    include,
+)
+
+from core.asyncviews import AsyncReadRouter
+from event import views
+
+router = AsyncReadRouter()
+router.register('events', views.EventViewSet)
+
+app_name = 'event'
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
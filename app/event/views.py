@@ -1,3 +1,230 @@
-from django.shortcuts import render
+"""
+Views for the event APIs.
+"""
+from rest_framework import viewsets
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
 
-# Create your views here.
+from core import access, rollups, summaries
+from core.authentication import CachedTokenAuthentication
+from core.availability import (
+    IntervalSet,
+    booking,
+    busy_intervals,
+    conflict_error,
+    is_overlap_violation,
+    series_conflict,
+)
+from core.cache import CachedResponseMixin, ConditionalGetMixin
+from core.mixins import (
+    BulkModelMixin,
+    ReplicaReadMixin,
+    SparseFieldsMixin,
+)
+from core.models import Event, Recurrence
+from core.pagination import EventKeysetPagination
+from core.params import parse_datetime, parse_id
+from event import serializers
+
+
+class EventViewSet(
+        ReplicaReadMixin,
+        ConditionalGetMixin,
+        CachedResponseMixin,
+        SparseFieldsMixin,
+        BulkModelMixin,
+        viewsets.ModelViewSet,
+):
+    """View for manage event APIs.
+
+    Supports `venue`, `group`, `subgroup`, `start` and `end` query params.
+    Every combination leads with an equality column followed by a
+    `datetime` range, matching the composite indexes on `Event`.
+
+    With `start` or `end`, recurring events are listed once per
+    occurrence in the window rather than once as a series.
+    """
+    serializer_class = serializers.EventDetailSerializer
+    queryset = Event.objects.select_related('recurrence')
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    pagination_class = EventKeysetPagination
+    bulk_deferred_fields = ('rule',)
+
+    def get_queryset(self):
+        """Retrieve events, filtered by the query params."""
+        queryset = self.queryset
+        user = self.request.user
+        if self.request.method in SAFE_METHODS:
+            queryset = access.visible_events(queryset, user)
+        elif not access.is_unscoped(user):
+            # Only a venue's contact may change its events.
+            queryset = queryset.filter(venue_id__primary_contact=user)
+
+        params = self.request.query_params
+        venue = parse_id(params, 'venue')
+        group = parse_id(params, 'group')
+        subgroup = parse_id(params, 'subgroup')
+        start = parse_datetime(params, 'start')
+        end = parse_datetime(params, 'end')
+
+        if venue is not None:
+            queryset = queryset.filter(venue_id=venue)
+        if group is not None:
+            queryset = queryset.filter(group_id=group)
+        if subgroup is not None:
+            queryset = queryset.filter(subgroup_id=subgroup)
+        self._window = start, end
+        self._series = None
+        if start is None and end is None:
+            return queryset.order_by('datetime', 'id')
+
+        # Series are expanded by the paginator, see `get_series`.
+        self._series = queryset.filter(
+            recurrence__isnull=False, datetime__isnull=False)
+        if end is not None:
+            self._series = self._series.filter(datetime__lt=end)
+        queryset = queryset.filter(recurrence__isnull=True)
+        if start is not None:
+            queryset = queryset.filter(datetime__gte=start)
+        if end is not None:
+            queryset = queryset.filter(datetime__lt=end)
+
+        return queryset.order_by('datetime', 'id')
+
+    def get_window(self):
+        """Return the (start, end) the list is limited to."""
+        return self._window
+
+    def get_series(self):
+        """Return the recurring events to expand into the listed window."""
+        if self._series is None:
+            return []
+        return list(self._series)
+
+    def get_serializer_class(self):
+        """Return the serializer class for request."""
+        if self.action == 'list':
+            return serializers.EventSerializer
+        return self.serializer_class
+
+    def check_write(self, validated_data):
+        """Only staff may book events at venues they don't manage."""
+        user = self.request.user
+        if user.is_staff or user.is_superuser:
+            return
+        venue = validated_data.get('venue_id')
+        if venue is not None and venue.primary_contact_id != user.id:
+            raise PermissionDenied('You do not manage this venue.')
+
+    def get_serializer_context(self):
+        """Bulk requests check conflicts for the whole batch at once."""
+        context = super().get_serializer_context()
+        context['check_conflicts'] = self.action not in (
+            'bulk', 'bulk_update')
+        return context
+
+    def validate_bulk_items(self, data, instances=None):
+        """Also reject items that overlap a booking or an earlier item.
+
+        Existing bookings are read once per venue in the batch, for the
+        window the batch covers there, rather than once per item.
+        """
+        # Noted before the update moves them, see `after_bulk_write`.
+        self._bulk_previous = [
+            self.counted_state(instance)
+            for instance in (instances or {}).values()
+        ]
+        results, valid = super().validate_bulk_items(data, instances)
+        items, windows = [], {}
+        for item in valid:
+            venue, intervals = booking(item[2], item[1])
+            items.append((item, venue, intervals))
+            for start, end in intervals:
+                low, high = windows.get(venue, (start, end))
+                windows[venue] = min(low, start), max(high, end)
+        existing = {}
+        for venue, (start, end) in windows.items():
+            existing[venue] = IntervalSet()
+            for interval in busy_intervals(venue, start, end):
+                existing[venue].add(*interval)
+        # An event's current slot is only freed once its move is
+        # accepted, so a rejected move keeps it from other items.
+        moved, batch, accepted = set(), {}, []
+        for item, venue, intervals in items:
+            result, instance = item[0], item[1]
+            booked = batch.setdefault(venue, IntervalSet())
+            old, own = None, []
+            if instance is not None:
+                old = existing.get(instance.venue_id_id)
+                own = old.remove(instance.pk) if old is not None else []
+            error = None
+            for start, end in intervals:
+                conflict = existing[venue].conflict(start, end)
+                if conflict is not None:
+                    error = conflict_error(event=conflict.event)
+                    break
+                conflict = booked.conflict(start, end)
+                if conflict is not None:
+                    error = conflict_error(item=conflict.event)
+                    break
+            rule = item[2].get('rule', getattr(instance, 'rule', ''))
+            if error is None and rule:
+                exclude = moved | ({instance.pk} if instance else set())
+                conflict = series_conflict(venue, rule, intervals, exclude)
+                if conflict is not None:
+                    error = conflict_error(event=conflict)
+            if error is not None:
+                for interval in own:
+                    old.add(*interval)
+                result.update({
+                    'status': error.status_code,
+                    'errors': error.get_full_details(),
+                })
+                continue
+            if instance is not None:
+                moved.add(instance.pk)
+            for start, end in intervals:
+                booked.add(start, end, result['index'])
+            accepted.append(item)
+        return results, accepted
+
+    def save_bulk_deferred(self, pairs):
+        """Replace the recurrence rules of bulk written events."""
+        Recurrence.objects.filter(
+            event__in=[event.pk for event, _ in pairs]).delete()
+        Recurrence.objects.bulk_create([
+            Recurrence(event=event, rule=values['rule'])
+            for event, values in pairs if values['rule']
+        ])
+
+    def counted_state(self, event):
+        """Return the (summary targets, rollup state) of event."""
+        return summaries.event_state(event)[0], rollups.event_state(event)
+
+    def after_bulk_write(self, objs):
+        """Recompute the summaries and rollups the events left or joined."""
+        states = self._bulk_previous + [
+            self.counted_state(event) for event in objs]
+        summaries.refresh([targets for targets, _ in states])
+        rollups.refresh([rollup for _, rollup in states])
+
+    def handle_exception(self, exc):
+        """Report a double booking that raced past validation as a 400."""
+        if is_overlap_violation(exc):
+            exc = conflict_error()
+        return super().handle_exception(exc)
+
+    def get_bulk_save_kwargs(self):
+        """Record who last touched each event."""
+        return {'last_modified_by': self.request.user}
+
+    def perform_create(self, serializer):
+        """Create a new event."""
+        self.check_write(serializer.validated_data)
+        serializer.save(**self.get_bulk_save_kwargs())
+
+    def perform_update(self, serializer):
+        """Update an event."""
+        self.check_write(serializer.validated_data)
+        serializer.save(**self.get_bulk_save_kwargs())
@@ -4,15 +4,22 @@ serializers for group APIs
 from rest_framework import serializers
 
 from core.models import Group
+from core.serializers import DynamicFieldsMixin
+from core.summaries import SUMMARY_FIELDS
 
 
-class GroupSerializer(serializers.ModelSerializer):
+class GroupSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for groups"""
 
     class Meta:
         model = Group
-        fields = ['id', 'group_name', 'primary_contact']
+        fields = ['id', 'group_name', 'primary_contact'] + SUMMARY_FIELDS
         read_only_fields = ['id']
+        # Kept on the row by core.summaries, so free to include.
+        optional_fields = SUMMARY_FIELDS
+        expandable_fields = {
+            'primary_contact': 'user.serializers.ContactSerializer',
+        }
 
 
 # class VenueDetailSerializer(serializers.ModelSerializer):
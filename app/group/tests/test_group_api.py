@@ -15,6 +15,7 @@ from group.serializers import GroupSerializer
 
 
 GROUPS_URL = reverse('group:group-list')
+BULK_URL = reverse('group:group-bulk')
 
 
 # def detail_url(venue_id):
@@ -83,7 +84,7 @@ class PrivateVenueAPITests(TestCase):
         groups = Group.objects.all().order_by('-id')
         serializer = GroupSerializer(groups, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_non_admin_retrieve_groups_fails(self):
         """Test that a non-admin cannot retreive all groups"""
@@ -131,6 +132,27 @@ class PrivateVenueAPITests(TestCase):
             self.assertEqual(getattr(group, k), v)
         # self.assertEqual(group.primary_contact, self.user)
 
+    def test_bulk_create_groups(self):
+        """Test creating a list of groups in one request."""
+        payload = [{'group_name': 'First'}, {'group_name': 'Second'}]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            sorted(Group.objects.values_list('group_name', flat=True)),
+            ['First', 'Second'],
+        )
+
+    def test_non_admin_bulk_create_fails(self):
+        """Test bulk endpoints keep the admin-only permission."""
+        self.client.force_authenticate(self.user)
+
+        res = self.client.post(
+            BULK_URL, [{'group_name': 'Nope'}], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
 #     def test_venue_list_all_for_admin(self):
 #         """Test admin receives all venues."""
 #         self.client.force_authenticate(self.admin_user)
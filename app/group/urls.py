@@ -6,15 +6,20 @@ from django.urls import (
     include,
 )
 
-from rest_framework.routers import DefaultRouter
-
+from core.asyncviews import AsyncReadRouter
+from core.calendar import calendar_view
 from group import views
 
-router = DefaultRouter()
+router = AsyncReadRouter()
 router.register('groups', views.GroupViewSet)
 
 app_name = 'group'
 
 urlpatterns = [
+    path(
+        'groups/<int:pk>/calendar.ics',
+        calendar_view(views.GroupViewSet),
+        name='group-calendar',
+    ),
     path('', include(router.urls)),
 ]
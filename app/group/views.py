@@ -2,21 +2,42 @@
 Views for the group APIs.
 """
 from rest_framework import viewsets
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import (
     IsAuthenticated,
     IsAdminUser
 )
 
+from core.authentication import CachedTokenAuthentication
+from core.cache import CachedResponseMixin, ConditionalGetMixin
+from core.calendar import CalendarFeedMixin
+from core.mixins import (
+    BulkModelMixin,
+    FastListMixin,
+    ReplicaReadMixin,
+    SparseFieldsMixin,
+)
 from core.models import Group
+from core.summaries import EventSummaryMixin
 from group import serializers
 
 
-class GroupViewSet(viewsets.ModelViewSet):
+class GroupViewSet(
+        EventSummaryMixin,
+        ReplicaReadMixin,
+        CalendarFeedMixin,
+        ConditionalGetMixin,
+        CachedResponseMixin,
+        FastListMixin,
+        SparseFieldsMixin,
+        BulkModelMixin,
+        viewsets.ModelViewSet,
+):
     """View for manage group APIs."""
     serializer_class = serializers.GroupSerializer
     queryset = Group.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
+    calendar_event_field = 'group_id'
+    calendar_name_field = 'group_name'
     permission_classes = [IsAuthenticated, IsAdminUser]
 
     def get_queryset(self):
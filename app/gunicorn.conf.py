@@ -0,0 +1,99 @@
+"""
+Gunicorn configuration for production.
+
+    gunicorn -c gunicorn.conf.py
+
+The application is imported once in the master (`preload_app`) and the
+workers are forked from it, so module code and data are shared
+copy-on-write between them. Everything is configured from the
+environment:
+
+    WEB_CONCURRENCY          worker processes (default 2 * CPUs + 1)
+    GUNICORN_WORKER_CLASS    `uvicorn` (ASGI, default) or `gthread` (WSGI)
+    GUNICORN_THREADS         threads per gthread worker (default 4)
+    GUNICORN_PRELOAD         `0` to import the app in each worker instead
+    GUNICORN_BIND            address to listen on (default 0.0.0.0:8000)
+"""
+import gc
+import multiprocessing
+import os
+
+
+_worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'uvicorn')
+
+if _worker_class == 'uvicorn':
+    wsgi_app = 'app.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'app.wsgi:application'
+    worker_class = _worker_class
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get(
+    'WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = timeout
+keepalive = 5
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG')
+
+
+def warm_imports():
+    """Import what Django and DRF otherwise load on the first request."""
+    from django.urls import get_resolver
+    from rest_framework.settings import api_settings
+
+    get_resolver().url_patterns
+    api_settings.DEFAULT_RENDERER_CLASSES
+    api_settings.DEFAULT_PARSER_CLASSES
+    api_settings.DEFAULT_PAGINATION_CLASS
+    api_settings.DEFAULT_SCHEMA_CLASS
+
+
+def on_starting(server):
+    from core.metrics import clear_metrics_dir
+
+    # Counters start again from zero with the new workers.
+    clear_metrics_dir()
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    warm_imports()
+    # Move everything allocated so far out of the collector's reach, so
+    # collections in the workers don't write to the shared pages.
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from django.db import connections
+
+    # Never share a database socket opened by the master.
+    connections.close_all()
+
+
+def post_worker_init(worker):
+    from core.db.pool import warm_pools
+
+    if not preload_app:
+        warm_imports()
+    # Pools are per process; open each worker's MIN_SIZE connections now
+    # rather than on its first requests.
+    warm_pools()
+
+
+def worker_exit(server, worker):
+    from core.metrics import registry
+
+    registry.flush()
+
+
+def child_exit(server, worker):
+    from core.metrics import mark_process_dead
+
+    # The worker's totals stay in the merged metrics, its gauges go.
+    mark_process_dead(worker.pid)
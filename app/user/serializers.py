@@ -33,6 +33,15 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 
+class ContactSerializer(serializers.ModelSerializer):
+    """Serializer for a user shown as a related contact."""
+
+    class Meta:
+        model = get_user_model()
+        fields = ['id', 'email', 'name']
+        read_only_fields = fields
+
+
 class AuthTokenSerializer(serializers.Serializer):
     """Serializer for the user auth token."""
     email = serializers.EmailField()
@@ -3,6 +3,7 @@ URL mappings for the user API.
 """
 from django.urls import path
 
+from core.asyncviews import async_login_view
 from user import views
 
 
@@ -10,6 +11,10 @@ app_name = 'user'
 
 urlpatterns = [
     path('create/', views.CreateUserView.as_view(), name='create'),
-    path('token/', views.CreateTokenView.as_view(), name='token'),
+    path(
+        'token/',
+        async_login_view(views.CreateTokenView.as_view()),
+        name='token',
+    ),
     path('me/', views.ManageUserView.as_view(), name='me'),
 ]
@@ -4,18 +4,25 @@ serializers for venue APIs
 from rest_framework import serializers
 
 from core.models import Venue
+from core.serializers import DynamicFieldsMixin
+from core.summaries import SUMMARY_FIELDS
 
 
-class VenueSerializer(serializers.ModelSerializer):
+class VenueSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for venues"""
 
     class Meta:
         model = Venue
-        fields = ['id', 'venue_name', 'address']
+        fields = ['id', 'venue_name', 'address'] + SUMMARY_FIELDS
         read_only_fields = ['id']
+        # Kept on the row by core.summaries, so free to include.
+        optional_fields = SUMMARY_FIELDS
+        expandable_fields = {
+            'primary_contact': 'user.serializers.ContactSerializer',
+        }
 
 
-class VenueDetailSerializer(serializers.ModelSerializer):
+class VenueDetailSerializer(VenueSerializer):
     """Serializer for venue detail"""
 
     class Meta(VenueSerializer.Meta):
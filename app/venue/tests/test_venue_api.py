@@ -3,7 +3,9 @@ Tests for Venue APIs
 """
 
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
@@ -18,6 +20,7 @@ from venue.serializers import (
 
 
 VENUES_URL = reverse('venue:venue-list')
+BULK_URL = reverse('venue:venue-bulk')
 
 
 def detail_url(venue_id):
@@ -84,7 +87,7 @@ class PrivateVenueAPITests(TestCase):
         venues = Venue.objects.all().order_by('-id')
         serializer = VenueSerializer(venues, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_venue_list_limited_to_user(self):
         """Test list of venues is limited to authenticated user."""
@@ -99,7 +102,7 @@ class PrivateVenueAPITests(TestCase):
         venues = Venue.objects.filter(primary_contact=self.user)
         serializer = VenueSerializer(venues, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_create_venue(self):
         """Test creating a venue."""
@@ -130,7 +133,7 @@ class PrivateVenueAPITests(TestCase):
         venues = Venue.objects.all().order_by('-id')
         serializer = VenueSerializer(venues, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_get_venue_detail(self):
         """Test get venue detail."""
@@ -242,3 +245,168 @@ class PrivateVenueAPITests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
         self.assertTrue(Venue.objects.filter(id=venue.id).exists())
+
+
+class BulkVenueAPITests(TestCase):
+    """Test the bulk venue endpoints."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='user@example.com', password='password123')
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create(self):
+        """Test creating a list of venues in one request."""
+        payload = [
+            {'venue_name': f'Venue {i}', 'address': f'{i} Main St'}
+            for i in range(3)
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [r['status'] for r in res.data['results']], [201] * 3)
+        venues = Venue.objects.filter(primary_contact=self.user)
+        self.assertEqual(
+            sorted(v.venue_name for v in venues),
+            [item['venue_name'] for item in payload],
+        )
+
+    def test_bulk_create_reports_invalid_items(self):
+        """Test invalid items are reported and valid ones still written."""
+        payload = [
+            {'venue_name': 'Good Venue'},
+            {'venue_name': 'x' * 300},
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        results = res.data['results']
+        self.assertEqual(results[0]['status'], status.HTTP_201_CREATED)
+        self.assertEqual(results[1]['status'], status.HTTP_400_BAD_REQUEST)
+        self.assertIn('venue_name', results[1]['errors'])
+        self.assertEqual(Venue.objects.count(), 1)
+
+    def test_bulk_create_requires_list(self):
+        """Test a non-list body is rejected."""
+        res = self.client.post(
+            BULK_URL, {'venue_name': 'Single'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_query_count_is_constant(self):
+        """Test bulk create does not issue a query per item."""
+        payload = [{'venue_name': f'Venue {i}'} for i in range(50)]
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(BULK_URL, payload, format='json')
+
+        self.assertLess(len(queries.captured_queries), 10)
+
+    def test_bulk_update(self):
+        """Test partially updating a list of venues."""
+        venues = [
+            create_venue(primary_contact=self.user, venue_name=f'V{i}')
+            for i in range(2)
+        ]
+        other = create_venue(
+            primary_contact=create_user(
+                email='other@example.com', password='password123'))
+        payload = [
+            {'id': venues[0].id, 'address': 'New Address'},
+            {'id': venues[1].id, 'venue_name': 'Renamed'},
+            {'id': other.id, 'venue_name': 'Hijacked'},
+        ]
+
+        res = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(
+            [r['status'] for r in res.data['results']], [200, 200, 404])
+        venues[0].refresh_from_db()
+        venues[1].refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(venues[0].address, 'New Address')
+        self.assertEqual(venues[0].venue_name, 'V0')
+        self.assertEqual(venues[1].venue_name, 'Renamed')
+        self.assertEqual(other.venue_name, 'Smalls')
+
+    def test_bulk_delete(self):
+        """Test deleting a list of venues by id."""
+        venue = create_venue(primary_contact=self.user)
+        other = create_venue(
+            primary_contact=create_user(
+                email='other@example.com', password='password123'))
+
+        res = self.client.delete(
+            BULK_URL, [venue.id, other.id], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(
+            [r['status'] for r in res.data['results']], [204, 404])
+        self.assertFalse(Venue.objects.filter(id=venue.id).exists())
+        self.assertTrue(Venue.objects.filter(id=other.id).exists())
+
+
+class SparseVenueAPITests(TestCase):
+    """Test `fields` and `expand` on the venue endpoints."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='user@example.com', password='password123', name='Pat')
+        self.client.force_authenticate(self.user)
+
+    def test_fields_trims_response_and_query(self):
+        """Test `fields` limits both the payload and the selected columns."""
+        create_venue(primary_contact=self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(VENUES_URL, {'fields': 'id,venue_name'})
+
+        self.assertEqual(
+            list(res.data['results'][0].keys()), ['id', 'venue_name'])
+        select = [
+            q['sql'] for q in queries.captured_queries
+            if 'core_venue' in q['sql']
+        ][-1]
+        self.assertNotIn('address', select)
+
+    def test_expand_primary_contact(self):
+        """Test `expand` inlines the primary contact."""
+        venue = create_venue(primary_contact=self.user)
+
+        res = self.client.get(
+            detail_url(venue.id), {'expand': 'primary_contact'})
+
+        self.assertEqual(res.data['primary_contact'], {
+            'id': self.user.id,
+            'email': self.user.email,
+            'name': 'Pat',
+        })
+
+    def test_expand_query_count_is_constant(self):
+        """Test expanding a page costs the same queries at any size."""
+        create_venue(primary_contact=self.user)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(VENUES_URL, {'expand': 'primary_contact'})
+
+        for i in range(20):
+            create_venue(primary_contact=self.user, venue_name=f'V{i}')
+        with CaptureQueriesContext(connection) as large:
+            res = self.client.get(VENUES_URL, {'expand': 'primary_contact'})
+
+        self.assertEqual(len(res.data['results']), 21)
+        self.assertEqual(
+            len(small.captured_queries), len(large.captured_queries))
+
+    def test_unknown_fields_rejected(self):
+        """Test unknown fields and expansions return a 400."""
+        res = self.client.get(VENUES_URL, {'fields': 'secret'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(VENUES_URL, {'expand': 'address'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
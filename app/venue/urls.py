@@ -6,15 +6,20 @@ from django.urls import (
     include,
 )
 
-from rest_framework.routers import DefaultRouter
-
+from core.asyncviews import AsyncReadRouter
+from core.calendar import calendar_view
 from venue import views
 
-router = DefaultRouter()
+router = AsyncReadRouter()
 router.register('venues', views.VenueViewSet)
 
 app_name = 'venue'
 
 urlpatterns = [
+    path(
+        'venues/<int:pk>/calendar.ics',
+        calendar_view(views.VenueViewSet),
+        name='venue-calendar',
+    ),
     path('', include(router.urls)),
 ]
@@ -1,26 +1,66 @@
 """
 Views for the venue APIs.
 """
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import viewsets
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
+from rest_framework.response import Response
 
+from core import access
+from core.authentication import CachedTokenAuthentication
+from core.availability import busy_intervals, free_intervals
+from core.cache import CachedResponseMixin, ConditionalGetMixin
+from core.calendar import CalendarFeedMixin
+from core.mixins import (
+    BulkModelMixin,
+    FastListMixin,
+    ReplicaReadMixin,
+    SparseFieldsMixin,
+)
 from core.models import Venue
+from core.params import parse_datetime, parse_id
+from core.summaries import EventSummaryMixin
 from venue import serializers
 
 
-class VenueViewSet(viewsets.ModelViewSet):
+class VenueViewSet(
+        EventSummaryMixin,
+        ReplicaReadMixin,
+        CalendarFeedMixin,
+        ConditionalGetMixin,
+        CachedResponseMixin,
+        FastListMixin,
+        SparseFieldsMixin,
+        BulkModelMixin,
+        viewsets.ModelViewSet,
+):
     """View for manage venue APIs."""
     serializer_class = serializers.VenueDetailSerializer
     queryset = Venue.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
+    calendar_event_field = 'venue_id'
+    calendar_name_field = 'venue_name'
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        """Retrieve venues for primary contact."""
-        if self.request.user.is_staff or self.request.user.is_superuser:
-            return self.queryset.order_by('-id')
-        return self.queryset.filter(primary_contact=self.request.user).order_by('-id')
+        """Retrieve the venues the user may see, or change.
+
+        Members of a group see the venues of its other members, but only
+        a venue's contact may change it.
+        """
+        user = self.request.user
+        if self.request.method in SAFE_METHODS:
+            queryset = access.visible_venues(self.queryset, user)
+        elif access.is_unscoped(user):
+            queryset = self.queryset
+        else:
+            queryset = self.queryset.filter(primary_contact=user)
+        return queryset.order_by('-id')
 
     def perform_create(self, serializer):
         """Create a new venue."""
@@ -40,8 +80,60 @@ class VenueViewSet(viewsets.ModelViewSet):
 
         serializer.save()
 
+    def get_bulk_save_kwargs(self):
+        """Non-staff users are the primary contact of what they write."""
+        if not self.request.user.is_staff:
+            return {'primary_contact': self.request.user}
+        return {}
+
+    def after_bulk_write(self, objs):
+        """Update who may see the venues, as bulk writes skip signals."""
+        access.refresh_venue_access(
+            [obj.pk for obj in objs if obj.pk is not None])
+        # Without RETURNING, new venues are only known by their contact.
+        access.refresh_user_access({
+            obj.primary_contact_id for obj in objs
+            if obj.pk is None and obj.primary_contact_id is not None
+        })
+
     def get_serializer_class(self):
         """Return the serializer class for request."""
         if self.action == 'list':
             return serializers.VenueSerializer
         return self.serializer_class
+
+    @action(detail=True)
+    def availability(self, request, pk=None):
+        """Return the venue's bookings and free gaps in a time window.
+
+        Takes `start` (default now), `end` (default a week later) and
+        `min_gap`, the shortest free gap to list in minutes.
+        """
+        venue = self.get_object()
+        params = request.query_params
+        start = parse_datetime(params, 'start') or timezone.now()
+        end = parse_datetime(params, 'end') or start + timedelta(days=7)
+        min_gap = parse_id(params, 'min_gap')
+        max_days = getattr(settings, 'AVAILABILITY_MAX_DAYS', 92)
+        if end <= start:
+            raise ValidationError({'end': 'Must be after start.'})
+        if end - start > timedelta(days=max_days):
+            raise ValidationError(
+                {'end': f'The window can be at most {max_days} days.'})
+        if min_gap is not None and min_gap < 0:
+            raise ValidationError({'min_gap': 'Must not be negative.'})
+
+        busy = busy_intervals(venue.pk, start, end)
+        free = free_intervals(
+            busy, start, end,
+            timedelta(minutes=min_gap) if min_gap else None)
+        return Response({
+            'venue': venue.pk,
+            'start': start,
+            'end': end,
+            'busy': [
+                {'start': i.start, 'end': i.end, 'event': i.event}
+                for i in busy
+            ],
+            'free': [{'start': i.start, 'end': i.end} for i in free],
+        })